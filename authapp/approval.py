@@ -0,0 +1,117 @@
+"""Bulk account review: approve, reject or suspend many accounts in one request"""
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from common.tasks import enqueue_many
+from authapp.membership import add_members, bump_membership_version, user_types
+from authapp.models import CustomUser
+from authapp.provisioning import provision_users
+from authapp.roles import PROFILE_MODELS
+from authapp.tokens import blacklist_user_tokens
+
+# Profile models whose verification follows the account review
+VERIFIED_PROFILE_TYPES = ('agent', 'developer', 'seller')
+
+PROFILE_VERIFICATION_STATUS = {
+    'approved': 'verified',
+    'rejected': 'rejected',
+}
+
+NOTIFICATION_SUBJECTS = {
+    'approved': 'Your account has been approved',
+    'rejected': 'Your account application was rejected',
+    'suspended': 'Your account has been suspended',
+}
+
+
+def account_fields(action, reviewer, now, rejection_reason=None):
+    """Column values written by the single account UPDATE"""
+    fields = {'account_status': action, 'updated_at': now}
+    if action == 'approved':
+        fields.update(is_active=True, approved_by=reviewer, approved_at=now, rejection_reason=None)
+    elif action == 'rejected':
+        fields.update(is_active=False, rejection_reason=rejection_reason)
+    else:
+        fields.update(is_active=False)
+    return fields
+
+
+def notification(user, action, rejection_reason=None):
+    """Payload for the send_email background task"""
+    lines = [f"Hi {user['first_name'] or 'there'},", ""]
+    if action == 'approved':
+        frontend_url = getattr(settings, 'FRONTEND_URL', '').rstrip('/')
+        lines.append("Your account has been reviewed and approved. You can now sign in.")
+        if frontend_url:
+            lines.append(f"{frontend_url}/login")
+    elif action == 'rejected':
+        lines.append("Your account application was reviewed and could not be approved.")
+        if rejection_reason:
+            lines.extend(["", f"Reason: {rejection_reason}"])
+    else:
+        lines.append("Your account has been suspended. Please contact support for details.")
+    return {
+        'subject': NOTIFICATION_SUBJECTS[action],
+        'message': "\n".join(lines),
+        'recipient_list': [user['email']],
+        'from_email': settings.DEFAULT_FROM_EMAIL,
+    }
+
+
+@transaction.atomic
+def review_accounts(user_ids, action, reviewer, rejection_reason=None, notes=None, group=None,
+                    verify_profiles=True, notify=True):
+    """Apply one review decision to many accounts.
+
+    Accounts already in the target status are left alone. The rest are
+    updated with one UPDATE, optionally added to `group` (one set-based
+    insert), get their role profiles verified or rejected with one UPDATE
+    per profile table, and are provisioned on approval. Suspended accounts
+    have their refresh tokens blacklisted. Notification emails are queued for
+    the background worker together with the change.
+    """
+    now = timezone.now()
+    users = list(
+        CustomUser.objects.filter(id__in=user_ids).exclude(account_status=action)
+        .order_by('id').values('id', 'email', 'first_name')
+    )
+    ids = [user['id'] for user in users]
+    result = {'updated': 0, 'profiles_updated': 0, 'notified': 0, 'skipped': sorted(set(user_ids) - set(ids))}
+    if not ids:
+        return result
+
+    result['updated'] = CustomUser.objects.filter(id__in=ids).update(
+        **account_fields(action, reviewer, now, rejection_reason)
+    )
+    # The UPDATE sends no post_save; member pages show the account status
+    transaction.on_commit(bump_membership_version)
+    if group is not None:
+        add_members(group, ids)
+
+    types = user_types(ids)
+    profile_status = PROFILE_VERIFICATION_STATUS.get(action)
+    if verify_profiles and profile_status:
+        for user_type in VERIFIED_PROFILE_TYPES:
+            type_ids = [user_id for user_id, resolved in types.items() if resolved == user_type]
+            if not type_ids:
+                continue
+            ProfileModel = apps.get_model('authapp', PROFILE_MODELS[user_type])
+            values = {'verification_status': profile_status, 'updated_at': now}
+            if action == 'approved':
+                values.update(verified_at=now, verified_by=reviewer)
+            if notes:
+                values['verification_notes'] = notes
+            result['profiles_updated'] += ProfileModel.objects.filter(user_id__in=type_ids).update(**values)
+
+    if action == 'approved':
+        provision_users(types)
+    elif action == 'suspended':
+        result['tokens_blacklisted'] = blacklist_user_tokens(ids)
+
+    if notify:
+        payloads = [notification(user, action, rejection_reason) for user in users if user['email']]
+        if payloads:
+            enqueue_many('send_email', payloads)
+        result['notified'] = len(payloads)
+    return result
@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from authapp.tokens import REFRESH_JTI_CLAIM, CachedRefreshToken, blacklist_cache
+
+# Claims copied into every token so read requests never have to load the user
+ROLE_CLAIMS = ('user_type', 'account_status', 'group_ids')
+
+
+def tokens_for_user(user, user_type, group_ids):
+    """Refresh token (and through it the access token) carrying the user's role claims"""
+    refresh = CachedRefreshToken.for_user(user)
+    refresh['user_type'] = user_type
+    refresh['account_status'] = user.account_status
+    refresh['group_ids'] = list(group_ids)
+    return refresh
+
+
+class ClaimsUser:
+    """Request user built from access token claims.
+
+    Exposes the id, role and group ids without touching the database. Any
+    other attribute loads the CustomUser row once and is read from it, so
+    code that needs the full model keeps working, at the cost of one query.
+    """
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+
+    def __init__(self, token):
+        self.token = token
+        self.id = self.pk = token[api_settings.USER_ID_CLAIM]
+        self.user_type = token['user_type']
+        self.account_status = token['account_status']
+        self.group_ids = token.get('group_ids', [])
+
+    @property
+    def user(self):
+        if '_user' not in self.__dict__:
+            try:
+                self._user = get_user_model().objects.get(**{api_settings.USER_ID_FIELD: self.id})
+            except get_user_model().DoesNotExist:
+                raise AuthenticationFailed("User not found", code="user_not_found")
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith('__') or name in ('token', '_user'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __str__(self):
+        return str(self.user)
+
+    def __eq__(self, other):
+        return getattr(other, 'pk', None) == self.pk and getattr(other, 'is_authenticated', False)
+
+    def __hash__(self):
+        return hash(self.pk)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT authentication that skips the user lookup for read-only requests.
+
+    Safe methods get a ClaimsUser from the token's role claims; writes (and
+    tokens issued before the claims existed) load the full user as usual.
+    Role or status changes therefore reach read endpoints when the user's
+    access token is next refreshed; blacklisting the refresh token (logout,
+    suspension) ends the access tokens issued from it as well.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        if request.method in SAFE_METHODS and all(claim in validated_token for claim in ROLE_CLAIMS):
+            if api_settings.USER_ID_CLAIM not in validated_token:
+                raise InvalidToken("Token contained no recognizable user identification")
+            refresh_jti = validated_token.get(REFRESH_JTI_CLAIM)
+            if refresh_jti and blacklist_cache.contains(refresh_jti):
+                # Logged out or suspended (authapp.approval): the claims no longer hold
+                raise AuthenticationFailed("Token is blacklisted", code="token_blacklisted")
+            return ClaimsUser(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
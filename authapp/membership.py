@@ -0,0 +1,100 @@
+"""Set-based group membership changes.
+
+Each batch costs one query for the current members, one insert or delete on
+the user/group through table and one m2m_changed pair, however many users
+it touches. Receivers of m2m_changed get the whole batch as `pk_set` with the
+group as the instance (reverse=True), like `group.user_set.add(*users)`.
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed
+from authapp.models import CustomUser
+from authapp.roles import ROLE_GROUP_NAMES, resolve_user_type
+from common.versions import bump_cache_version, cache_version
+
+MEMBERSHIP_VERSION_KEY = 'authapp:membership-version'
+MEMBERSHIP_CHUNK_SIZE = 1000
+# User columns shown on cached member pages; changing them bumps the membership version
+MEMBER_PAGE_FIELDS = {'email', 'first_name', 'last_name', 'phone', 'is_active', 'account_status'}
+
+Membership = CustomUser.groups.through
+
+
+def membership_version():
+    """Counter bumped on every membership, group or member change; put it in cache keys derived from groups"""
+    return cache_version(MEMBERSHIP_VERSION_KEY)
+
+
+def bump_membership_version():
+    bump_cache_version(MEMBERSHIP_VERSION_KEY)
+
+
+def _send(action, group, pk_set):
+    m2m_changed.send(
+        sender=Membership, action=action, instance=group, reverse=True,
+        model=CustomUser, pk_set=pk_set, using=Membership.objects.db,
+    )
+
+
+def current_member_ids(group, user_ids):
+    return set(
+        Membership.objects.filter(group_id=group.id, customuser_id__in=user_ids).values_list('customuser_id', flat=True)
+    )
+
+
+@transaction.atomic
+def add_members(group, user_ids):
+    """Add users to a group; returns (added ids, ids that already were members)"""
+    user_ids = set(user_ids)
+    existing = current_member_ids(group, user_ids)
+    added = user_ids - existing
+    if added:
+        _send('pre_add', group, added)
+        Membership.objects.bulk_create(
+            [Membership(group_id=group.id, customuser_id=user_id) for user_id in added],
+            ignore_conflicts=True,
+        )
+        _send('post_add', group, added)
+    return added, existing
+
+
+@transaction.atomic
+def remove_members(group, user_ids):
+    """Remove users from a group; returns (removed ids, ids that were not members)"""
+    user_ids = set(user_ids)
+    removed = current_member_ids(group, user_ids)
+    if removed:
+        _send('pre_remove', group, removed)
+        Membership.objects.filter(group_id=group.id, customuser_id__in=removed).delete()
+        _send('post_remove', group, removed)
+    return removed, user_ids - removed
+
+
+def user_types(user_ids):
+    """{user_id: user_type} for many users from one query on the membership table"""
+    group_names = {user_id: [] for user_id in user_ids}
+    rows = Membership.objects.filter(
+        customuser_id__in=group_names, group__name__in=ROLE_GROUP_NAMES
+    ).values_list('customuser_id', 'group__name')
+    for user_id, group_name in rows:
+        group_names[user_id].append(group_name)
+    return {user_id: resolve_user_type(names) for user_id, names in group_names.items()}
+
+
+def id_chunks(user_ids=None, queryset=None, chunk_size=MEMBERSHIP_CHUNK_SIZE):
+    """Yield lists of existing user ids from an explicit list or, by keyset on id, from a queryset"""
+    if user_ids is not None:
+        user_ids = sorted(set(user_ids))
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            # Unknown ids are dropped rather than failing the foreign key
+            yield sorted(CustomUser.objects.filter(id__in=chunk).values_list('id', flat=True))
+        return
+
+    queryset = queryset.order_by('id').values_list('id', flat=True).distinct()
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser, Group, BaseUserManager
 from django.utils.translation import gettext_lazy as _
+from authapp.roles import ROLE_GROUP_NAMES, resolve_user_type
 
 
 class CustomUserManager(BaseUserManager):
@@ -83,18 +84,18 @@ class CustomUser(AbstractUser):
     
     @property
     def user_type(self):
-        """Get user type based on group membership"""
-        if self.groups.filter(name='Admin').exists():
-            return 'admin'
-        elif self.groups.filter(name='Developer').exists():
-            return 'developer'
-        elif self.groups.filter(name='Agent').exists():
-            return 'agent'
-        elif self.groups.filter(name='Seller').exists():
-            return 'seller'
-        elif self.groups.filter(name='Buyer').exists():
-            return 'buyer'
-        return 'buyer'  # default
+        """Get user type based on group membership.
+
+        Uses prefetched groups when available, otherwise a single query; the
+        result is kept on the instance until its groups change (see authapp.signals).
+        """
+        if '_resolved_user_type' not in self.__dict__:
+            if 'groups' in getattr(self, '_prefetched_objects_cache', {}):
+                group_names = [group.name for group in self.groups.all()]
+            else:
+                group_names = self.groups.filter(name__in=ROLE_GROUP_NAMES).values_list('name', flat=True)
+            self._resolved_user_type = resolve_user_type(group_names)
+        return self._resolved_user_type
     
     @property
     def is_approved(self):
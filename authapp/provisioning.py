@@ -0,0 +1,108 @@
+"""Per-user rows every account needs (default wishlist, role profile).
+
+They are created when an account is registered or approved, and their ids
+are cached so login only has to read them.
+"""
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+from authapp.roles import PROFILE_MODELS
+
+PROVISIONING_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def cache_key(user_id, user_type):
+    return f"authapp:provisioned:{user_id}:{user_type}"
+
+
+def provision_user(user, user_type=None):
+    """Create the wishlist and role profile if missing and cache their ids"""
+    from property.models import PropertyWishlist
+
+    user_type = user_type or user.user_type
+    wishlist_id = PropertyWishlist.objects.filter(created_by=user).order_by('id').values_list('id', flat=True).first()
+    if wishlist_id is None:
+        wishlist_id = PropertyWishlist.objects.create(
+            created_by=user,
+            name="My Wishlist",
+            description="My favorite properties",
+        ).id
+
+    profile_id = None
+    model_name = PROFILE_MODELS.get(user_type)
+    if model_name:
+        ProfileModel = apps.get_model("authapp", model_name)
+        profile_id = ProfileModel.objects.get_or_create(user=user)[0].id
+
+    ids = {'wishlist_id': wishlist_id, 'profile_id': profile_id}
+    # Only cache rows that exist: a rolled back transaction must not leave their ids behind
+    key = cache_key(user.id, user_type)
+    transaction.on_commit(lambda: cache.set(key, ids, PROVISIONING_CACHE_TIMEOUT))
+    return ids
+
+
+def provisioned_ids(user, user_type):
+    """Cached wishlist/profile ids, provisioning accounts created before this existed"""
+    ids = cache.get(cache_key(user.id, user_type))
+    if ids is None:
+        ids = provision_user(user, user_type)
+    return ids
+
+
+def provision_users(user_types):
+    """Bulk provision_user for a {user_id: user_type} map.
+
+    Accounts whose ids are already cached are skipped. For the rest, the
+    existing wishlists and profiles are read with one query per table,
+    missing wishlists are inserted in bulk, and everything is cached with
+    one set_many. Missing profiles are still created one by one, because
+    their save() derives completion fields (registration normally creates
+    them already).
+    """
+    from property.models import PropertyWishlist
+
+    cached = cache.get_many([cache_key(user_id, user_type) for user_id, user_type in user_types.items()])
+    pending = {
+        user_id: user_type for user_id, user_type in user_types.items()
+        if cache_key(user_id, user_type) not in cached
+    }
+    if not pending:
+        return
+
+    def wishlist_ids():
+        ids = {}
+        rows = PropertyWishlist.objects.filter(created_by_id__in=pending).order_by('-id').values_list('created_by_id', 'id')
+        for user_id, wishlist_id in rows:
+            ids[user_id] = wishlist_id  # ordered newest first, so the oldest wins
+        return ids
+
+    wishlists = wishlist_ids()
+    missing = [user_id for user_id in pending if user_id not in wishlists]
+    if missing:
+        PropertyWishlist.objects.bulk_create([
+            PropertyWishlist(created_by_id=user_id, name="My Wishlist", description="My favorite properties")
+            for user_id in missing
+        ])
+        # Some backends (MySQL) do not return ids from bulk inserts
+        wishlists = wishlist_ids()
+
+    profiles = {}
+    by_type = {}
+    for user_id, user_type in pending.items():
+        by_type.setdefault(user_type, []).append(user_id)
+    for user_type, user_ids in by_type.items():
+        model_name = PROFILE_MODELS.get(user_type)
+        if not model_name:
+            continue
+        ProfileModel = apps.get_model("authapp", model_name)
+        existing = dict(ProfileModel.objects.filter(user_id__in=user_ids).values_list('user_id', 'id'))
+        for user_id in user_ids:
+            if user_id not in existing:
+                existing[user_id] = ProfileModel.objects.get_or_create(user_id=user_id)[0].id
+        profiles.update(existing)
+
+    values = {
+        cache_key(user_id, user_type): {'wishlist_id': wishlists[user_id], 'profile_id': profiles.get(user_id)}
+        for user_id, user_type in pending.items()
+    }
+    transaction.on_commit(lambda: cache.set_many(values, PROVISIONING_CACHE_TIMEOUT))
@@ -0,0 +1,34 @@
+"""User roles are Django groups; these helpers map group names to a single user type"""
+
+# Highest precedence first, a user in several groups gets the first match
+ROLE_GROUPS = [
+    ('admin', 'Admin'),
+    ('developer', 'Developer'),
+    ('agent', 'Agent'),
+    ('seller', 'Seller'),
+    ('buyer', 'Buyer'),
+]
+ROLE_GROUP_NAMES = [group_name for user_type, group_name in ROLE_GROUPS]
+DEFAULT_USER_TYPE = 'buyer'
+
+PROFILE_MODELS = {
+    'buyer': 'BuyerProfile',
+    'seller': 'SellerProfile',
+    'agent': 'AgentProfile',
+    'developer': 'DeveloperProfile',
+    'admin': 'AdminProfile',
+}
+
+
+def resolve_user_type(group_names):
+    """Return the user type for a collection of group names"""
+    group_names = set(group_names)
+    for user_type, group_name in ROLE_GROUPS:
+        if group_name in group_names:
+            return user_type
+    return DEFAULT_USER_TYPE
+
+
+def is_admin(user):
+    """True for members of the Admin group; free for token-claims users, one query otherwise"""
+    return bool(user and user.is_authenticated and user.user_type == 'admin')
@@ -52,6 +52,7 @@ from authapp.serializers.group import (
     GroupUpdateSerializer,
     AddUsersToGroupSerializer,
     RemoveUsersFromGroupSerializer,
+    BulkGroupMembershipSerializer,
 )
 
 
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from authapp.models import CustomUser
+from authapp.provisioning import provision_user
 from common.serializers import BaseSerializer
 
 
@@ -36,6 +37,9 @@ class CustomUserCreateSerializer(BaseSerializer):
                 # assume Group instances or other iterable acceptable to set()
                 user.groups.set(groups)
 
+        if user.account_status == 'approved':
+            provision_user(user)
+
         return user
 
 class CustomUserListSerializer(BaseSerializer):
@@ -158,4 +162,8 @@ class CustomUserUpdateSerializer(BaseSerializer):
             else:
                 instance.groups.set(groups)
 
+        # Approval (or a role change of an approved user) creates the rows login relies on
+        if instance.account_status == 'approved' and ('account_status' in validated_data or groups is not None):
+            provision_user(instance)
+
         return instance
\ No newline at end of file
@@ -22,6 +22,8 @@ class GroupListSerializer(serializers.ModelSerializer):
     
     def get_user_count(self, obj):
         """Return the number of users in this group"""
+        if hasattr(obj, 'user_count'):
+            return obj.user_count
         return obj.user_set.count()
 
 
@@ -37,6 +39,8 @@ class GroupDetailSerializer(serializers.ModelSerializer):
     
     def get_user_count(self, obj):
         """Return the number of users in this group"""
+        if hasattr(obj, 'user_count'):
+            return obj.user_count
         return obj.user_set.count()
     
     def get_users(self, obj):
@@ -118,3 +122,36 @@ class RemoveUsersFromGroupSerializer(serializers.Serializer):
         if invalid_ids:
             raise serializers.ValidationError(f"Invalid user IDs: {', '.join(map(str, invalid_ids))}")
         return value
+
+
+class BulkGroupMembershipSerializer(serializers.Serializer):
+    """Serializer for adding or removing a large set of users, given by id or by user filter"""
+    operation = serializers.ChoiceField(choices=['add', 'remove'])
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        help_text="User IDs to add or remove; unknown IDs are skipped"
+    )
+    filter = serializers.DictField(
+        required=False,
+        allow_empty=False,
+        help_text="Users list filter parameters, e.g. {\"user_type\": \"buyer\", \"account_status\": \"approved\"}"
+    )
+
+    def validate(self, attrs):
+        if ('user_ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("Provide exactly one of 'user_ids' or 'filter'")
+        if 'filter' in attrs:
+            from authapp.filters import CustomUserFilter
+            from authapp.models import CustomUser
+            # CustomUserFilter ignores unknown and empty keys, which would select every user
+            unknown = sorted(set(attrs['filter']) - set(CustomUserFilter.base_filters))
+            if unknown:
+                raise serializers.ValidationError({'filter': f"Unknown filters: {', '.join(unknown)}"})
+            if all(value in ('', None, []) for value in attrs['filter'].values()):
+                raise serializers.ValidationError({'filter': "At least one filter needs a value"})
+            user_filter = CustomUserFilter(data=attrs['filter'], queryset=CustomUser.objects.all())
+            if not user_filter.is_valid():
+                raise serializers.ValidationError({'filter': user_filter.errors})
+            attrs['queryset'] = user_filter.qs
+        return attrs
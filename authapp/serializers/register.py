@@ -1,6 +1,7 @@
 
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError as DjangoValidationError
 
@@ -166,4 +167,35 @@ class AccountApprovalSerializer(serializers.Serializer):
                 'action': 'User account is already approved.'
             })
         
-        return attrs
\ No newline at end of file
+        return attrs
+
+class BulkAccountApprovalSerializer(serializers.Serializer):
+    """Serializer for reviewing many accounts at once"""
+    
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=5000,
+        help_text="IDs of the accounts to review"
+    )
+    action = serializers.ChoiceField(choices=AccountApprovalSerializer.STATUS_CHOICES, default='approved')
+    notes = serializers.CharField(max_length=1000, required=False)
+    rejection_reason = serializers.CharField(max_length=500, required=False)
+    group = serializers.SlugRelatedField(
+        slug_field='name',
+        queryset=Group.objects.all(),
+        required=False,
+        help_text="Group (role) to add the accounts to, e.g. 'Agent'"
+    )
+    verify_profiles = serializers.BooleanField(
+        default=True,
+        help_text="Mark agent, developer and seller profiles verified (or rejected) with the account"
+    )
+    notify = serializers.BooleanField(default=True, help_text="Email each user about the decision")
+
+    def validate(self, attrs):
+        if attrs['action'] == 'rejected' and not attrs.get('rejection_reason'):
+            raise serializers.ValidationError({
+                'rejection_reason': 'Rejection reason is required when rejecting an account.'
+            })
+        return attrs
@@ -0,0 +1,38 @@
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from authapp.models import CustomUser
+from authapp.membership import MEMBER_PAGE_FIELDS, bump_membership_version
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def reset_cached_user_type(sender, instance, action, **kwargs):
+    # Only the instance whose groups were edited is known here
+    if isinstance(instance, CustomUser):
+        instance.__dict__.pop('_resolved_user_type', None)
+    # Batched changes (authapp.membership) arrive as a single signal
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_membership_version)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_permissions_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_membership_version)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, **kwargs):
+    # Group stats and member pages are cached under the membership version
+    transaction.on_commit(bump_membership_version)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def member_changed(sender, created=False, update_fields=None, **kwargs):
+    # New accounts are in no group yet; saves of columns member pages do not show change nothing
+    if created or (update_fields is not None and not MEMBER_PAGE_FIELDS & set(update_fields)):
+        return
+    transaction.on_commit(bump_membership_version)
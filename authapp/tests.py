@@ -1,3 +1,294 @@
+from datetime import timedelta
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from unittest import mock
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from common.models import BackgroundJob
+from property.models import PropertyWishlist
+from .approval import review_accounts
+from .authentication import ClaimsJWTAuthentication, ClaimsUser
+from .membership import add_members, membership_version, remove_members
+from .models import BuyerProfile, CustomUser
+from .provisioning import cache_key
+from .tokens import BlacklistCache
+from .viewsets.register import DashboardViewSet
 
-# Create your tests here.
+
+class AuthTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        for name in ['Admin', 'Agent', 'Buyer', 'Seller', 'Developer']:
+            Group.objects.get_or_create(name=name)
+        cls.buyer = CustomUser.objects.create_user(
+            'buyer@example.com', 'pw12345!', first_name='Bea', account_status='approved'
+        )
+        cls.buyer.groups.add(Group.objects.get(name='Buyer'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def login(self, email='buyer@example.com', password='pw12345!'):
+        return self.client.post('/api/authentication/login/', {'email': email, 'password': password}, format='json')
+
+
+class LoginTests(AuthTestMixin, TestCase):
+    def test_login_provisions_once_and_then_only_reads(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user_type'], 'buyer')
+        self.assertEqual(response.data['wishlist_id'], PropertyWishlist.objects.get(created_by=self.buyer).id)
+        self.assertEqual(response.data['profile_id'], BuyerProfile.objects.get(user=self.buyer).id)
+
+        with self.assertNumQueries(3):  # the user row, its groups and the outstanding token
+            again = self.login()
+        self.assertEqual(again.data['wishlist_id'], response.data['wishlist_id'])
+        self.assertEqual(PropertyWishlist.objects.filter(created_by=self.buyer).count(), 1)
+
+    def test_wrong_password_and_unapproved_accounts_are_refused(self):
+        self.assertEqual(self.login(password='wrong').status_code, 401)
+        self.assertEqual(self.login(email='nobody@example.com').status_code, 401)
+
+        CustomUser.objects.create_user('pending@example.com', 'pw12345!', account_status='pending_review')
+        response = self.login(email='pending@example.com')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data['account_status'], 'pending_review')
+
+
+class ClaimsAuthenticationTests(AuthTestMixin, TestCase):
+    def authenticate(self, method, access):
+        request = getattr(APIRequestFactory(), method)('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        return ClaimsJWTAuthentication().authenticate(request)[0]
+
+    def test_reads_use_token_claims_and_writes_load_the_user(self):
+        access = self.login().data['access']
+
+        with self.assertNumQueries(0):
+            user = self.authenticate('get', access)
+            self.assertIsInstance(user, ClaimsUser)
+            self.assertEqual((user.id, user.user_type, user.account_status), (self.buyer.id, 'buyer', 'approved'))
+        # Anything else comes from the row, loaded on first use
+        self.assertEqual(user.first_name, 'Bea')
+
+        self.assertIsInstance(self.authenticate('post', access), CustomUser)
+
+    def test_refresh_picks_up_role_changes(self):
+        refresh = self.login().data['refresh']
+        self.buyer.groups.add(Group.objects.get(name='Agent'))
+
+        response = self.client.post('/api/authentication/refresh-token/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.authenticate('get', response.data['access']).user_type, 'agent')
+
+    def test_dashboard_reads_the_user_row(self):
+        access = self.login().data['access']
+        dashboard_data = DashboardViewSet.as_view({'get': 'dashboard_data'})
+
+        def get():
+            return dashboard_data(APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}'))
+
+        # The token still says 'approved'
+        CustomUser.objects.filter(pk=self.buyer.pk).update(account_status='rejected', rejection_reason='Incomplete')
+        response = get()
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual((response.data['account_status'], response.data['rejection_reason']), ('rejected', 'Incomplete'))
+
+        # A suspended (inactive) account is refused even with an unexpired access token
+        CustomUser.objects.filter(pk=self.buyer.pk).update(account_status='suspended', is_active=False)
+        self.assertEqual(get().status_code, 401)
+
+
+class BlacklistCacheTests(AuthTestMixin, TestCase):
+    def blacklist(self, jti, row_id, blacklisted_at):
+        token = OutstandingToken.objects.create(
+            user=self.buyer, jti=jti, token=jti, expires_at=timezone.now() + timedelta(days=1)
+        )
+        BlacklistedToken.objects.create(id=row_id, token=token)
+        BlacklistedToken.objects.filter(id=row_id).update(blacklisted_at=blacklisted_at)
+
+    def test_sync_sees_rows_committed_out_of_order(self):
+        blacklist_cache = BlacklistCache()
+        self.blacklist('later', 100, timezone.now())
+        blacklist_cache.sync()
+        self.assertTrue(blacklist_cache.contains('later'))
+
+        # Blacklisted (id and timestamp assigned) before the sync, committed after it
+        self.blacklist('earlier', 50, timezone.now() - timedelta(seconds=5))
+        self.assertFalse(blacklist_cache.contains('earlier'))
+        blacklist_cache.sync()
+        self.assertTrue(blacklist_cache.contains('earlier'))
+
+    def test_logged_out_refresh_token_is_refused(self):
+        refresh = self.login().data['refresh']
+        self.assertEqual(self.client.post('/api/authentication/logout/', {'refresh': refresh}, format='json').status_code, 200)
+        response = self.client.post('/api/authentication/refresh-token/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class GroupMembershipTests(AuthTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = CustomUser.objects.create_user('admin@example.com', 'pw12345!', account_status='approved')
+        self.admin.groups.add(Group.objects.get(name='Admin'))
+        self.client.force_authenticate(self.admin)
+        self.group = Group.objects.create(name='Newsletter')
+        self.users = [CustomUser.objects.create_user(f'member{i}@example.com', 'pw12345!') for i in range(3)]
+
+    def test_add_and_remove_users_in_one_batch(self):
+        ids = [user.id for user in self.users]
+        with self.assertNumQueries(4):  # current members, savepoint, insert, release
+            added, existing = add_members(self.group, ids[:2])
+        self.assertEqual((added, existing), (set(ids[:2]), set()))
+
+        response = self.client.post(f'/api/groups/{self.group.id}/add-users/', {'user_ids': ids}, format='json')
+        self.assertEqual(response.data['added_count'], 1)
+        self.assertEqual(response.data['total_users_in_group'], 3)
+
+        removed, missing = remove_members(self.group, [ids[0], self.buyer.id])
+        self.assertEqual((removed, missing), ({ids[0]}, {self.buyer.id}))
+        self.assertEqual(self.group.user_set.count(), 2)
+
+    def test_only_admins_change_groups(self):
+        self.client.force_authenticate(self.buyer)
+        admin_group = Group.objects.get(name='Admin')
+        requests = [
+            ('post', f'/api/groups/{admin_group.id}/add-users/', {'user_ids': [self.buyer.id]}),
+            ('post', f'/api/groups/{admin_group.id}/bulk-membership/', {'operation': 'add', 'user_ids': [self.buyer.id]}),
+            ('post', f'/api/groups/{admin_group.id}/remove-users/', {'user_ids': [self.admin.id]}),
+            ('post', '/api/groups/', {'name': 'Staff'}),
+            ('patch', f'/api/groups/{self.group.id}/', {'name': 'Renamed'}),
+            ('delete', f'/api/groups/{self.group.id}/', None),
+        ]
+        for method, url, data in requests:
+            response = getattr(self.client, method)(url, data, format='json')
+            self.assertEqual(response.status_code, 403, url)
+        self.assertFalse(self.buyer.groups.filter(name='Admin').exists())
+        self.assertTrue(self.admin.groups.filter(name='Admin').exists())
+        self.assertTrue(Group.objects.filter(name='Newsletter').exists())
+        # Reading stays open to signed-in users
+        self.assertEqual(self.client.get(f'/api/groups/{self.group.id}/').status_code, 200)
+
+    def test_bulk_membership_applies_every_chunk_before_responding(self):
+        url = f'/api/groups/{self.group.id}/bulk-membership/'
+        for user_filter in ({}, {'account_status': ''}, {'acount_status': 'approved'}):
+            response = self.client.post(url, {'operation': 'add', 'filter': user_filter}, format='json')
+            self.assertEqual(response.status_code, 400, user_filter)
+        self.assertFalse(self.group.user_set.exists())
+
+        CustomUser.objects.filter(id__in=[user.id for user in self.users]).update(account_status='approved')
+        response = self.client.post(url, {'operation': 'add', 'filter': {'account_status': 'approved'}}, format='json')
+        self.assertEqual(response.status_code, 200)
+        # The three members, the buyer and the admin
+        self.assertEqual((response.data['processed'], response.data['changed']), (5, 5))
+        self.assertEqual(response.data['chunks'], [{'processed': 5, 'changed': 5}])
+        self.assertEqual(self.group.user_set.count(), 5)
+
+    def test_membership_version_is_shared_and_survives_the_cache(self):
+        before = membership_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            add_members(self.group, [self.users[0].id])
+        cache.clear()
+        self.assertEqual(membership_version(), before + 1)
+
+
+class GroupMembersPageTests(AuthTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.buyer)
+        self.group = Group.objects.create(name='Newsletter')
+        self.member = CustomUser.objects.create_user('member@example.com', 'pw12345!', first_name='Old',
+                                                     account_status='approved')
+        add_members(self.group, [self.member.id, self.buyer.id])
+
+    def members(self):
+        response = self.client.get(f'/api/groups/{self.group.id}/members/', {'page_size': 1})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_page_reports_total_members(self):
+        data = self.members()
+        self.assertEqual(data['total_members'], 2)
+        self.assertEqual(len(data['results']), 1)
+
+    def test_cached_page_follows_member_changes(self):
+        self.assertEqual(self.members()['results'][0]['first_name'], 'Bea')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.buyer.first_name = 'New'
+            self.buyer.save(update_fields=['first_name'])
+        self.assertEqual(self.members()['results'][0]['first_name'], 'New')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            review_accounts([self.buyer.id], 'suspended', reviewer=None, notify=False)
+        row = self.members()['results'][0]
+        self.assertEqual((row['account_status'], row['is_active']), ('suspended', False))
+
+    def test_unrelated_saves_keep_the_cache(self):
+        self.members()
+        version = membership_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.buyer.save(update_fields=['last_login'])
+        self.assertEqual(membership_version(), version)
+
+
+class BulkAccountReviewTests(AuthTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = CustomUser.objects.create_user('admin@example.com', 'pw12345!', account_status='approved')
+        self.admin.groups.add(Group.objects.get(name='Admin'))
+        self.client.force_authenticate(self.admin)
+        self.pending = [
+            CustomUser.objects.create_user(f'applicant{i}@example.com', 'pw12345!', account_status='pending_review',
+                                           is_active=False)
+            for i in range(2)
+        ]
+
+    def review(self, **data):
+        return self.client.post('/api/users/bulk-approve/', data, format='json')
+
+    def test_approves_provisions_and_notifies_in_bulk(self):
+        ids = [user.id for user in self.pending] + [self.buyer.id]
+        response = self.review(user_ids=ids, group='Agent')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(response.data['skipped'], [self.buyer.id])
+
+        for user in self.pending:
+            user.refresh_from_db()
+            self.assertEqual((user.account_status, user.is_active, user.user_type), ('approved', True, 'agent'))
+            self.assertTrue(PropertyWishlist.objects.filter(created_by=user).exists())
+        self.assertEqual(BackgroundJob.objects.filter(name='send_email').count(), 2)
+
+    def test_rejection_needs_a_reason_and_an_admin(self):
+        ids = [self.pending[0].id]
+        self.assertEqual(self.review(user_ids=ids, action='rejected').status_code, 400)
+
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.review(user_ids=ids).status_code, 403)
+        self.pending[0].refresh_from_db()
+        self.assertEqual(self.pending[0].account_status, 'pending_review')
+
+    def test_failed_review_leaves_nothing_cached(self):
+        ids = [user.id for user in self.pending]
+        with mock.patch('authapp.approval.enqueue_many', side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError), self.captureOnCommitCallbacks(execute=True):
+            review_accounts(ids, 'approved', self.admin)
+        self.assertEqual(cache.get_many([cache_key(user_id, 'buyer') for user_id in ids]), {})
+        self.assertFalse(PropertyWishlist.objects.filter(created_by_id__in=ids).exists())
+
+    def test_suspension_blacklists_issued_tokens(self):
+        tokens = self.login().data
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.review(user_ids=[self.buyer.id], action='suspended')
+        self.assertEqual((response.status_code, response.data['tokens_blacklisted']), (200, 1))
+
+        refreshed = self.client.post('/api/authentication/refresh-token/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(refreshed.status_code, 400)
+        # Reads authenticated from the access token's claims end too
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        with self.assertRaises(AuthenticationFailed):
+            ClaimsJWTAuthentication().authenticate(request)
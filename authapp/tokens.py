@@ -0,0 +1,102 @@
+import threading
+import time
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+# Access tokens carry the JTI of their refresh token, so claims-only reads can see it blacklisted
+REFRESH_JTI_CLAIM = 'refresh_jti'
+
+
+class BlacklistCache:
+    """In-process set of blacklisted, unexpired refresh token JTIs.
+
+    Warmed on first use, then kept current at most every SYNC_INTERVAL
+    seconds by reading the rows blacklisted since the previous sync, plus
+    direct inserts from logouts handled by this process. The query reaches
+    SYNC_OVERLAP further back, because a row becomes visible when its
+    transaction commits, which can be after rows blacklisted later (ids and
+    timestamps are assigned before the commit). A logout served by another
+    process is therefore seen within SYNC_INTERVAL.
+    """
+    SYNC_INTERVAL = 10
+    SYNC_OVERLAP = timedelta(minutes=1)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._expiries = {}
+        self._since = None
+        self._synced_at = 0
+
+    def sync(self):
+        now = timezone.now()
+        queryset = BlacklistedToken.objects.filter(token__expires_at__gt=now)
+        if self._since is not None:
+            queryset = queryset.filter(blacklisted_at__gte=self._since)
+        rows = list(queryset.values_list('token__jti', 'token__expires_at'))
+
+        with self._lock:
+            for jti, expires_at in rows:
+                self._expiries[jti] = expires_at
+            self._since = now - self.SYNC_OVERLAP
+            # Expired tokens fail validation on their own, no need to remember them
+            self._expiries = {jti: expires_at for jti, expires_at in self._expiries.items() if expires_at > now}
+            self._synced_at = time.monotonic()
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._expiries[jti] = expires_at
+
+    def contains(self, jti):
+        if jti in self._expiries:
+            return True
+        if time.monotonic() - self._synced_at > self.SYNC_INTERVAL:
+            self.sync()
+            return jti in self._expiries
+        return False
+
+
+blacklist_cache = BlacklistCache()
+
+
+class CachedRefreshToken(RefreshToken):
+    """Refresh token whose blacklist check reads blacklist_cache instead of the database"""
+
+    def check_blacklist(self):
+        if blacklist_cache.contains(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_cache.add(self.payload[api_settings.JTI_CLAIM], datetime_from_epoch(self.payload['exp']))
+        return result
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        access[REFRESH_JTI_CLAIM] = self.payload[api_settings.JTI_CLAIM]
+        return access
+
+
+def blacklist_user_tokens(user_ids):
+    """Blacklist every unexpired refresh token of `user_ids`; returns how many were added"""
+    tokens = list(
+        OutstandingToken.objects.filter(user_id__in=user_ids, expires_at__gt=timezone.now(), blacklistedtoken__isnull=True)
+        .values_list('id', 'jti', 'expires_at')
+    )
+    BlacklistedToken.objects.bulk_create(
+        [BlacklistedToken(token_id=token_id) for token_id, jti, expires_at in tokens], ignore_conflicts=True
+    )
+
+    def remember():
+        for token_id, jti, expires_at in tokens:
+            blacklist_cache.add(jti, expires_at)
+
+    transaction.on_commit(remember)
+    return len(tokens)
@@ -9,6 +9,7 @@ from authapp.serializers.address import (
     AddressDetailSerializer,
     AddressUpdateSerializer,
 )
+from authapp.roles import is_admin
 
 class AddressViewSet(BaseViewSet):
     queryset = Address.objects.all()
@@ -19,9 +20,9 @@ class AddressViewSet(BaseViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.groups.filter(name="Admin").exists():
+        if is_admin(user):
             return CustomUser.objects.all()
-        return CustomUser.objects.filter(created_by=user)
+        return CustomUser.objects.filter(created_by_id=user.id)
 
     def get_serializer_class(self):
         if self.action == "list":
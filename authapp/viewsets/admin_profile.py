@@ -9,6 +9,7 @@ from authapp.serializers import (
     AdminProfileUpdateSerializer,
 )
 from authapp.models import AdminProfile
+from authapp.roles import is_admin
 
 class AdminProfileViewSet(BaseViewSet):
     queryset = AdminProfile.objects.all()
@@ -19,9 +20,9 @@ class AdminProfileViewSet(BaseViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.groups.filter(name="Admin").exists():
+        if is_admin(user):
             return AdminProfile.objects.all()
-        return AdminProfile.objects.filter(created_by=user)
+        return AdminProfile.objects.filter(created_by_id=user.id)
 
     def get_serializer_class(self):
         if self.action == "list":
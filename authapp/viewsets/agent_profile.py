@@ -9,6 +9,7 @@ from authapp.serializers.agent_profile import (
     AgentProfileDetailSerializer,
     AgentProfileUpdateSerializer,
 )
+from authapp.roles import is_admin
 
 class AgentProfileViewSet(BaseViewSet):
     queryset = AgentProfile.objects.all()
@@ -18,9 +19,9 @@ class AgentProfileViewSet(BaseViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.groups.filter(name="Admin").exists():
+        if is_admin(user):
             return AgentProfile.objects.all()
-        return AgentProfile.objects.filter(created_by=user)
+        return AgentProfile.objects.filter(created_by_id=user.id)
 
     def get_serializer_class(self):
         if self.action == "list":
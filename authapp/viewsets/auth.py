@@ -1,14 +1,18 @@
-from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth import get_user_model
 from drf_spectacular.utils import extend_schema
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import TokenError
 from authapp.serializers.auth import (
     LoginSerializer, LoginResponseSerializer,
     LogoutSerializer, RefreshTokenSerializer,
 )
-from property.models import PropertyWishlist
+from authapp.authentication import tokens_for_user
+from authapp.tokens import CachedRefreshToken
+from authapp.provisioning import provisioned_ids
+from authapp.roles import resolve_user_type
 
 User = get_user_model()
 
@@ -16,7 +20,7 @@ User = get_user_model()
 class AuthViewSet(viewsets.ViewSet):
     """
     JWT Authentication ViewSet:
-    - Login (auto creates profile if missing)
+    - Login (returns the wishlist and profile ids created at registration/approval)
     - Refresh access token
     - Logout (blacklist refresh)
     """
@@ -24,7 +28,7 @@ class AuthViewSet(viewsets.ViewSet):
     @extend_schema(
         request=LoginSerializer,
         responses=LoginResponseSerializer,
-        summary="Login with email & password (auto create profile)",
+        summary="Login with email & password",
     )
     @action(detail=False, methods=["post"])
     def login(self, request):
@@ -51,45 +55,23 @@ class AuthViewSet(viewsets.ViewSet):
                 status=403,
             )
 
-        # Authenticate
-        user = authenticate(request, username=email, password=password)
-        if not user:
+        # Verify the password on the row already loaded instead of authenticate(), which fetches it again
+        if not user.check_password(password):
             return Response({"error": "Invalid email or password"}, status=401)
         if not user.is_active:
             return Response({"error": "Account is inactive"}, status=403)
 
-        # Generate tokens
-        refresh = RefreshToken.for_user(user)
         groups = list(user.groups.values("id", "name"))
+        user_type = resolve_user_type(group["name"] for group in groups)
+        user._resolved_user_type = user_type
 
-        # Ensure wishlist exists
-        wishlist, _ = PropertyWishlist.objects.get_or_create(
-            created_by=user,
-            defaults={"name": "My Wishlist", "description": "My favorite properties"},
-        )
-
-        # Auto-create profile if missing
-        profile_id = None
-        user_type = getattr(user, "user_type", None)
-        profile_model_map = {
-            "buyer": "BuyerProfile",
-            "seller": "SellerProfile",
-            "agent": "AgentProfile",
-            "developer": "DeveloperProfile",
-            "admin": "AdminProfile",
-        }
+        # Generate tokens, role claims let read-only requests skip the user lookup
+        refresh = tokens_for_user(user, user_type, [group["id"] for group in groups])
 
-        model_name = profile_model_map.get(user_type)
-        if model_name:
-            try:
-                from django.apps import apps
-                ProfileModel = apps.get_model("authapp", model_name)
-                profile, created = ProfileModel.objects.get_or_create(user=user)
-                profile_id = profile.id
-                if created:
-                    print(f"✅ Created new {model_name} for {user.email}")
-            except Exception as e:
-                print(f"❌ Profile creation failed for {user.email}: {e}")
+        # Wishlist and profile are created at registration/approval, login only reads their ids
+        ids = provisioned_ids(user, user_type)
+        wishlist_id = ids["wishlist_id"]
+        profile_id = ids["profile_id"]
 
         # Build response
         data = {
@@ -102,7 +84,7 @@ class AuthViewSet(viewsets.ViewSet):
             "last_name": user.last_name,
             "groups": groups,
             "user_type": user_type,
-            "wishlist_id": wishlist.id,
+            "wishlist_id": wishlist_id,
         }
         if profile_id:
             data["profile_id"] = profile_id
@@ -118,11 +100,22 @@ class AuthViewSet(viewsets.ViewSet):
         serializer = RefreshTokenSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         try:
-            token = RefreshToken(serializer.validated_data["refresh"])
-            return Response({"access": str(token.access_token)}, status=200)
+            token = CachedRefreshToken(serializer.validated_data["refresh"])
         except TokenError:
             return Response({"error": "Invalid or expired refresh token"}, status=400)
 
+        user = User.objects.filter(pk=token.get(api_settings.USER_ID_CLAIM), is_active=True).first()
+        if not user:
+            return Response({"error": "Invalid or expired refresh token"}, status=400)
+
+        # Re-read the role claims so role and status changes reach the new access token
+        groups = list(user.groups.values_list("id", "name"))
+        access = token.access_token
+        access["user_type"] = resolve_user_type(name for group_id, name in groups)
+        access["account_status"] = user.account_status
+        access["group_ids"] = [group_id for group_id, name in groups]
+        return Response({"access": str(access)}, status=200)
+
     @extend_schema(
         request=LogoutSerializer,
         summary="Logout (blacklist refresh token)",
@@ -132,7 +125,7 @@ class AuthViewSet(viewsets.ViewSet):
         serializer = LogoutSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         try:
-            token = RefreshToken(serializer.validated_data["refresh"])
+            token = CachedRefreshToken(serializer.validated_data["refresh"])
             token.blacklist()
             return Response({"success": "Logged out successfully"}, status=200)
         except TokenError:
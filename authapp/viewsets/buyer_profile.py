@@ -9,6 +9,7 @@ from authapp.serializers import (
     BuyerProfileDetailSerializer,
     BuyerProfileUpdateSerializer,
 )
+from authapp.roles import is_admin
 
 class BuyerProfileViewSet(BaseViewSet):
     queryset = BuyerProfile.objects.all()
@@ -18,9 +19,9 @@ class BuyerProfileViewSet(BaseViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.groups.filter(name="Admin").exists():
+        if is_admin(user):
             return BuyerProfile.objects.all()
-        return BuyerProfile.objects.filter(user=user)
+        return BuyerProfile.objects.filter(user_id=user.id)
     
     def get_serializer_class(self):
         if self.action == "list":
@@ -1,9 +1,13 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from common.paginator import Pagination
+from authapp.approval import review_accounts
 from authapp.filters import CustomUserFilter
 from authapp.models import CustomUser
+from authapp.roles import is_admin
+from authapp.serializers.register import BulkAccountApprovalSerializer
 
 from authapp.serializers.customuser import (
     CustomUserCreateSerializer,
@@ -34,7 +38,39 @@ class CustomUserViewSet(viewsets.ModelViewSet):
             return CustomUserCreateSerializer
         elif self.action in ["update", "partial_update"]:
             return CustomUserUpdateSerializer
+        elif self.action == "bulk_approve":
+            return BulkAccountApprovalSerializer
         return CustomUserDetailSerializer
 
+    @action(detail=False, methods=['post'], url_path='bulk-approve')
+    def bulk_approve(self, request):
+        """
+        Approve, reject or suspend many accounts in one request.
+
+        Accounts are updated with a single UPDATE, role profiles are verified
+        in bulk, approved accounts are provisioned and notification emails are
+        queued for the background worker.
+        """
+        if not is_admin(request.user):
+            return Response({"error": "Only admins can review accounts"}, status=status.HTTP_403_FORBIDDEN)
+        serializer = BulkAccountApprovalSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        result = review_accounts(
+            data['user_ids'],
+            data['action'],
+            request.user,
+            rejection_reason=data.get('rejection_reason'),
+            notes=data.get('notes'),
+            group=data.get('group'),
+            verify_profiles=data['verify_profiles'],
+            notify=data['notify'],
+        )
+        return Response({
+            "message": f"{result['updated']} account(s) {data['action']}",
+            **result
+        }, status=status.HTTP_200_OK)
+
 
 
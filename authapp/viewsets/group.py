@@ -1,9 +1,13 @@
+import hashlib
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from common.viewset import BaseViewSet
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from common.paginator import Pagination
 from authapp.serializers.group import (
     GroupListSerializer,
@@ -11,10 +15,38 @@ from authapp.serializers.group import (
     GroupCreateSerializer,
     GroupUpdateSerializer,
     AddUsersToGroupSerializer,
-    RemoveUsersFromGroupSerializer
+    RemoveUsersFromGroupSerializer,
+    BulkGroupMembershipSerializer
 )
+from authapp.membership import add_members, remove_members, id_chunks, membership_version
+from authapp.roles import ROLE_GROUP_NAMES, is_admin
 from authapp.models import CustomUser
 
+GROUP_CACHE_TIMEOUT = 60 * 10
+
+
+def cache_key(*parts):
+    """Cache key that changes whenever group membership or groups change (see authapp.signals)"""
+    digest = hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+    return f"authapp:groups:{membership_version()}:{digest}"
+
+
+def count_subquery(model, field, **filters):
+    counts = model.objects.filter(**filters).order_by().values(field).annotate(count=Count('*')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def with_counts(queryset, permissions=True):
+    """Annotate member (and permission) counts as correlated subqueries, avoiding a join fan-out"""
+    queryset = queryset.annotate(
+        user_count=count_subquery(CustomUser.groups.through, 'group_id', group_id=OuterRef('pk'))
+    )
+    if permissions:
+        queryset = queryset.annotate(
+            permission_count=count_subquery(Group.permissions.through, 'group_id', group_id=OuterRef('pk'))
+        )
+    return queryset
+
 
 class GroupViewSet(viewsets.ModelViewSet):
     """
@@ -26,9 +58,18 @@ class GroupViewSet(viewsets.ModelViewSet):
     - Viewing group members
     """
     queryset = Group.objects.all().order_by('name')
-    permission_classes = [IsAuthenticated]  # Only admins can manage groups
+    permission_classes = [IsAuthenticated]
     pagination_class = Pagination
     http_method_names = ['get', 'post', 'patch', 'delete']
+    # Groups are roles (is_admin reads the Admin group), so only admins may change them
+    ADMIN_ACTIONS = {
+        'create', 'update', 'partial_update', 'destroy', 'add_users', 'remove_users', 'bulk_membership',
+    }
+
+    def check_permissions(self, request):
+        super().check_permissions(request)
+        if self.action in self.ADMIN_ACTIONS and not is_admin(request.user):
+            self.permission_denied(request, message="Only admins can manage groups")
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -41,8 +82,16 @@ class GroupViewSet(viewsets.ModelViewSet):
             return AddUsersToGroupSerializer
         elif self.action == 'remove_users':
             return RemoveUsersFromGroupSerializer
+        elif self.action == 'bulk_membership':
+            return BulkGroupMembershipSerializer
         return GroupDetailSerializer
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ['list', 'retrieve']:
+            queryset = with_counts(queryset, permissions=False)
+        return queryset
+    
     @action(detail=True, methods=['post'], url_path='add-users')
     def add_users(self, request, pk=None):
         """Add users to this group"""
@@ -50,19 +99,8 @@ class GroupViewSet(viewsets.ModelViewSet):
         serializer = AddUsersToGroupSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        user_ids = serializer.validated_data['user_ids']
-        users = CustomUser.objects.filter(id__in=user_ids)
-        
-        # Add users to the group
-        added_count = 0
-        already_in_group = []
-        
-        for user in users:
-            if not group.user_set.filter(id=user.id).exists():
-                group.user_set.add(user)
-                added_count += 1
-            else:
-                already_in_group.append(user.email)
+        added, existing = add_members(group, serializer.validated_data['user_ids'])
+        added_count = len(added)
         
         response_data = {
             'message': f'Successfully added {added_count} user(s) to group "{group.name}"',
@@ -72,8 +110,10 @@ class GroupViewSet(viewsets.ModelViewSet):
             'total_users_in_group': group.user_set.count()
         }
         
-        if already_in_group:
-            response_data['already_in_group'] = already_in_group
+        if existing:
+            response_data['already_in_group'] = list(
+                CustomUser.objects.filter(id__in=existing).values_list('email', flat=True)
+            )
         
         return Response(response_data, status=status.HTTP_200_OK)
     
@@ -84,19 +124,8 @@ class GroupViewSet(viewsets.ModelViewSet):
         serializer = RemoveUsersFromGroupSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        user_ids = serializer.validated_data['user_ids']
-        users = CustomUser.objects.filter(id__in=user_ids)
-        
-        # Remove users from the group
-        removed_count = 0
-        not_in_group = []
-        
-        for user in users:
-            if group.user_set.filter(id=user.id).exists():
-                group.user_set.remove(user)
-                removed_count += 1
-            else:
-                not_in_group.append(user.email)
+        removed, missing = remove_members(group, serializer.validated_data['user_ids'])
+        removed_count = len(removed)
         
         response_data = {
             'message': f'Successfully removed {removed_count} user(s) from group "{group.name}"',
@@ -106,20 +135,65 @@ class GroupViewSet(viewsets.ModelViewSet):
             'total_users_in_group': group.user_set.count()
         }
         
-        if not_in_group:
-            response_data['not_in_group'] = not_in_group
+        if missing:
+            response_data['not_in_group'] = list(
+                CustomUser.objects.filter(id__in=missing).values_list('email', flat=True)
+            )
         
         return Response(response_data, status=status.HTTP_200_OK)
     
+    @action(detail=True, methods=['post'], url_path='bulk-membership')
+    def bulk_membership(self, request, pk=None):
+        """
+        Add or remove a large set of users, reporting progress per chunk.
+        
+        Users come from `user_ids` or from `filter` (the users list filters).
+        They are processed in chunks of MEMBERSHIP_CHUNK_SIZE, each chunk in
+        its own transaction with one membership signal. Every chunk is applied
+        before the response is sent, so the outcome never depends on the client
+        reading it; `chunks` lists the running totals after each one.
+        """
+        group = self.get_object()
+        serializer = BulkGroupMembershipSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        change = add_members if data['operation'] == 'add' else remove_members
+        
+        processed = changed = 0
+        progress = []
+        for chunk in id_chunks(user_ids=data.get('user_ids'), queryset=data.get('queryset')):
+            changed_ids, _ = change(group, chunk)
+            processed += len(chunk)
+            changed += len(changed_ids)
+            progress.append({'processed': processed, 'changed': changed})
+        
+        return Response({
+            'operation': data['operation'],
+            'group_id': group.id,
+            'group_name': group.name,
+            'processed': processed,
+            'changed': changed,
+            'chunks': progress,
+            'total_users_in_group': group.user_set.count(),
+        }, status=status.HTTP_200_OK)
+    
     @action(detail=True, methods=['get'], url_path='members')
     def members(self, request, pk=None):
-        """Get all members (users) in this group"""
-        group = self.get_object()
-        users = group.user_set.all()
+        """
+        Get the members (users) of this group, one page at a time.
         
-        # Paginate the results
-        page = self.paginate_queryset(users)
-        if page is not None:
+        Each member's role comes from their role groups, prefetched for the
+        whole page in one query. Pages are cached under the membership version,
+        which changes with memberships, groups and the user fields shown here.
+        """
+        group = self.get_object()
+        key = cache_key('group-members', group.id, request.build_absolute_uri())
+        data = cache.get(key)
+        if data is None:
+            users = group.user_set.order_by('id').prefetch_related(
+                Prefetch('groups', queryset=Group.objects.filter(name__in=ROLE_GROUP_NAMES).only('id', 'name'))
+            )
+            page = self.paginate_queryset(users)
             user_data = [
                 {
                     'id': user.id,
@@ -135,48 +209,26 @@ class GroupViewSet(viewsets.ModelViewSet):
                 }
                 for user in page
             ]
-            return self.get_paginated_response(user_data)
-        
-        user_data = [
-            {
-                'id': user.id,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'full_name': user.get_full_name() or user.email,
-                'phone': user.phone,
-                'is_active': user.is_active,
-                'account_status': user.account_status,
-                'user_type': user.user_type,
-                'created_at': user.created_at
-            }
-            for user in users
-        ]
+            data = self.get_paginated_response(user_data).data
+            data['group_id'] = group.id
+            data['group_name'] = group.name
+            data['total_members'] = self.paginator.page.paginator.count
+            cache.set(key, data, GROUP_CACHE_TIMEOUT)
         
-        return Response({
-            'group_id': group.id,
-            'group_name': group.name,
-            'total_members': users.count(),
-            'members': user_data
-        }, status=status.HTTP_200_OK)
+        return Response(data, status=status.HTTP_200_OK)
     
     @action(detail=False, methods=['get'], url_path='stats')
     def stats(self, request):
         """Get statistics about groups"""
-        groups = self.get_queryset()
-        
-        stats_data = {
-            'total_groups': groups.count(),
-            'groups': [
-                {
-                    'id': group.id,
-                    'name': group.name,
-                    'user_count': group.user_set.count(),
-                    'permission_count': group.permissions.count()
-                }
-                for group in groups
-            ]
-        }
+        key = cache_key('group-stats')
+        stats_data = cache.get(key)
+        if stats_data is None:
+            groups = list(with_counts(self.get_queryset()).values('id', 'name', 'user_count', 'permission_count'))
+            stats_data = {
+                'total_groups': len(groups),
+                'groups': groups
+            }
+            cache.set(key, stats_data, GROUP_CACHE_TIMEOUT)
         
         return Response(stats_data, status=status.HTTP_200_OK)
     
@@ -2,7 +2,7 @@ from django.contrib.auth.tokens import default_token_generator
 from django.utils.encoding import force_bytes, force_str
 from drf_spectacular.utils import extend_schema
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-from django.core.mail import send_mail
+from common.tasks import queue_email
 from django.contrib.auth import get_user_model
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
@@ -43,13 +43,11 @@ class PasswordResetViewSet(viewsets.ViewSet):
         reset_link = f"http://localhost:3000/reset-password/{uid}/{token}/"  
         # 👆 You can point this to your frontend reset page
 
-        # Send email (dummy example)
-        send_mail(
+        # Sent by the background worker so a slow SMTP server does not hold the request
+        queue_email(
             subject="Password Reset Request",
             message=f"Click here to reset your password: {reset_link}",
-            from_email="noreply@example.com",
             recipient_list=[email],
-            fail_silently=True,
         )
 
         return Response({"message": "Password reset email sent"}, status=status.HTTP_200_OK)
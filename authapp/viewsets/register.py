@@ -1,12 +1,14 @@
 from rest_framework import viewsets, status, permissions
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.contrib.auth.models import Group
 from drf_spectacular.utils import extend_schema
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from django.core.mail import send_mail
-from django.conf import settings
+from common.tasks import queue_email
+from authapp.provisioning import provision_user
 
 from authapp.serializers.register import (
     RegistrationSerializer, 
@@ -59,6 +61,11 @@ class RegistrationViewSet(viewsets.ModelViewSet):
             group, created = Group.objects.get_or_create(name=group_name)
             user.groups.add(group)
 
+        # Wishlist and role profile are created once here instead of on every login
+        provision_user(user, user_type or None)
+
+        self.notify_admins_new_registration(user, user_type)
+
         # 🔹 Prepare response
         message = (
             "Registration successful! "
@@ -134,40 +141,37 @@ class RegistrationViewSet(viewsets.ModelViewSet):
                 "error": "No account found with this email address"
             }, status=status.HTTP_404_NOT_FOUND)
 
-    def notify_admins_new_registration(self, user):
-        """Notify admin users about new registration"""
-        try:
-            # Get all admin users
-            admin_users = User.objects.filter(groups__name='Admin', is_active=True)
-            admin_emails = [admin.email for admin in admin_users if admin.email]
-            
-            if admin_emails:
-                subject = f'New User Registration - {user.user_type.title()}'
-                message = f"""
-                A new user has registered and is awaiting approval:
-                
-                Name: {user.get_full_name()}
-                Email: {user.email}
-                User Type: {user.user_type.title()}
-                Registration Date: {user.created_at.strftime('%Y-%m-%d %H:%M')}
-                
-                Please review and approve/reject this registration in the admin panel.
-                """
-                
-                send_mail(
-                    subject,
-                    message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    admin_emails,
-                    fail_silently=True,
-                )
-        except Exception as e:
-            print(f"Failed to send admin notification: {e}")
+    def notify_admins_new_registration(self, user, user_type):
+        """Queue an email to the admin users about a new registration"""
+        admin_emails = list(
+            User.objects.filter(groups__name='Admin', is_active=True)
+            .exclude(email='')
+            .values_list('email', flat=True)
+        )
+        if not admin_emails:
+            return
+
+        user_type = (user_type or 'user').title()
+        subject = f'New User Registration - {user_type}'
+        message = f"""
+        A new user has registered and is awaiting approval:
+        
+        Name: {user.get_full_name()}
+        Email: {user.email}
+        User Type: {user_type}
+        Registration Date: {user.created_at.strftime('%Y-%m-%d %H:%M')}
+        
+        Please review and approve/reject this registration in the admin panel.
+        """
+        queue_email(subject, message, admin_emails)
 
 class DashboardViewSet(viewsets.GenericViewSet):
     """ViewSet for user-type specific dashboard data"""
     
     permission_classes = [permissions.IsAuthenticated]
+    # These endpoints report the account's own status, so they read the user row instead of
+    # trusting token claims (ClaimsJWTAuthentication), which lag approvals and suspensions
+    authentication_classes = [JWTAuthentication, SessionAuthentication, BasicAuthentication]
 
     @extend_schema(
         responses={200: {"type": "object"}},
@@ -9,6 +9,7 @@ from authapp.serializers import (
     SellerProfileDetailSerializer,
     SellerProfileUpdateSerializer,
 )
+from authapp.roles import is_admin
 
 class SellerProfileViewSet(BaseViewSet):
     queryset = SellerProfile.objects.all()
@@ -18,9 +19,9 @@ class SellerProfileViewSet(BaseViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.groups.filter(name="Admin").exists():
+        if is_admin(user):
             return SellerProfile.objects.all()
-        return SellerProfile.objects.filter(created_by=user)
+        return SellerProfile.objects.filter(created_by_id=user.id)
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -0,0 +1,84 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """File-like object that returns what is written instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, columns, chunk_size=2000):
+    """Yield dict rows for the given (column, lookup) pairs using keyset batches.
+
+    Each batch is a separate `.values()` query ordered by primary key, so memory
+    stays flat even on backends whose drivers buffer whole result sets
+    (MySQL ignores `iterator(chunk_size=...)` for this purpose).
+    """
+    plain = [lookup for column, lookup in columns if column == lookup]
+    aliased = {column: F(lookup) for column, lookup in columns if column != lookup}
+    queryset = queryset.order_by('-pk').values('pk', *plain, **aliased)
+    last_pk = None
+    while True:
+        batch_queryset = queryset if last_pk is None else queryset.filter(pk__lt=last_pk)
+        batch = list(batch_queryset[:chunk_size])
+        for row in batch:
+            yield row
+        if len(batch) < chunk_size:
+            return
+        last_pk = batch[-1]['pk']
+
+
+def buffered(lines, size=64 * 1024):
+    """Group small lines into larger chunks before handing them to the server"""
+    buffer = []
+    length = 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def csv_lines(rows, headers):
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([row[header] for header in headers])
+
+
+def ndjson_lines(rows, headers):
+    for row in rows:
+        yield json.dumps({header: row[header] for header in headers}, cls=DjangoJSONEncoder) + '\n'
+
+
+def export_response(queryset, columns, file_format, filename, chunk_size=2000):
+    """Stream a queryset as CSV or NDJSON.
+
+    `columns` is a list of (column, lookup) pairs, e.g. ('property_title', 'interested_property__title').
+    """
+    headers = [column for column, lookup in columns]
+    rows = iter_rows(queryset, columns, chunk_size=chunk_size)
+    if file_format == 'csv':
+        lines = csv_lines(rows, headers)
+    else:
+        lines = ndjson_lines(rows, headers)
+
+    response = StreamingHttpResponse(buffered(lines), content_type=EXPORT_CONTENT_TYPES[file_format])
+    stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+    response['Content-Disposition'] = f'attachment; filename="{filename}-{stamp}.{file_format}"'
+    return response
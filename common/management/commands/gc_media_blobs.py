@@ -0,0 +1,90 @@
+from datetime import timedelta
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from common.models import MediaBlob
+from common.storage import TRACKED_FIELDS, blob_rendition_names, media_storage
+
+
+class Command(BaseCommand):
+    help = "Delete content-addressed media blobs that no row references any more"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=int, default=24,
+            help="Only collect blobs unreferenced for this long, so in-flight uploads are safe"
+        )
+        parser.add_argument(
+            '--recount', action='store_true',
+            help="First recompute every ref_count from the tracked file fields"
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            fixed = self.recount(options['batch_size'], options['dry_run'])
+            self.stdout.write(f"Corrected {fixed} reference counts")
+
+        storage = media_storage()
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        queryset = MediaBlob.objects.filter(ref_count__lte=0, updated_at__lt=cutoff).order_by('id')
+        deleted = freed = 0
+        last_id = 0
+        while True:
+            blobs = list(queryset.filter(id__gt=last_id).values_list('id', 'sha256', 'name', 'size')[:options['batch_size']])
+            if not blobs:
+                break
+            last_id = blobs[-1][0]
+            if options['dry_run']:
+                deleted += len(blobs)
+                freed += sum(size for _, _, _, size in blobs)
+                continue
+
+            with transaction.atomic():
+                # Re-check under lock: an upload may have reused the blob since it was listed
+                blobs = list(
+                    queryset.filter(id__in=[blob[0] for blob in blobs]).select_for_update()
+                    .values_list('id', 'sha256', 'name', 'size')
+                )
+                MediaBlob.objects.filter(id__in=[blob[0] for blob in blobs]).delete()
+            for _, sha256, name, _ in blobs:
+                storage.delete(name)
+                for rendition in blob_rendition_names(sha256):
+                    default_storage.delete(rendition)
+            deleted += len(blobs)
+            freed += sum(size for _, _, _, size in blobs)
+
+        prefix = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(f"{prefix} {deleted} blobs ({freed / (1024 * 1024):.1f} MB)")
+
+    def recount(self, batch_size, dry_run):
+        """ref_count repair for changes made without signals (raw SQL, queryset.update on file fields)"""
+        counts = {}
+        for model, field_name in TRACKED_FIELDS:
+            rows = (
+                model.objects.exclude(**{f'{field_name}__isnull': True}).exclude(**{field_name: ''})
+                .order_by().values(field_name).annotate(references=Count('pk'))
+            )
+            for row in rows:
+                counts[row[field_name]] = counts.get(row[field_name], 0) + row['references']
+
+        fixed = 0
+        last_id = 0
+        while True:
+            blobs = list(MediaBlob.objects.filter(id__gt=last_id).order_by('id').only('id', 'name', 'ref_count')[:batch_size])
+            if not blobs:
+                return fixed
+            last_id = blobs[-1].id
+            changed = []
+            for blob in blobs:
+                actual = counts.get(blob.name, 0)
+                if blob.ref_count != actual:
+                    blob.ref_count = actual
+                    blob.updated_at = timezone.now()
+                    changed.append(blob)
+            fixed += len(changed)
+            if changed and not dry_run:
+                MediaBlob.objects.bulk_update(changed, ['ref_count', 'updated_at'])
@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import autodiscover_modules
+from common.tasks import claim_jobs, run_jobs, worker_id
+
+
+class Command(BaseCommand):
+    help = "Consume background jobs (emails, media processing, ...) from the database queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help="Jobs claimed per poll")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="Drain the runnable jobs and exit")
+
+    def handle(self, *args, **options):
+        # Import every app's tasks module so their @task functions are registered
+        autodiscover_modules('tasks')
+        worker = worker_id()
+        self.stdout.write(f"Worker {worker} started")
+
+        while True:
+            jobs = claim_jobs(options['batch_size'], worker)
+            if jobs:
+                run_jobs(jobs)
+                failed = [job for job in jobs if job.status != 'done']
+                self.stdout.write(f"Ran {len(jobs)} jobs, {len(failed)} failed or rescheduled")
+                for job in failed:
+                    self.stderr.write(f"{job}: {job.last_error.strip().splitlines()[-1] if job.last_error else ''}")
+                continue
+            if options['once']:
+                return
+            time.sleep(options['sleep'])
@@ -0,0 +1,341 @@
+"""Metadata for uploaded files, captured once so serializers never touch storage.
+
+Models with a file field keep `file_size`, `mime_type` and `content_hash`
+columns (plus `width` and `height` for images) and call
+`apply_media_metadata` from save() when a new file is assigned; existing rows
+are filled in by `manage.py backfill_media_metadata`.
+
+Images also get resized WebP/JPEG renditions, generated by a background
+task after upload (see `generate_renditions`).
+"""
+import hashlib
+import io
+import mimetypes
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.images import get_image_dimensions
+
+HASH_CHUNK_SIZE = 1024 * 1024
+# Concurrent storage writes per bulk upload request
+MEDIA_WRITE_WORKERS = 4
+
+
+def is_new_upload(field_file):
+    """True when the field holds a file that has not been written to storage yet"""
+    return bool(field_file) and not getattr(field_file, '_committed', True)
+
+
+def guess_mime_type(file, name):
+    """From the file name, falling back to the type the client sent"""
+    return (
+        mimetypes.guess_type(name or '')[0]
+        or getattr(file, 'content_type', None)
+        or 'application/octet-stream'
+    )
+
+
+def media_metadata(file, name=None, dimensions=False):
+    """Size, MIME type, sha256 and optionally image dimensions, in one pass over the file"""
+    name = name or getattr(file, 'name', '')
+    digest = hashlib.sha256()
+    size = 0
+    file.seek(0)
+    for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    file.seek(0)
+
+    metadata = {
+        'file_size': size,
+        'mime_type': guess_mime_type(file, name)[:100],
+        'content_hash': digest.hexdigest(),
+    }
+    # Lets the content-addressed storage (common.storage) skip hashing the file again
+    file.sha256 = metadata['content_hash']
+    if dimensions:
+        width, height = get_image_dimensions(file)
+        file.seek(0)
+        metadata['width'] = width
+        metadata['height'] = height
+    return metadata
+
+
+def empty_metadata(dimensions=False):
+    metadata = {'file_size': None, 'mime_type': '', 'content_hash': ''}
+    if dimensions:
+        metadata.update(width=None, height=None)
+    return metadata
+
+
+def apply_media_metadata(instance, field_name, dimensions=False):
+    """Fill the metadata columns of `instance` from its `field_name` file.
+
+    Only new uploads are read (from memory or the upload temp file, before
+    they reach storage); unchanged files keep their stored values and a
+    cleared field clears them.
+    """
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        metadata = empty_metadata(dimensions)
+    elif is_new_upload(field_file):
+        metadata = media_metadata(field_file.file, field_file.name, dimensions)
+    else:
+        return False
+    for attr, value in metadata.items():
+        setattr(instance, attr, value)
+    return True
+
+
+def stored_media_metadata(field_file, dimensions=False):
+    """Metadata for a file already in storage (used by the backfill)"""
+    with field_file.storage.open(field_file.name, 'rb') as file:
+        return media_metadata(file, field_file.name, dimensions)
+
+
+def format_file_size(size):
+    if size is None:
+        return None
+    if size < 1024:
+        return f"{size} B"
+    elif size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+# Encoder options per rendition format (extension, Pillow format, save kwargs)
+RENDITION_FORMATS = {
+    'webp': ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+RENDITION_DIR = 'renditions'
+
+
+def rendition_name(content_hash, width, extension):
+    """Storage path derived from the source's hash, so the URL can be cached forever"""
+    return f"{RENDITION_DIR}/{content_hash[:2]}/{content_hash}-{width}w.{extension}"
+
+
+def generate_renditions(field_file, content_hash, sizes, storage=None):
+    """Write resized WebP and JPEG copies of an image for every {name: width} in `sizes`.
+
+    The source is decoded once and never upscaled. Files are named after the
+    source hash, so identical uploads share renditions and ones that already
+    exist are not written again. Returns {name: {'width', 'height', format: path}}.
+    """
+    from PIL import Image, ImageOps
+
+    storage = storage or default_storage
+    with field_file.storage.open(field_file.name, 'rb') as file:
+        with Image.open(file) as source:
+            source = ImageOps.exif_transpose(source)
+            source.load()
+
+    renditions = {}
+    for name, width in sorted(sizes.items(), key=lambda item: item[1]):
+        width = min(width, source.width)
+        height = max(1, round(source.height * width / source.width))
+        resized = None
+        rendition = {'width': width, 'height': height}
+        for format_key, (extension, pil_format, options) in RENDITION_FORMATS.items():
+            path = rendition_name(content_hash, width, extension)
+            if not storage.exists(path):
+                if resized is None:
+                    resized = source if width == source.width else source.resize((width, height), Image.LANCZOS)
+                image = resized
+                if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                    image = image.convert('RGB')
+                buffer = io.BytesIO()
+                image.save(buffer, pil_format, **options)
+                storage.save(path, ContentFile(buffer.getvalue()))
+            rendition[format_key] = path
+        renditions[name] = rendition
+    return renditions
+
+
+def rendition_srcset(renditions, format_key, url):
+    """`srcset` attribute value for one format, e.g. 'a-320w.webp 320w, a-640w.webp 640w'"""
+    entries = sorted({
+        (rendition['width'], rendition[format_key])
+        for rendition in renditions.values() if format_key in rendition
+    })
+    return ', '.join(f"{url(path)} {width}w" for width, path in entries)
+
+
+def store_uploads(field, instances, files, dimensions=False, max_workers=MEDIA_WRITE_WORKERS):
+    """Hash and write many uploads for `field` concurrently.
+
+    Returns [(stored name, metadata)] in input order. The worker threads only
+    read and write files; blob rows of a content-addressed storage are read
+    and written here, on the caller's database connection and transaction.
+    If any write fails the files already stored are deleted again (or left
+    to gc_media_blobs) and the error is raised.
+    """
+    storage = field.storage
+    workers = max(1, min(max_workers, len(files)))
+    if getattr(storage, 'content_addressed', False):
+        return _store_blobs(storage, files, dimensions, workers)
+
+    def store(instance, file):
+        name = field.generate_filename(instance, file.name)
+        # Hash before saving: the storage may move a temporary upload instead of copying it
+        metadata = media_metadata(file, file.name, dimensions)
+        return storage.save(name, file, max_length=field.max_length), metadata
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(store, instance, file) for instance, file in zip(instances, files)]
+        wait(futures)
+
+    stored = [future.result() for future in futures if future.exception() is None]
+    errors = [future.exception() for future in futures if future.exception() is not None]
+    if errors:
+        delete_stored(storage, [name for name, metadata in stored])
+        raise errors[0]
+    return stored
+
+
+def _store_blobs(storage, files, dimensions, workers):
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        metadata = list(pool.map(lambda file: media_metadata(file, file.name, dimensions), files))
+        names = storage.blob_names(item['content_hash'] for item in metadata)
+        reused = set(names)
+
+        # One write per new content, even if it was uploaded several times in this batch
+        pending = {}
+        for file, item in zip(files, metadata):
+            if item['content_hash'] not in names:
+                pending.setdefault(item['content_hash'], file)
+        futures = {
+            digest: pool.submit(storage.write_blob, digest, file.name, file)
+            for digest, file in pending.items()
+        }
+        wait(futures.values())
+
+    written = []
+    errors = []
+    for digest, future in futures.items():
+        if future.exception() is None:
+            names[digest] = future.result()
+            written.append((digest, names[digest], pending[digest].size))
+        else:
+            errors.append(future.exception())
+    # Recorded even on failure, so gc_media_blobs can remove what was written
+    storage.record_blobs(written, touched=reused)
+    if errors:
+        raise errors[0]
+    return [(names[item['content_hash']], item) for item in metadata]
+
+
+def delete_stored(storage, names):
+    """Remove files written for a failed request"""
+    if getattr(storage, 'content_addressed', False):
+        # Blobs may be shared with other rows; unreferenced ones are removed by gc_media_blobs
+        return
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError:
+            pass
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _mp4_boxes(file, end):
+    """Yield (type, payload start, payload end) for the boxes between the current position and `end`"""
+    while file.tell() + 8 <= end:
+        start = file.tell()
+        header = file.read(8)
+        size, box_type = struct.unpack('>I4s', header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', file.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - start
+        if size < header_size:
+            return
+        yield box_type, start + header_size, start + size
+        file.seek(start + size)
+
+
+def mp4_duration(path):
+    """Duration of an MP4/MOV file from its movie header (mvhd), or None if it cannot be read.
+
+    Only box headers are read, seeking over the media data, so this is
+    cheap even for multi-gigabyte files.
+    """
+    try:
+        with open(path, 'rb') as file:
+            end = os.fstat(file.fileno()).st_size
+            for box_type, start, box_end in _mp4_boxes(file, end):
+                if box_type != b'moov':
+                    continue
+                file.seek(start)
+                for child_type, child_start, child_end in _mp4_boxes(file, box_end):
+                    if child_type != b'mvhd':
+                        continue
+                    file.seek(child_start)
+                    version = file.read(1)[0]
+                    file.read(3)  # flags
+                    if version == 1:
+                        _, _, timescale, duration = struct.unpack('>QQIQ', file.read(28))
+                    else:
+                        _, _, timescale, duration = struct.unpack('>IIII', file.read(16))
+                    if not timescale:
+                        return None
+                    return timedelta(seconds=duration / timescale)
+    except (OSError, struct.error, IndexError):
+        return None
+    return None
+
+
+@contextmanager
+def local_path(field_file):
+    """A local filesystem path for a stored file, copied to a temporary file for remote storages"""
+    try:
+        path = field_file.storage.path(field_file.name)
+    except NotImplementedError:
+        path = None
+    if path:
+        yield path
+        return
+    suffix = os.path.splitext(field_file.name)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix) as temp:
+        with field_file.storage.open(field_file.name, 'rb') as source:
+            shutil.copyfileobj(source, temp, HASH_CHUNK_SIZE)
+        temp.flush()
+        yield temp.name
+
+
+def video_poster(path, ffmpeg, max_width=1280, timeout=60):
+    """JPEG bytes of the first keyframe of a video, or None if ffmpeg cannot decode one.
+
+    Only keyframes are decoded (`-skip_frame nokey`), so this does not read
+    through the whole file.
+    """
+    command = [
+        ffmpeg, '-v', 'error', '-nostdin',
+        '-skip_frame', 'nokey', '-i', path,
+        '-frames:v', '1', '-vf', f"scale='min({max_width},iw)':-2",
+        '-f', 'image2', '-c:v', 'mjpeg', '-q:v', '3', 'pipe:1',
+    ]
+    try:
+        result = subprocess.run(command, capture_output=True, timeout=timeout, check=False)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0 or not result.stdout:
+        return None
+    return result.stdout
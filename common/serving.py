@@ -0,0 +1,162 @@
+"""File responses that hand the byte transfer to the front proxy when it can.
+
+With MEDIA_ACCEL_REDIRECT_PREFIX set (PRIVATE_MEDIA_ACCEL_REDIRECT_PREFIX for
+common.storage.PrivateStorage), views only authorize and answer with an
+empty response carrying `X-Accel-Redirect`; nginx then streams the file
+from an `internal` location. Without it (development, or no nginx), the file
+is streamed by Django with Range, ETag and If-None-Match support.
+"""
+import os
+import re
+from stat import S_ISREG
+from urllib.parse import quote
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import content_disposition_header, http_date
+from common.media import guess_mime_type
+
+# Names under these directories embed the content's SHA-256, so they never change
+CONTENT_ADDRESSED_DIRS = ('blobs/', 'renditions/')
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+MUTABLE_MAX_AGE = 60 * 60
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+HASH_RE = re.compile(r'[0-9a-f]{64}')
+
+
+class RangeFile:
+    """Read-only view of `length` bytes of a file starting at `start`"""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """(start, end) for a single `bytes=` range, None to send everything, or 'invalid' for a 416"""
+    match = RANGE_RE.match(header or '')
+    if not match or size == 0:
+        # Multiple ranges and other units are allowed to be ignored
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return 'invalid'
+    return start, end
+
+
+def file_etag(name, content_hash=None, stat=None):
+    digest = content_hash or (HASH_RE.search(name) or [None])[0]
+    if digest:
+        return f'"{digest}"'
+    if stat is not None:
+        return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+    return None
+
+
+def etag_matches(header, etag):
+    if not header or not etag:
+        return False
+    if header.strip() == '*':
+        return True
+    return etag in [tag.strip().removeprefix('W/') for tag in header.split(',')]
+
+
+def serve_file(request, storage, name, content_hash=None, content_type=None, filename=None,
+               as_attachment=False, private=False):
+    """Response for the file `name` in `storage`, via the proxy when configured.
+
+    Caching is keyed on the content hash: content-addressed names are cached
+    as immutable for a year, anything else for an hour with revalidation.
+    `private` keeps shared caches from storing files that needed authorization.
+    """
+    immutable = name.startswith(CONTENT_ADDRESSED_DIRS)
+    scope = 'private' if private else 'public'
+    cache_control = (
+        f'{scope}, max-age={IMMUTABLE_MAX_AGE}, immutable' if immutable
+        else f'{scope}, max-age={MUTABLE_MAX_AGE}, must-revalidate'
+    )
+    accel_prefix = getattr(storage, 'accel_redirect_prefix', getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', None))
+
+    path = None
+    stat = None
+    if not accel_prefix:
+        path = storage.path(name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return HttpResponse(status=404)
+        if not S_ISREG(stat.st_mode):
+            return HttpResponse(status=404)
+    etag = file_etag(name, content_hash, stat)
+
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+        return response
+
+    if accel_prefix:
+        # nginx answers Range and conditional requests itself for internal redirects
+        response = HttpResponse(content_type=content_type or guess_mime_type(None, name))
+        response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(name)
+    else:
+        size = stat.st_size
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if not if_range or if_range == etag:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        if byte_range == 'invalid':
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        file = open(path, 'rb')
+        if byte_range:
+            start, end = byte_range
+            response = FileResponse(RangeFile(file, start, end - start + 1), status=206)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+        else:
+            response = FileResponse(file)
+            response['Content-Length'] = str(size)
+        response['Content-Type'] = content_type or guess_mime_type(None, name)
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Accept-Ranges'] = 'bytes'
+
+    if filename or as_attachment:
+        response['Content-Disposition'] = content_disposition_header(
+            as_attachment, filename or os.path.basename(name)
+        )
+    if etag:
+        response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def media_view(request, path):
+    """Public files under MEDIA_URL, for when no proxy serves them directly"""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponse(status=405, headers={'Allow': 'GET, HEAD'})
+    default_storage.path(path)  # rejects paths outside MEDIA_ROOT, also before an X-Accel-Redirect
+    return serve_file(request, default_storage, path)
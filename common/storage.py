@@ -0,0 +1,235 @@
+"""Content-addressed file storage with reference counting.
+
+Files are stored once under `blobs/<sha256[:2]>/<sha256[2:4]>/<sha256><ext>`,
+whatever name they were uploaded with, so the same photo uploaded to many
+listings occupies disk once and repeat uploads skip the write entirely. Each
+stored file has a MediaBlob row; model fields registered with
+`track_references` keep its `ref_count` current through model signals, and
+code that bypasses signals (bulk_create, queryset.update) must call
+`add_references` itself. `manage.py gc_media_blobs` deletes unreferenced blobs.
+"""
+import hashlib
+import os
+import tempfile
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+from .models import MediaBlob
+
+BLOB_DIR = 'blobs'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# (model, field name) pairs whose files are reference counted
+TRACKED_FIELDS = []
+
+
+def content_sha256(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def blob_name(digest, name):
+    extension = os.path.splitext(name or '')[1].lower()[:10]
+    return f"{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files after their SHA-256 and stores each content once"""
+    content_addressed = True
+
+    def __init__(self, **kwargs):
+        # Same name means same bytes, so overwriting is harmless and avoids renamed duplicates
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        # Uploads hashed by common.media carry their digest already
+        digest = getattr(content, 'sha256', None) or content_sha256(content)
+
+        existing = self.blob_names([digest]).get(digest)
+        if existing:
+            self.record_blobs([], touched=[digest])
+            return existing
+        stored_name = self.write_blob(digest, name, content)
+        self.record_blobs([(digest, stored_name, content.size)])
+        return stored_name
+
+    def blob_names(self, digests):
+        """{digest: name} for the contents already stored"""
+        names = dict(MediaBlob.objects.filter(sha256__in=set(digests)).values_list('sha256', 'name'))
+        return {digest: name for digest, name in names.items() if self.exists(name)}
+
+    def write_blob(self, digest, name, content):
+        """Write `content` under its blob name without touching the database (safe to call from threads).
+
+        The bytes go to a temporary file in the target directory, which is then
+        renamed into place, so concurrent writers of the same content never
+        leave a partly written blob behind.
+        """
+        stored_name = blob_name(digest, name)
+        path = self.path(stored_name)
+        if os.path.exists(path):
+            return stored_name
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        if self.directory_permissions_mode is not None:
+            os.chmod(directory, self.directory_permissions_mode)
+
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            if hasattr(content, 'temporary_file_path'):
+                os.close(fd)
+                file_move_safe(content.temporary_file_path(), temp_path, allow_overwrite=True)
+            else:
+                with os.fdopen(fd, 'wb') as temp:
+                    for chunk in content.chunks(HASH_CHUNK_SIZE):
+                        temp.write(chunk)
+            os.chmod(temp_path, self.file_permissions_mode if self.file_permissions_mode is not None else 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return stored_name
+
+    def record_blobs(self, written, touched=()):
+        """Add MediaBlob rows for (digest, name, size) blobs just written and touch reused ones.
+
+        Touching keeps gc_media_blobs away from a reused blob until the new reference is saved.
+        """
+        if written:
+            MediaBlob.objects.bulk_create(
+                [MediaBlob(sha256=digest, name=name, size=size) for digest, name, size in written],
+                ignore_conflicts=True,
+            )
+        if touched:
+            MediaBlob.objects.filter(sha256__in=set(touched)).update(updated_at=timezone.now())
+
+
+_media_storage = None
+
+
+def media_storage():
+    """Storage for listing media fields (callable, so migrations do not depend on settings)"""
+    global _media_storage
+    if _media_storage is None:
+        _media_storage = ContentAddressedStorage()
+    return _media_storage
+
+
+@deconstructible
+class PrivateStorage(FileSystemStorage):
+    """Files under PRIVATE_MEDIA_ROOT, outside MEDIA_URL: they have no public URL and are
+    only sent by views that authorize the request (common.serving.serve_file)"""
+
+    @property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.PRIVATE_MEDIA_ROOT)
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+    @property
+    def accel_redirect_prefix(self):
+        return getattr(settings, 'PRIVATE_MEDIA_ACCEL_REDIRECT_PREFIX', None)
+
+    def url(self, name):
+        return None
+
+
+_private_storage = None
+
+
+def private_storage():
+    """Storage for files that need authorization, such as project documents"""
+    global _private_storage
+    if _private_storage is None:
+        _private_storage = PrivateStorage()
+    return _private_storage
+
+
+def add_references(names, delta=1):
+    """Adjust the reference count of the blobs stored under `names` (files outside the store are ignored)"""
+    counts = {}
+    for name in names:
+        if name:
+            counts[name] = counts.get(name, 0) + delta
+    by_delta = {}
+    for name, change in counts.items():
+        by_delta.setdefault(change, []).append(name)
+    now = timezone.now()
+    for change, grouped in by_delta.items():
+        MediaBlob.objects.filter(name__in=grouped).update(ref_count=F('ref_count') + change, updated_at=now)
+
+
+def remove_references(names):
+    add_references(names, delta=-1)
+
+
+_DEFERRED = object()
+
+
+def track_references(model, field_name):
+    """Keep MediaBlob.ref_count in step with `model.field_name` on save and delete"""
+    TRACKED_FIELDS.append((model, field_name))
+    attname = model._meta.get_field(field_name).attname
+    original_key = f'_original_{attname}'
+
+    def file_name(instance):
+        value = instance.__dict__.get(attname, _DEFERRED)
+        if value is _DEFERRED:
+            return _DEFERRED
+        return getattr(value, 'name', value) or ''
+
+    def remember(sender, instance, **kwargs):
+        instance.__dict__[original_key] = file_name(instance)
+
+    def saved(sender, instance, created, **kwargs):
+        original = instance.__dict__.get(original_key, _DEFERRED)
+        current = file_name(instance)
+        if current is _DEFERRED or (not created and original is _DEFERRED):
+            return
+        if created:
+            add_references([current])
+        elif original != current:
+            add_references([current])
+            remove_references([original])
+        instance.__dict__[original_key] = current
+
+    def deleted(sender, instance, **kwargs):
+        original = instance.__dict__.get(original_key, _DEFERRED)
+        if original is _DEFERRED:
+            original = file_name(instance)
+        if original is not _DEFERRED:
+            remove_references([original])
+
+    uid = f'media-refs:{model._meta.label}.{field_name}'
+    post_init.connect(remember, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(saved, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(deleted, sender=model, weak=False, dispatch_uid=uid)
+
+
+def blob_rendition_names(digest):
+    """Derived image renditions (common.media.generate_renditions) stored for a blob's content"""
+    from .media import RENDITION_DIR
+    directory = f"{RENDITION_DIR}/{digest[:2]}"
+    try:
+        files = default_storage.listdir(directory)[1]
+    except FileNotFoundError:
+        return []
+    return [f"{directory}/{file}" for file in files if file.startswith(f"{digest}-")]
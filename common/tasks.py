@@ -0,0 +1,167 @@
+import os
+import socket
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import BackgroundJob
+
+# name -> (handler, batch, max_attempts)
+_registry = {}
+
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 3600
+# Running jobs whose worker has not finished them in this time are picked up again
+STALE_LOCK_TIMEOUT = timedelta(minutes=15)
+
+
+def task(name=None, batch=False, max_attempts=5):
+    """Register a function as a background task.
+
+    Plain tasks are called with one job's payload as keyword arguments. Batch
+    tasks are called once with the list of payloads claimed together and must
+    return a list of the same length holding None or the exception for each.
+    """
+    def decorator(func):
+        _registry[name or func.__name__] = (func, batch, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, run_at=None):
+    """Schedule one job; workers see it once the surrounding transaction commits"""
+    return enqueue_many(name, [payload or {}], run_at=run_at)[0]
+
+
+def enqueue_many(name, payloads, run_at=None):
+    if name not in _registry:
+        raise ValueError(f"Unknown background task '{name}'")
+    max_attempts = _registry[name][2]
+    run_at = run_at or timezone.now()
+    return BackgroundJob.objects.bulk_create([
+        BackgroundJob(name=name, payload=payload, run_at=run_at, max_attempts=max_attempts)
+        for payload in payloads
+    ])
+
+
+def retry_delay(attempts):
+    """Exponential backoff: 30s, 1m, 2m, ... capped at an hour"""
+    return timedelta(seconds=min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY))
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"[:100]
+
+
+def claim_jobs(limit, worker):
+    """Lock and mark up to `limit` runnable jobs as running.
+
+    Uses SKIP LOCKED where the database supports it so several workers can
+    poll the same table without blocking each other.
+    """
+    now = timezone.now()
+    runnable = Q(status='pending', run_at__lte=now) | Q(status='running', locked_at__lt=now - STALE_LOCK_TIMEOUT)
+    with transaction.atomic():
+        queryset = BackgroundJob.objects.filter(runnable).order_by('run_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        else:
+            queryset = queryset.select_for_update()
+        jobs = list(queryset[:limit])
+        if jobs:
+            BackgroundJob.objects.filter(id__in=[job.id for job in jobs]).update(
+                status='running', locked_at=now, locked_by=worker
+            )
+    return jobs
+
+
+def finish_job(job, error=None):
+    now = timezone.now()
+    job.attempts += 1
+    job.locked_at = None
+    job.locked_by = ''
+    if error is None:
+        job.status = 'done'
+        job.finished_at = now
+        job.last_error = ''
+    else:
+        job.last_error = ''.join(traceback.format_exception(error))[-4000:]
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = now
+        else:
+            job.status = 'pending'
+            job.run_at = now + retry_delay(job.attempts)
+    return job
+
+
+def run_jobs(jobs):
+    """Execute claimed jobs, grouping batch tasks, and store every outcome in one bulk update"""
+    by_name = {}
+    for job in jobs:
+        by_name.setdefault(job.name, []).append(job)
+
+    for name, group in by_name.items():
+        if name not in _registry:
+            for job in group:
+                finish_job(job, LookupError(f"Unknown background task '{name}'"))
+            continue
+        handler, batch, _ = _registry[name]
+        if batch:
+            try:
+                errors = handler([job.payload for job in group])
+            except Exception as e:
+                errors = [e] * len(group)
+            for job, error in zip(group, errors):
+                finish_job(job, error)
+        else:
+            for job in group:
+                try:
+                    handler(**job.payload)
+                except Exception as e:
+                    finish_job(job, e)
+                else:
+                    finish_job(job)
+
+    BackgroundJob.objects.bulk_update(
+        jobs, ['status', 'attempts', 'run_at', 'locked_at', 'locked_by', 'finished_at', 'last_error']
+    )
+    return jobs
+
+
+def queue_email(subject, message, recipient_list, from_email=None):
+    """Send a plain-text email from the worker instead of the request"""
+    return enqueue('send_email', {
+        'subject': subject,
+        'message': message,
+        'recipient_list': list(recipient_list),
+        'from_email': from_email or settings.DEFAULT_FROM_EMAIL,
+    })
+
+
+@task(batch=True, max_attempts=6)
+def send_email(payloads):
+    """Send every claimed email over one SMTP connection, failing them individually"""
+    errors = []
+    mail_connection = get_connection()
+    mail_connection.open()
+    try:
+        for payload in payloads:
+            message = EmailMessage(
+                subject=payload['subject'],
+                body=payload['message'],
+                from_email=payload.get('from_email') or settings.DEFAULT_FROM_EMAIL,
+                to=payload['recipient_list'],
+            )
+            try:
+                mail_connection.send_messages([message])
+            except Exception as e:
+                errors.append(e)
+            else:
+                errors.append(None)
+    finally:
+        mail_connection.close()
+    return errors
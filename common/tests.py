@@ -1,3 +1,123 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+from django.contrib.auth.models import Group
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.backends.utils import CursorWrapper
+from django.db.models import FileField
 from django.test import TestCase
+from .export import iter_rows
+from .media import store_uploads
+from .models import BackgroundJob, MediaBlob
+from .storage import ContentAddressedStorage, blob_name
+from .tasks import claim_jobs, enqueue, queue_email, run_jobs
 
-# Create your tests here.
+
+class ExportTests(TestCase):
+    def test_iter_rows_walks_every_row_newest_first_in_keyset_batches(self):
+        groups = Group.objects.bulk_create([Group(name=f'group-{i}') for i in range(7)])
+        ids = sorted(Group.objects.values_list('id', flat=True), reverse=True)
+
+        rows = list(iter_rows(Group.objects.order_by('name'), [('id', 'id'), ('group', 'name')], chunk_size=3))
+
+        self.assertEqual([row['id'] for row in rows], ids)
+        self.assertEqual(len(groups), len(rows))
+        self.assertTrue(all(row['group'].startswith('group-') for row in rows))
+
+
+class TaskQueueTests(TestCase):
+    def test_queued_emails_are_sent_by_the_worker(self):
+        for i in range(2):
+            queue_email('Hello', 'Body', [f'user{i}@example.com'])
+        self.assertEqual(len(mail.outbox), 0)
+
+        jobs = run_jobs(claim_jobs(10, 'test'))
+
+        self.assertEqual([job.status for job in jobs], ['done', 'done'])
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['user0@example.com', 'user1@example.com'])
+        self.assertEqual(claim_jobs(10, 'test'), [])
+
+    def test_failed_send_is_retried_later_then_given_up(self):
+        queue_email('Hello', 'Body', ['user@example.com'])
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('down')):
+            job, = run_jobs(claim_jobs(10, 'test'))
+        self.assertEqual((job.status, job.attempts), ('pending', 1))
+        self.assertIn('OSError', job.last_error)
+        self.assertGreater(job.run_at, job.created_at)
+        # Not runnable until the backoff has passed
+        self.assertEqual(claim_jobs(10, 'test'), [])
+
+        BackgroundJob.objects.filter(pk=job.pk).update(attempts=job.max_attempts - 1, run_at=job.created_at)
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('down')):
+            job, = run_jobs(claim_jobs(10, 'test'))
+        self.assertEqual(job.status, 'failed')
+
+    def test_unknown_tasks_are_refused(self):
+        with self.assertRaises(ValueError):
+            enqueue('no_such_task')
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        self.storage = ContentAddressedStorage(location=location)
+        self.field = FileField(upload_to='uploads/', storage=self.storage)
+        self.field.set_attributes_from_name('file')
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.storage.location)
+            for root, dirs, files in os.walk(self.storage.location) for name in files
+        )
+
+    def test_same_content_is_stored_once(self):
+        first = self.storage.save('a.txt', ContentFile(b'hello'))
+        second = self.storage.save('b.txt', ContentFile(b'hello'))
+        self.assertEqual(first, second)
+        self.assertEqual(first, blob_name(hashlib.sha256(b'hello').hexdigest(), 'a.txt'))
+        self.assertEqual(MediaBlob.objects.get().name, first)
+        self.assertEqual(self.stored_files(), [first])
+
+    def test_concurrent_writes_of_new_content_leave_one_complete_file(self):
+        content = os.urandom(256 * 1024)
+        digest = hashlib.sha256(content).hexdigest()
+        barrier = threading.Barrier(4)
+
+        def write():
+            barrier.wait()
+            return self.storage.write_blob(digest, 'a.bin', ContentFile(content))
+
+        names = []
+        threads = [threading.Thread(target=lambda: names.append(write())) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(names)), 1)
+        self.assertEqual(self.stored_files(), [names[0]])
+        with self.storage.open(names[0]) as file:
+            self.assertEqual(file.read(), content)
+
+    def test_store_uploads_keeps_database_work_on_the_calling_thread(self):
+        query_threads = set()
+        execute = CursorWrapper._execute_with_wrappers
+
+        def record(cursor, *args, **kwargs):
+            query_threads.add(threading.get_ident())
+            return execute(cursor, *args, **kwargs)
+
+        files = [SimpleUploadedFile(f'{i}.txt', content) for i, content in enumerate([b'one', b'two', b'one'])]
+        with mock.patch.object(CursorWrapper, '_execute_with_wrappers', record):
+            stored = store_uploads(self.field, [None] * len(files), files)
+
+        self.assertEqual(query_threads, {threading.get_ident()})
+        self.assertEqual(stored[0][0], stored[2][0])
+        self.assertEqual(MediaBlob.objects.count(), 2)
+        self.assertEqual([metadata['file_size'] for name, metadata in stored], [3, 3, 3])
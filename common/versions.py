@@ -0,0 +1,25 @@
+"""Version counters for cache keys, stored in the database.
+
+The cache itself may be per process (LocMemCache), so a counter kept in it
+would differ between workers and start over on restart. Bumping a row here
+moves every process to new keys at once; stale entries are never read again
+and expire on their own.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from .models import CacheVersion
+
+
+def cache_version(name):
+    return CacheVersion.objects.filter(name=name).values_list('version', flat=True).first() or 0
+
+
+def bump_cache_version(name):
+    if CacheVersion.objects.filter(name=name).update(version=F('version') + 1):
+        return
+    try:
+        with transaction.atomic():
+            CacheVersion.objects.create(name=name, version=1)
+    except IntegrityError:
+        # Created by a concurrent first bump
+        CacheVersion.objects.filter(name=name).update(version=F('version') + 1)
@@ -0,0 +1,247 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from .models.propertyfavorite import feature_ids, inverted, normalize_term, property_price_range
+
+UNBOUNDED_LOW = float('-inf')
+UNBOUNDED_HIGH = float('inf')
+
+
+class IntervalTree:
+    """Static centered interval tree over closed (low, high, key) intervals.
+
+    Built once per index load; `overlapping` and `containing` visit only the
+    nodes whose center lies on the path to the query, plus the matches.
+    """
+
+    def __init__(self, intervals):
+        self.root = self._build(list(intervals))
+
+    def _build(self, intervals):
+        if not intervals:
+            return None
+        points = sorted(
+            value for low, high, key in intervals
+            for value in (low, high) if value not in (UNBOUNDED_LOW, UNBOUNDED_HIGH)
+        )
+        center = points[len(points) // 2] if points else 0.0
+        left, right, here = [], [], []
+        for interval in intervals:
+            if interval[1] < center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        if len(left) == len(intervals) or len(right) == len(intervals):
+            # No split possible (only inverted intervals do this), keep them all on this node
+            left, right, here = [], [], intervals
+        return (
+            center,
+            sorted(here, key=lambda interval: interval[0]),
+            sorted(here, key=lambda interval: interval[1], reverse=True),
+            self._build(left),
+            self._build(right),
+        )
+
+    def overlapping(self, low, high):
+        """Keys of intervals that share at least one point with [low, high]"""
+        found = set()
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            center, by_low, by_high, left, right = node
+            if high < center:
+                for interval in by_low:
+                    if interval[0] > high:
+                        break
+                    found.add(interval[2])
+                stack.append(left)
+            elif low > center:
+                for interval in by_high:
+                    if interval[1] < low:
+                        break
+                    found.add(interval[2])
+                stack.append(right)
+            else:
+                found.update(interval[2] for interval in by_low)
+                stack.append(left)
+                stack.append(right)
+        return found
+
+    def containing(self, point):
+        return self.overlapping(point, point)
+
+
+class AlertIndex:
+    """In-memory index of active property alerts.
+
+    Exact-match criteria (city, listing type, property type) are inverted
+    indexes, minimum bedrooms is a sorted threshold list and the price and
+    area ranges are interval trees, so matching a listing only touches the
+    alerts that can actually match it. Bathrooms and required features are
+    checked on the remaining candidates.
+
+    Every process keeps its own copy; it is dropped when alerts change (see
+    property.signals) and rebuilt every REFRESH_INTERVAL seconds regardless.
+    """
+    REFRESH_INTERVAL = 300
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded_at = 0
+        self._index = None
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+
+    @staticmethod
+    def _bound(value, default):
+        return float(value) if value is not None else default
+
+    def load(self):
+        from .models import PropertyAlert, PropertyType
+
+        type_ids_by_name = {
+            normalize_term(name): type_id
+            for type_id, name in PropertyType.objects.values_list('id', 'name')
+        }
+
+        alerts = {}
+        by_city = defaultdict(set)
+        by_listing_type = defaultdict(set)
+        by_property_type = defaultdict(set)
+        any_city, any_listing_type, any_property_type = set(), set(), set()
+        bedroom_thresholds = []
+        price_intervals, area_intervals = [], []
+        rows = PropertyAlert.objects.filter(is_active=True).values_list(
+            'id', 'cities', 'listing_types', 'property_types', 'min_price', 'max_price',
+            'min_bedrooms', 'min_bathrooms', 'min_area', 'max_area', 'required_features',
+        )
+        for (alert_id, cities, listing_types, property_types, min_price, max_price,
+             min_bedrooms, min_bathrooms, min_area, max_area, required_features) in rows:
+            required_feature_ids = feature_ids(required_features)
+            if inverted(min_price, max_price) or inverted(min_area, max_area) or required_feature_ids is None:
+                # Fails PropertyAlert.clean(), matches nothing (as in PropertyAlert.matches_property)
+                continue
+
+            type_ids = set()
+            for value in property_types or []:
+                term = normalize_term(value)
+                type_id = int(term) if term.isdigit() else type_ids_by_name.get(term)
+                if type_id is not None:
+                    type_ids.add(type_id)
+            if property_types and not type_ids:
+                # None of the requested types exist, the alert cannot match anything
+                continue
+
+            for city in cities or []:
+                by_city[normalize_term(city)].add(alert_id)
+            if not cities:
+                any_city.add(alert_id)
+            for listing_type in listing_types or []:
+                by_listing_type[listing_type].add(alert_id)
+            if not listing_types:
+                any_listing_type.add(alert_id)
+            for type_id in type_ids:
+                by_property_type[type_id].add(alert_id)
+            if not type_ids:
+                any_property_type.add(alert_id)
+
+            bedroom_thresholds.append((min_bedrooms or 0, alert_id))
+            price_intervals.append((
+                self._bound(min_price, UNBOUNDED_LOW), self._bound(max_price, UNBOUNDED_HIGH), alert_id
+            ))
+            area_intervals.append((
+                self._bound(min_area, UNBOUNDED_LOW), self._bound(max_area, UNBOUNDED_HIGH), alert_id
+            ))
+            alerts[alert_id] = {
+                'price_bounded': min_price is not None or max_price is not None,
+                'min_bathrooms': min_bathrooms or 0,
+                'required_features': required_feature_ids,
+            }
+
+        bedroom_thresholds.sort()
+        index = {
+            'alerts': alerts,
+            'by_city': by_city,
+            'by_listing_type': by_listing_type,
+            'by_property_type': by_property_type,
+            'any_city': any_city,
+            'any_listing_type': any_listing_type,
+            'any_property_type': any_property_type,
+            'bedroom_values': [threshold for threshold, alert_id in bedroom_thresholds],
+            'bedroom_alerts': [alert_id for threshold, alert_id in bedroom_thresholds],
+            'price': IntervalTree(price_intervals),
+            'area': IntervalTree(area_intervals),
+        }
+        with self._lock:
+            self._index = index
+            self._loaded_at = time.monotonic()
+        return index
+
+    def _current(self):
+        with self._lock:
+            if self._index is None or time.monotonic() - self._loaded_at > self.REFRESH_INTERVAL:
+                return self.load()
+            return self._index
+
+    def match(self, property_obj):
+        """Ids of the active alerts matching `property_obj`"""
+        index = self._current()
+        if not index['alerts']:
+            return set()
+
+        candidates = [
+            index['by_city'].get(normalize_term(property_obj.city), set()) | index['any_city'],
+            index['by_listing_type'].get(property_obj.listing_type, set()) | index['any_listing_type'],
+            index['by_property_type'].get(property_obj.property_type_id, set()) | index['any_property_type'],
+        ]
+        candidates.sort(key=len)
+        matched = candidates[0].intersection(*candidates[1:])
+        if not matched:
+            return matched
+
+        cutoff = bisect.bisect_right(index['bedroom_values'], property_obj.bedrooms or 0)
+        matched.intersection_update(index['bedroom_alerts'][:cutoff])
+
+        low, high = property_price_range(property_obj)
+        if low is None:
+            matched = {alert_id for alert_id in matched if not index['alerts'][alert_id]['price_bounded']}
+        else:
+            matched &= index['price'].overlapping(float(low), float(high))
+
+        if property_obj.total_area is not None:
+            matched &= index['area'].containing(float(property_obj.total_area))
+
+        alerts = index['alerts']
+        matched = {
+            alert_id for alert_id in matched
+            if (property_obj.bathrooms or 0) >= alerts[alert_id]['min_bathrooms']
+        }
+        if any(alerts[alert_id]['required_features'] for alert_id in matched):
+            feature_ids = set(property_obj.property_features.values_list('feature_id', flat=True))
+            matched = {
+                alert_id for alert_id in matched
+                if alerts[alert_id]['required_features'] <= feature_ids
+            }
+        return matched
+
+    def enqueue_matches(self, property_obj):
+        """Match a listing and put new (alert, property) pairs on the delivery queue"""
+        from .models import PropertyAlertMatch
+
+        alert_ids = self.match(property_obj)
+        if alert_ids:
+            PropertyAlertMatch.objects.bulk_create(
+                [PropertyAlertMatch(alert_id=alert_id, property=property_obj) for alert_id in alert_ids],
+                ignore_conflicts=True,
+            )
+        return alert_ids
+
+
+alert_index = AlertIndex()
@@ -0,0 +1,120 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from common.tasks import enqueue_many
+from .models import PropertyAlert, PropertyAlertMatch
+
+# How long an alert waits between two digests
+DIGEST_PERIODS = {
+    'instant': timedelta(0),
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+    'monthly': timedelta(days=30),
+}
+MAX_PROPERTIES_PER_DIGEST = 20
+
+
+def due_alerts(frequencies, now):
+    """Active email alerts whose period has elapsed, served by the (is_active, frequency, last_sent) index"""
+    due = Q()
+    for frequency in frequencies:
+        due |= Q(frequency=frequency) & (
+            Q(last_sent__isnull=True) | Q(last_sent__lte=now - DIGEST_PERIODS[frequency])
+        )
+    return PropertyAlert.objects.filter(due, is_active=True, email_alerts=True)
+
+
+def pending_matches(alert_ids):
+    """Undelivered matches for a batch of alerts in one query, grouped by alert"""
+    matches = {}
+    rows = PropertyAlertMatch.objects.filter(
+        alert_id__in=alert_ids,
+        delivered_at__isnull=True,
+        property__is_approved=True,
+        property__status='available',
+    ).order_by('alert_id', '-created_at').values(
+        'id', 'alert_id', 'property_id', 'property__title', 'property__slug', 'property__city',
+        'property__listing_type', 'property__bedrooms', 'property__minimum_price', 'property__maximum_price',
+    )
+    for row in rows:
+        matches.setdefault(row['alert_id'], []).append(row)
+    return matches
+
+
+def format_price(row):
+    low, high = row['property__minimum_price'], row['property__maximum_price']
+    if low is not None and high is not None and low != high:
+        return f"{low:,.0f} - {high:,.0f}"
+    price = low if low is not None else high
+    return f"{price:,.0f}" if price is not None else "Price on request"
+
+
+def render_digest(alert, matches):
+    """Email payload for the send_email background task"""
+    frontend_url = getattr(settings, 'FRONTEND_URL', '').rstrip('/')
+    shown = matches[:MAX_PROPERTIES_PER_DIGEST]
+    lines = [
+        f"Hi {alert['user__first_name'] or 'there'},",
+        "",
+        f"{len(matches)} new properties match your alert \"{alert['name']}\":",
+        "",
+    ]
+    for row in shown:
+        lines.append(
+            f"- {row['property__title']} ({row['property__city']}, {row['property__bedrooms']} BHK, "
+            f"{row['property__listing_type']}) {format_price(row)}"
+        )
+        lines.append(f"  {frontend_url}/properties/{row['property__slug'] or row['property_id']}")
+    if len(matches) > len(shown):
+        lines.append(f"...and {len(matches) - len(shown)} more.")
+    return {
+        'subject': f"{len(matches)} new properties for \"{alert['name']}\"",
+        'message': "\n".join(lines),
+        'recipient_list': [alert['user__email']],
+        'from_email': settings.DEFAULT_FROM_EMAIL,
+    }
+
+
+def send_alert_digests(frequencies=None, batch_size=200, dry_run=False):
+    """Queue one digest per due alert.
+
+    Alerts are processed in id order, `batch_size` at a time: one query for
+    the batch's matches, one bulk insert of send_email jobs (the worker sends
+    them over a single SMTP connection), then one UPDATE each for `last_sent`
+    and the delivered matches. Alerts without new matches still get
+    `last_sent` bumped so they are not scanned again until their next period.
+    """
+    frequencies = frequencies or list(DIGEST_PERIODS)
+    now = timezone.now()
+    stats = {'alerts': 0, 'queued': 0}
+    queryset = due_alerts(frequencies, now).order_by('id').values(
+        'id', 'name', 'user__email', 'user__first_name'
+    )
+
+    last_id = 0
+    while True:
+        alerts = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not alerts:
+            return stats
+        last_id = alerts[-1]['id']
+        matches = pending_matches([alert['id'] for alert in alerts])
+
+        payloads, match_ids = [], []
+        for alert in alerts:
+            alert_matches = matches.get(alert['id'])
+            if alert_matches and alert['user__email']:
+                payloads.append(render_digest(alert, alert_matches))
+                match_ids.extend(row['id'] for row in alert_matches)
+        stats['alerts'] += len(alerts)
+        stats['queued'] += len(payloads)
+        if dry_run:
+            continue
+
+        with transaction.atomic():
+            if payloads:
+                enqueue_many('send_email', payloads)
+            PropertyAlert.objects.filter(id__in=[alert['id'] for alert in alerts]).update(last_sent=now)
+            if match_ids:
+                PropertyAlertMatch.objects.filter(id__in=match_ids).update(delivered_at=now)
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from common.media import stored_media_metadata
+from property.models import FloorPlan, ProjectDocument, PropertyImage
+
+# label -> (model, file field, has image dimensions)
+MEDIA_MODELS = {
+    'images': (PropertyImage, 'image', True),
+    'floor-plans': (FloorPlan, 'image', True),
+    'documents': (ProjectDocument, 'file', False),
+}
+
+
+class Command(BaseCommand):
+    help = "Store size, MIME type, hash and dimensions for media uploaded before they were captured at upload"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=list(MEDIA_MODELS), action='append', help="Limit to these media types")
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        for label in options['only'] or list(MEDIA_MODELS):
+            model, field_name, dimensions = MEDIA_MODELS[label]
+            updated, missing = self.backfill(model, field_name, dimensions, options['batch_size'])
+            self.stdout.write(f"{label}: {updated} updated, {missing} missing from storage")
+
+    def backfill(self, model, field_name, dimensions, batch_size):
+        columns = ['file_size', 'mime_type', 'content_hash'] + (['width', 'height'] if dimensions else [])
+        updated = missing = 0
+        last_id = 0
+        while True:
+            rows = list(
+                model.objects.filter(id__gt=last_id, file_size__isnull=True)
+                .exclude(**{field_name: ''})
+                .order_by('id')
+                .only('id', field_name)[:batch_size]
+            )
+            if not rows:
+                return updated, missing
+            last_id = rows[-1].id
+
+            changed = []
+            for row in rows:
+                try:
+                    metadata = stored_media_metadata(getattr(row, field_name), dimensions)
+                except (FileNotFoundError, OSError):
+                    missing += 1
+                    continue
+                for attr, value in metadata.items():
+                    setattr(row, attr, value)
+                changed.append(row)
+            # bulk_update skips save(), so the metadata is not recomputed
+            model.objects.bulk_update(changed, columns)
+            updated += len(changed)
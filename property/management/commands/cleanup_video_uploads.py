@@ -0,0 +1,28 @@
+import os
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from property.models import VideoUploadSession
+
+
+class Command(BaseCommand):
+    help = "Abort expired chunked video uploads, delete their temp files and old finished sessions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-days', type=int, default=7, help="Days to keep completed/aborted sessions")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        expired = list(VideoUploadSession.objects.filter(status='active', expires_at__lte=now).only('id', 'upload_id'))
+        removed = 0
+        for session in expired:
+            if os.path.exists(session.temp_path()):
+                os.remove(session.temp_path())
+                removed += 1
+        VideoUploadSession.objects.filter(id__in=[session.id for session in expired]).update(
+            status='aborted', updated_at=now
+        )
+        deleted, _ = VideoUploadSession.objects.exclude(status='active').filter(
+            updated_at__lt=now - timedelta(days=options['keep_days'])
+        ).delete()
+        self.stdout.write(f"Aborted {len(expired)} expired uploads ({removed} temp files), deleted {deleted} old sessions")
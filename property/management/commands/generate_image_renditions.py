@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from common.tasks import enqueue_many
+from property.models import PropertyImage
+
+
+class Command(BaseCommand):
+    help = "Queue rendition jobs for property images that have none (run backfill_media_metadata first)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Regenerate every image, e.g. after IMAGE_RENDITIONS changed")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        queryset = PropertyImage.objects.exclude(image='').exclude(content_hash='')
+        if not options['all']:
+            queryset = queryset.filter(renditions={})
+        queryset = queryset.order_by('id').values_list('id', 'content_hash')
+
+        queued = 0
+        last_id = 0
+        while True:
+            rows = list(queryset.filter(id__gt=last_id)[:options['batch_size']])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            enqueue_many('generate_image_renditions', [
+                {'image_id': image_id, 'content_hash': content_hash} for image_id, content_hash in rows
+            ])
+            queued += len(rows)
+
+        self.stdout.write(f"Queued {queued} rendition jobs")
@@ -0,0 +1,31 @@
+from django.db.models import Q
+from django.core.management.base import BaseCommand
+from common.tasks import enqueue_many
+from property.models import PropertyVideo
+
+
+class Command(BaseCommand):
+    help = "Queue probe jobs for property videos missing their duration, thumbnail or file size"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        queryset = (
+            PropertyVideo.objects.exclude(video='')
+            .filter(Q(duration__isnull=True) | Q(file_size__isnull=True) | Q(thumbnail__isnull=True) | Q(thumbnail=''))
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+
+        queued = 0
+        last_id = 0
+        while True:
+            ids = list(queryset.filter(id__gt=last_id)[:options['batch_size']])
+            if not ids:
+                break
+            last_id = ids[-1]
+            enqueue_many('probe_videos', [{'video_id': video_id} for video_id in ids])
+            queued += len(ids)
+
+        self.stdout.write(f"Queued {queued} probe jobs")
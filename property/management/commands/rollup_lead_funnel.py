@@ -0,0 +1,96 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from property.models import Lead, LeadLog, LeadStageTransition, LeadFunnelDaily
+
+
+class Command(BaseCommand):
+    help = "Aggregate lead stage transitions into daily funnel rows (run at least daily)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Roll up a single day (YYYY-MM-DD)")
+        parser.add_argument('--days', type=int, default=2, help="Roll up the last N days including today")
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help="First replay LeadLog history for leads that have no stage transitions yet"
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            created = self.backfill(options['batch_size'])
+            self.stdout.write(f"Backfilled {created} stage transitions")
+
+        if options['date']:
+            day = parse_date(options['date'])
+            if day is None:
+                raise CommandError("--date must be YYYY-MM-DD")
+            days = [day]
+        elif options['backfill']:
+            first = LeadStageTransition.objects.order_by('changed_at').values_list('changed_at', flat=True).first()
+            today = timezone.localdate()
+            start = timezone.localdate(first) if first else today
+            days = [start + timedelta(days=offset) for offset in range((today - start).days + 1)]
+        else:
+            today = timezone.localdate()
+            days = [today - timedelta(days=offset) for offset in range(options['days'])]
+
+        for day in sorted(days):
+            rows = LeadFunnelDaily.rollup(day)
+            self.stdout.write(f"{day}: {rows} funnel rows")
+
+    def backfill(self, batch_size):
+        """Rebuild transitions from status_changed and contacted logs, one batch of leads at a time.
+
+        Agent and source come from the lead's current values, history does not keep them.
+        """
+        created = 0
+        last_id = 0
+        while True:
+            leads = list(
+                Lead.objects.filter(id__gt=last_id, stage_transitions__isnull=True)
+                .order_by('id')
+                .only('id', 'status', 'created_at', 'assigned_to_id', 'interested_property_id', 'lead_source')[:batch_size]
+            )
+            if not leads:
+                return created
+            last_id = leads[-1].id
+
+            history = {}
+            for lead_id, action, old_value, new_value, created_at in (
+                LeadLog.objects.filter(lead__in=leads, action__in=['status_changed', 'contacted'])
+                .order_by('lead_id', 'created_at', 'id')
+                .values_list('lead_id', 'action', 'old_value', 'new_value', 'created_at')
+            ):
+                history.setdefault(lead_id, []).append((action, old_value, new_value, created_at))
+
+            transitions = []
+            for lead in leads:
+                changes = history.get(lead.id, [])
+                transitions.extend(self.replay(lead, changes))
+            LeadStageTransition.objects.bulk_create(transitions)
+            created += len(transitions)
+
+    def replay(self, lead, changes):
+        """Transitions of one lead from its logs, oldest first"""
+        if not changes:
+            initial_status = lead.status
+        elif changes[0][1]:
+            initial_status = changes[0][1]
+        else:
+            # Contacted logs written before they carried the old status; leads start as 'new'
+            initial_status = Lead._meta.get_field('status').default
+        transitions = [LeadStageTransition.build(lead, None, initial_status, lead.created_at)]
+        status = initial_status
+        stage_entered_at = lead.created_at
+        for action, old_value, new_value, changed_at in changes:
+            if action == 'contacted':
+                old_value, new_value = status, 'contacted'
+                if old_value == new_value:
+                    continue
+            transitions.append(LeadStageTransition.build(lead, old_value, new_value, changed_at, stage_entered_at))
+            status = new_value
+            stage_entered_at = changed_at
+        return transitions
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from property.digests import DIGEST_PERIODS, send_alert_digests
+
+
+class Command(BaseCommand):
+    help = "Queue email digests of newly matched properties for alerts that are due (schedule every few minutes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--frequency',
+            action='append',
+            choices=list(DIGEST_PERIODS),
+            help="Only process alerts with this frequency (repeatable), defaults to all"
+        )
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--dry-run', action='store_true', help="Render digests without queueing or marking them")
+
+    def handle(self, *args, **options):
+        stats = send_alert_digests(
+            frequencies=options['frequency'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        self.stdout.write(f"Processed {stats['alerts']} due alerts, queued {stats['queued']} digests")
@@ -0,0 +1,140 @@
+"""All media of one property in a single cacheable document.
+
+Each property has a media version (`Property.media_version`), bumped in the
+same transaction as every change to its images, videos, virtual tours or
+floor plans. Saves and deletes bump it through signals; bulk writes, which
+send none, call `bump_media_version` themselves. Manifests are cached under
+the version, so a change makes old entries unreachable instead of having to
+delete them, and the version survives restarts and is shared by every
+process, which keeps the ETag built from it truthful.
+"""
+from django.core.cache import cache
+from django.db.models import F, Prefetch
+from django.utils.duration import duration_string
+from .models import FloorPlan, Property, PropertyImage, PropertyVideo, VirtualTour
+
+MANIFEST_CACHE_TIMEOUT = 60 * 60
+
+
+def media_version(property_id):
+    """The property's current media version, None if it does not exist"""
+    return Property.objects.filter(pk=property_id).values_list('media_version', flat=True).first()
+
+
+def bump_media_version(property_ids):
+    """Invalidate the manifests of `property_ids`; committed or rolled back with the change itself"""
+    property_ids = {property_id for property_id in property_ids if property_id is not None}
+    if property_ids:
+        Property.objects.filter(pk__in=property_ids).update(media_version=F('media_version') + 1)
+
+
+def manifest_cache_key(property_id, version, base_url):
+    # URLs are absolute, so the host is part of the key
+    return f'property:media-manifest:{property_id}:{version}:{base_url}'
+
+
+def media_queryset():
+    """The property with only the columns the manifest reads, media prefetched in display order"""
+    return Property.objects.only('id').prefetch_related(
+        Prefetch('images', queryset=PropertyImage.objects.only(
+            'id', 'property_id', 'image', 'alt_text', 'caption', 'is_primary', 'order',
+            'width', 'height', 'file_size', 'mime_type', 'content_hash', 'renditions',
+        ).order_by('order', 'id')),
+        Prefetch('videos', queryset=PropertyVideo.objects.only(
+            'id', 'property_id', 'video', 'thumbnail', 'title', 'description', 'duration', 'file_size', 'order',
+        ).order_by('order', 'id')),
+        Prefetch('virtual_tours', queryset=VirtualTour.objects.filter(is_active=True).only(
+            'id', 'property_id', 'tour_url', 'tour_type', 'provider', 'thumbnail', 'embed_code', 'description', 'order',
+        ).order_by('order', 'id')),
+        Prefetch('floor_plans', queryset=FloorPlan.objects.only(
+            'id', 'property_id', 'image', 'category', 'floor_no', 'square_feet', 'price',
+            'width', 'height', 'file_size',
+        ).order_by('category', 'square_feet', 'id')),
+    )
+
+
+def build_manifest(property_obj, request=None):
+    # Imported here: the serializers import bump_media_version from this module
+    from .serializers.propertyimage import image_renditions, image_srcset
+
+    def url(field_file):
+        if not field_file:
+            return None
+        return request.build_absolute_uri(field_file.url) if request else field_file.url
+
+    return {
+        'property': property_obj.id,
+        'images': [
+            {
+                'id': image.id,
+                'url': url(image.image),
+                'alt_text': image.alt_text,
+                'caption': image.caption,
+                'is_primary': image.is_primary,
+                'order': image.order,
+                'width': image.width,
+                'height': image.height,
+                'file_size': image.file_size,
+                'mime_type': image.mime_type,
+                'content_hash': image.content_hash,
+                'renditions': image_renditions(image, request),
+                'srcset': image_srcset(image, request),
+            }
+            for image in property_obj.images.all()
+        ],
+        'videos': [
+            {
+                'id': video.id,
+                'url': url(video.video),
+                'thumbnail_url': url(video.thumbnail),
+                'title': video.title,
+                'description': video.description,
+                'duration': duration_string(video.duration) if video.duration is not None else None,
+                'file_size': video.file_size,
+                'order': video.order,
+            }
+            for video in property_obj.videos.all()
+        ],
+        'virtual_tours': [
+            {
+                'id': tour.id,
+                'tour_url': tour.tour_url,
+                'tour_type': tour.tour_type,
+                'provider': tour.provider,
+                'thumbnail_url': url(tour.thumbnail),
+                'embed_code': tour.embed_code,
+                'description': tour.description,
+                'order': tour.order,
+            }
+            for tour in property_obj.virtual_tours.all()
+        ],
+        'floor_plans': [
+            {
+                'id': plan.id,
+                'url': url(plan.image),
+                'category': plan.category,
+                'floor_no': plan.floor_no,
+                'square_feet': str(plan.square_feet),
+                'price': str(plan.price),
+                'width': plan.width,
+                'height': plan.height,
+                'file_size': plan.file_size,
+            }
+            for plan in property_obj.floor_plans.all()
+        ],
+    }
+
+
+def media_manifest(property_id, version, request=None):
+    """The manifest of a property at `version` (see media_version), from the cache when nothing changed"""
+    base_url = request.build_absolute_uri('/') if request else ''
+    key = manifest_cache_key(property_id, version, base_url)
+    manifest = cache.get(key)
+    if manifest is None:
+        property_obj = media_queryset().filter(pk=property_id).first()
+        if property_obj is None:
+            return None
+        manifest = build_manifest(property_obj, request)
+        manifest['version'] = version
+        cache.set(key, manifest, MANIFEST_CACHE_TIMEOUT)
+    return manifest
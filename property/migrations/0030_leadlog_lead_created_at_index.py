@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0029_remove_property_property_pr_price_b1d594_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leadlog',
+            index=models.Index(fields=['lead', 'created_at'], name='property_le_lead_id_24fdf6_idx'),
+        ),
+    ]
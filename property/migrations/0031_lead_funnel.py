@@ -0,0 +1,60 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:30
+
+import datetime
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0030_leadlog_lead_created_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadFunnelDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('stage', models.CharField(choices=[('new', 'New'), ('contacted', 'Contacted'), ('qualified', 'Qualified'), ('proposal_sent', 'Proposal Sent'), ('negotiation', 'Negotiation'), ('won', 'Won'), ('lost', 'Lost'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('lead_source', models.CharField(blank=True, max_length=20)),
+                ('created', models.PositiveIntegerField(default=0)),
+                ('entered', models.PositiveIntegerField(default=0)),
+                ('exited', models.PositiveIntegerField(default=0)),
+                ('time_in_stage', models.DurationField(default=datetime.timedelta(0))),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('interested_property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='property.property')),
+            ],
+            options={
+                'verbose_name': 'Lead Funnel Daily',
+                'verbose_name_plural': 'Lead Funnel Daily',
+                'ordering': ['-date', 'stage'],
+                'indexes': [models.Index(fields=['date', 'stage'], name='property_le_date_bb0f7d_idx'), models.Index(fields=['agent', 'date'], name='property_le_agent_i_9acf10_idx'), models.Index(fields=['interested_property', 'date'], name='property_le_interes_ab5238_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeadStageTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, max_length=20)),
+                ('to_status', models.CharField(choices=[('new', 'New'), ('contacted', 'Contacted'), ('qualified', 'Qualified'), ('proposal_sent', 'Proposal Sent'), ('negotiation', 'Negotiation'), ('won', 'Won'), ('lost', 'Lost'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('lead_source', models.CharField(blank=True, max_length=20)),
+                ('time_in_previous_stage', models.DurationField(blank=True, null=True)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('interested_property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='property.property')),
+                ('lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stage_transitions', to='property.lead')),
+            ],
+            options={
+                'verbose_name': 'Lead Stage Transition',
+                'verbose_name_plural': 'Lead Stage Transitions',
+                'ordering': ['-changed_at'],
+                'indexes': [models.Index(fields=['changed_at'], name='property_le_changed_1b44a3_idx'), models.Index(fields=['lead', 'changed_at'], name='property_le_lead_id_d5401e_idx')],
+            },
+        ),
+    ]
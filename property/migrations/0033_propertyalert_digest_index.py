@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0032_propertyalertmatch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='propertyalert',
+            index=models.Index(fields=['is_active', 'frequency', 'last_sent'], name='property_pr_is_acti_68953b_idx'),
+        ),
+    ]
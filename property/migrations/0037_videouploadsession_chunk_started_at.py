@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0036_video_upload_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videouploadsession',
+            name='chunk_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:47
+
+import common.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0037_videouploadsession_chunk_started_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='floorplan',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=common.storage.media_storage, upload_to='floor_plans/'),
+        ),
+        migrations.AlterField(
+            model_name='projectdocument',
+            name='file',
+            field=models.FileField(storage=common.storage.media_storage, upload_to='project_documents/'),
+        ),
+        migrations.AlterField(
+            model_name='propertyimage',
+            name='image',
+            field=models.ImageField(storage=common.storage.media_storage, upload_to='property_images/%Y/%m/%d/'),
+        ),
+        migrations.AlterField(
+            model_name='propertyvideo',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, storage=common.storage.media_storage, upload_to='property_video_thumbnails/%Y/%m/%d/'),
+        ),
+        migrations.AlterField(
+            model_name='propertyvideo',
+            name='video',
+            field=models.FileField(storage=common.storage.media_storage, upload_to='property_videos/%Y/%m/%d/'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:22
+
+import os
+import common.storage
+from django.db import migrations, models, transaction
+from django.db.models import F
+
+
+def move_documents_to_private_storage(apps, schema_editor):
+    """Move document files out of public media.
+
+    Files uploaded before the content-addressed store are deleted once the
+    rows point at their copies; shared blobs only lose a reference and are
+    removed by gc_media_blobs when nothing else uses them.
+    """
+    ProjectDocument = apps.get_model('property', 'ProjectDocument')
+    MediaBlob = apps.get_model('common', 'MediaBlob')
+    public = common.storage.media_storage()
+    private = common.storage.private_storage()
+    for document in ProjectDocument.objects.exclude(file='').iterator():
+        old_name = document.file.name
+        if not public.exists(old_name):
+            continue
+        with public.open(old_name, 'rb') as content:
+            new_name = private.save(f'project_documents/{os.path.basename(old_name)}', content)
+        ProjectDocument.objects.filter(pk=document.pk).update(file=new_name)
+        if old_name.startswith(f'{common.storage.BLOB_DIR}/'):
+            MediaBlob.objects.filter(name=old_name).update(ref_count=F('ref_count') - 1)
+        else:
+            transaction.on_commit(lambda name=old_name: public.delete(name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0003_mediablob'),
+        ('property', '0038_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='projectdocument',
+            name='file',
+            field=models.FileField(storage=common.storage.private_storage, upload_to='project_documents/'),
+        ),
+        migrations.RunPython(move_documents_to_private_storage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property', '0039_private_project_documents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='media_version',
+            field=models.PositiveBigIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -3,10 +3,11 @@ from .project import Project, ProjectPhase, ProjectDocument
 from .property import Property, PropertyType
 from .amenity import Amenity
 from .propertyimage import PropertyImage
-from .propertyvideo import PropertyVideo
+from .propertyvideo import PropertyVideo, VideoUploadSession
 from .virtualtour import VirtualTour
 from .lead import Lead
 from .leadlog import LeadLog
+from .leadfunnel import LeadStageTransition, LeadFunnelDaily
 from .floorplan import FloorPlan
 from .propertyfeature import PropertyFeature, PropertyFeatureMapping, NeighborhoodInfo
 from .propertyinquiry import PropertyInquiry, PropertyViewing
@@ -14,6 +15,7 @@ from .propertyfavorite import (
     PropertyFavorite, 
     PropertyWishlist, 
     PropertyAlert, 
+    PropertyAlertMatch,
     PropertyComparison
 )
 from .propertyreview import PropertyReview, ReviewHelpfulness, PropertyReport
@@ -28,9 +30,12 @@ __all__ = [
     'Amenity',
     'PropertyImage',
     'PropertyVideo',
+    'VideoUploadSession',
     'VirtualTour',
     'Lead',
     'LeadLog',
+    'LeadStageTransition',
+    'LeadFunnelDaily',
     'FloorPlan',
     'PropertyFeature',
     'PropertyFeatureMapping',
@@ -41,6 +46,7 @@ __all__ = [
     'PropertyWishlist',
     'PropertyWishlistItem',
     'PropertyAlert',
+    'PropertyAlertMatch',
     'PropertyComparison',
     'PropertyReview',
     'ReviewHelpfulness',
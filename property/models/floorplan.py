@@ -1,4 +1,6 @@
 from django.db import models
+from common.media import apply_media_metadata
+from common.storage import media_storage
 from property.models import Property  # assuming Property model exists
 
 
@@ -11,10 +13,20 @@ class FloorPlan(models.Model):
     category = models.CharField(max_length=20)
     square_feet = models.DecimalField(max_digits=10, decimal_places=2)
     price = models.DecimalField(max_digits=12, decimal_places=2)
-    image = models.ImageField(upload_to='floor_plans/', blank=True, null=True)
+    image = models.ImageField(upload_to='floor_plans/', storage=media_storage, blank=True, null=True)
     floor_no = models.CharField(max_length=10, blank=True, null=True)
+    # Captured at upload, see common.media
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    mime_type = models.CharField(max_length=100, blank=True, editable=False)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.property} - {self.category} ({self.square_feet} sqft)"
+
+    def save(self, *args, **kwargs):
+        apply_media_metadata(self, 'image', dimensions=True)
+        super().save(*args, **kwargs)
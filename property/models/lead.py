@@ -36,6 +36,10 @@ class Lead(BaseModel):
         ('urgent', 'Urgent'),
     ]
 
+    # Statuses that imply the lead has been reached at least once
+    CONTACTED_STATUSES = ['contacted', 'qualified', 'proposal_sent', 'negotiation', 'won', 'lost']
+    CLOSED_STATUSES = ['won', 'lost', 'cancelled']
+
     # Lead Information
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
@@ -153,7 +157,7 @@ class Lead(BaseModel):
 
     @property
     def is_active(self):
-        return self.status not in ['won', 'lost', 'cancelled']
+        return self.status not in self.CLOSED_STATUSES
 
     @property
     def days_since_last_contact(self):
@@ -172,7 +176,7 @@ class Lead(BaseModel):
 
     def save(self, *args, **kwargs):
         # Update last_contacted when status changes to contacted or beyond
-        if self.status in ['contacted', 'qualified', 'proposal_sent', 'negotiation', 'won', 'lost']:
+        if self.status in self.CONTACTED_STATUSES:
             from django.utils import timezone
             if not self.last_contacted:
                 self.last_contacted = timezone.now()
@@ -0,0 +1,188 @@
+from datetime import datetime, time, timedelta
+from django.db import models, transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from .property import Property
+from .lead import Lead
+
+CustomUser = get_user_model()
+
+
+class LeadStageTransition(models.Model):
+    """One row per status a lead enters, the fact table behind funnel analytics.
+
+    Agent, property and source are copied from the lead at the time of the
+    change so rollups never have to join back to leads. `changed_at` is set
+    explicitly (not auto_now_add) so history can be replayed from LeadLog.
+    """
+    lead = models.ForeignKey(
+        Lead,
+        on_delete=models.CASCADE,
+        related_name='stage_transitions'
+    )
+    from_status = models.CharField(max_length=20, blank=True)
+    to_status = models.CharField(max_length=20, choices=Lead.LEAD_STATUS_CHOICES)
+    agent = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    interested_property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    lead_source = models.CharField(max_length=20, blank=True)
+    time_in_previous_stage = models.DurationField(null=True, blank=True)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Lead Stage Transition'
+        verbose_name_plural = 'Lead Stage Transitions'
+        ordering = ['-changed_at']
+        indexes = [
+            models.Index(fields=['changed_at']),
+            models.Index(fields=['lead', 'changed_at']),
+        ]
+
+    def __str__(self):
+        return f"Lead {self.lead_id}: {self.from_status or '-'} → {self.to_status}"
+
+    @classmethod
+    def build(cls, lead, from_status, to_status, changed_at, stage_entered_at=None):
+        return cls(
+            lead_id=lead.pk,
+            from_status=from_status or '',
+            to_status=to_status,
+            agent_id=lead.assigned_to_id,
+            interested_property_id=lead.interested_property_id,
+            lead_source=lead.lead_source or '',
+            time_in_previous_stage=changed_at - stage_entered_at if from_status and stage_entered_at else None,
+            changed_at=changed_at,
+        )
+
+    @classmethod
+    def record(cls, lead, from_status, to_status, changed_at=None):
+        """Store a single transition, timing the stage that is being left"""
+        changed_at = changed_at or timezone.now()
+        stage_entered_at = None
+        if from_status:
+            stage_entered_at = cls.objects.filter(lead=lead).aggregate(
+                last=Max('changed_at')
+            )['last'] or lead.created_at
+        transition = cls.build(lead, from_status, to_status, changed_at, stage_entered_at)
+        transition.save()
+        return transition
+
+    @classmethod
+    def record_many(cls, lead_ids, old_statuses, to_status, changed_at=None):
+        """Store transitions for a bulk status change with two queries.
+
+        `old_statuses` maps lead id to the status the lead is leaving.
+        """
+        changed_at = changed_at or timezone.now()
+        leads = Lead.objects.filter(id__in=lead_ids).only(
+            'id', 'created_at', 'assigned_to_id', 'interested_property_id', 'lead_source'
+        )
+        stage_entered = dict(
+            cls.objects.filter(lead_id__in=lead_ids)
+            .values('lead_id')
+            .annotate(last=Max('changed_at'))
+            .values_list('lead_id', 'last')
+        )
+        cls.objects.bulk_create([
+            cls.build(
+                lead,
+                old_statuses.get(lead.id),
+                to_status,
+                changed_at,
+                stage_entered.get(lead.id) or lead.created_at,
+            )
+            for lead in leads
+        ])
+
+
+class LeadFunnelDaily(models.Model):
+    """Daily funnel aggregates per stage, agent, property and source.
+
+    Rebuilt from LeadStageTransition by the `rollup_lead_funnel` command;
+    `entered` counts transitions into the stage (`created` those where the lead
+    was created in it), `exited` and `time_in_stage` cover transitions out of it.
+    """
+    date = models.DateField()
+    stage = models.CharField(max_length=20, choices=Lead.LEAD_STATUS_CHOICES)
+    agent = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    interested_property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    lead_source = models.CharField(max_length=20, blank=True)
+    created = models.PositiveIntegerField(default=0)
+    entered = models.PositiveIntegerField(default=0)
+    exited = models.PositiveIntegerField(default=0)
+    time_in_stage = models.DurationField(default=timedelta(0))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Lead Funnel Daily'
+        verbose_name_plural = 'Lead Funnel Daily'
+        ordering = ['-date', 'stage']
+        indexes = [
+            models.Index(fields=['date', 'stage']),
+            models.Index(fields=['agent', 'date']),
+            models.Index(fields=['interested_property', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.stage}: {self.entered} in / {self.exited} out"
+
+    @classmethod
+    def rollup(cls, day):
+        """Recompute the rows for one day from the transition table, returns the row count"""
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        transitions = LeadStageTransition.objects.filter(
+            changed_at__gte=start,
+            changed_at__lt=start + timedelta(days=1),
+        )
+        dimensions = ('agent_id', 'interested_property_id', 'lead_source')
+
+        rows = {}
+
+        def row_for(stage, item):
+            key = (stage,) + tuple(item[name] for name in dimensions)
+            if key not in rows:
+                rows[key] = cls(date=day, stage=stage, **{name: item[name] for name in dimensions})
+            return rows[key]
+
+        entered = transitions.values('to_status', *dimensions).annotate(
+            entered=Count('id'),
+            created=Count('id', filter=Q(from_status='')),
+        )
+        for item in entered:
+            row = row_for(item['to_status'], item)
+            row.entered = item['entered']
+            row.created = item['created']
+
+        exited = transitions.exclude(from_status='').values('from_status', *dimensions).annotate(
+            exited=Count('id'),
+            total_time=Sum('time_in_previous_stage'),
+        )
+        for item in exited:
+            row = row_for(item['from_status'], item)
+            row.exited = item['exited']
+            row.time_in_stage = item['total_time'] or timedelta(0)
+
+        with transaction.atomic():
+            cls.objects.filter(date=day).delete()
+            cls.objects.bulk_create(rows.values())
+        return len(rows)
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from common.models import BaseModel
 from .lead import Lead
+from .leadfunnel import LeadStageTransition
 
 CustomUser = get_user_model()
 
@@ -47,6 +48,9 @@ class LeadLog(BaseModel):
         verbose_name = 'Lead Log'
         verbose_name_plural = 'Lead Logs'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['lead', 'created_at']),
+        ]
 
     def __str__(self):
         return f"{self.get_action_display()} - {self.lead.full_name}"
@@ -54,6 +58,14 @@ class LeadLog(BaseModel):
     @classmethod
     def log_action(cls, lead, action, performed_by=None, old_value=None, new_value=None, description=None, notes=None):
         """Simple method to log any action"""
+        # Feed the funnel fact table from the same place status changes are logged
+        if action == 'created':
+            LeadStageTransition.record(lead, None, lead.status)
+        elif action == 'status_changed':
+            LeadStageTransition.record(lead, old_value, new_value)
+        elif action == 'contacted' and old_value and old_value != 'contacted':
+            # mark_contacted moves the lead to 'contacted' without a separate status_changed log
+            LeadStageTransition.record(lead, old_value, 'contacted')
         return cls.objects.create(
             lead=lead,
             action=action,
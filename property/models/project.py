@@ -1,5 +1,7 @@
 from django.db import models
+from common.media import apply_media_metadata
 from common.models import BaseModel
+from common.storage import private_storage
 from django.contrib.auth import get_user_model
 
 CustomUser = get_user_model()
@@ -32,9 +34,17 @@ class ProjectPhase(models.Model):
 
 class ProjectDocument(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='documents')
-    file = models.FileField(upload_to='project_documents/')
+    file = models.FileField(upload_to='project_documents/', storage=private_storage)
     name = models.CharField(max_length=255)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Captured at upload, see common.media
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    mime_type = models.CharField(max_length=100, blank=True, editable=False)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
 
     def __str__(self):
-        return f"{self.name} ({self.project.name})"
\ No newline at end of file
+        return f"{self.name} ({self.project.name})"
+
+    def save(self, *args, **kwargs):
+        apply_media_metadata(self, 'file')
+        super().save(*args, **kwargs)
\ No newline at end of file
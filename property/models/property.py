@@ -200,6 +200,8 @@ class Property(BaseModel):
     
     # Statistics
     views_count = models.PositiveIntegerField(default=0)
+    # Bumped on every media change by property.manifest.bump_media_version
+    media_version = models.PositiveBigIntegerField(default=1, editable=False)
 
     # Approval System
     is_approved = models.BooleanField(default=False)
@@ -264,7 +266,14 @@ class Property(BaseModel):
                 slug = f"{base_slug}-{counter}"
                 counter += 1
             self.slug = slug
-            
+
+        if kwargs.get('update_fields') is None and not kwargs.get('force_insert') and not self._state.adding:
+            # media_version is only changed in the database; a stale copy must not overwrite it
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'media_version' and field.attname not in deferred
+            ]
         super().save(*args, **kwargs)
 
     @property
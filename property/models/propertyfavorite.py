@@ -1,3 +1,4 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from common.models import BaseModel
 from django.conf import settings
@@ -5,6 +6,36 @@ from .property import Property
 from authapp.models import CustomUser
 
 
+def normalize_term(value):
+    """Case and whitespace insensitive form used to compare alert criteria"""
+    return str(value).strip().lower() if value is not None else ''
+
+
+def feature_ids(values):
+    """Required feature ids as a set of ints, None if any of them is not a whole number"""
+    ids = set()
+    for value in values or []:
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, str) and value.strip().isdecimal():
+            value = int(value)
+        if not isinstance(value, int):
+            return None
+        ids.add(value)
+    return ids
+
+
+def inverted(low, high):
+    return low is not None and high is not None and low > high
+
+
+def property_price_range(property_obj):
+    """(low, high) price of a listing; a single known bound is used for both ends"""
+    low = property_obj.minimum_price if property_obj.minimum_price is not None else property_obj.maximum_price
+    high = property_obj.maximum_price if property_obj.maximum_price is not None else property_obj.minimum_price
+    return low, high
+
+
 class PropertyFavorite(BaseModel):
     """Model for users to save favorite properties"""
     user = models.ForeignKey(
@@ -141,55 +172,115 @@ class PropertyAlert(BaseModel):
         verbose_name = 'Property Alert'
         verbose_name_plural = 'Property Alerts'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_active', 'frequency', 'last_sent']),
+        ]
 
     def __str__(self):
         return f"{self.user.email}'s alert: {self.name}"
 
+    def clean(self):
+        super().clean()
+        errors = {}
+        if inverted(self.min_price, self.max_price):
+            errors['max_price'] = "Maximum price must not be below the minimum price"
+        if inverted(self.min_area, self.max_area):
+            errors['max_area'] = "Maximum area must not be below the minimum area"
+        if feature_ids(self.required_features) is None:
+            errors['required_features'] = "Required features must be a list of feature ids"
+        if errors:
+            raise ValidationError(errors)
+
     def matches_property(self, property_obj):
-        """Check if a property matches this alert's criteria"""
+        """Check if a property matches this alert's criteria.
+
+        Reference implementation for a single pair; matching a listing against
+        all alerts goes through property.alerts.alert_index instead.
+        """
         # Check cities
-        if self.cities and property_obj.city not in self.cities:
-            return False
-            
-        # Check property types
-        if self.property_types and property_obj.property_type not in self.property_types:
+        if self.cities and normalize_term(property_obj.city) not in {normalize_term(city) for city in self.cities}:
             return False
-            
+
+        # Check property types (stored as ids or names)
+        if self.property_types:
+            property_type = property_obj.property_type
+            accepted = {normalize_term(value) for value in self.property_types}
+            if not property_type or not accepted & {str(property_type.id), normalize_term(property_type.name)}:
+                return False
+
         # Check listing types
         if self.listing_types and property_obj.listing_type not in self.listing_types:
             return False
-            
-        # Check price range
-        if self.min_price and property_obj.price < self.min_price:
+
+        # Alerts that fail clean() match nothing (the alert index skips them too)
+        required_features = feature_ids(self.required_features)
+        if inverted(self.min_price, self.max_price) or inverted(self.min_area, self.max_area):
             return False
-        if self.max_price and property_obj.price > self.max_price:
+        if required_features is None:
             return False
-            
+
+        # Check price range, the property's price range has to overlap the alert's
+        if self.min_price is not None or self.max_price is not None:
+            low, high = property_price_range(property_obj)
+            if low is None:
+                return False
+            if self.min_price is not None and high < self.min_price:
+                return False
+            if self.max_price is not None and low > self.max_price:
+                return False
+
         # Check bedrooms
         if self.min_bedrooms and property_obj.bedrooms < self.min_bedrooms:
             return False
-            
+
         # Check bathrooms
         if self.min_bathrooms and property_obj.bathrooms < self.min_bathrooms:
             return False
-            
+
         # Check area
-        if self.min_area and property_obj.total_area < self.min_area:
+        if self.min_area is not None and property_obj.total_area < self.min_area:
             return False
-        if self.max_area and property_obj.total_area > self.max_area:
+        if self.max_area is not None and property_obj.total_area > self.max_area:
             return False
-            
+
         # Check required features
-        if self.required_features:
-            property_feature_ids = list(
+        if required_features:
+            property_feature_ids = set(
                 property_obj.property_features.values_list('feature_id', flat=True)
             )
-            for required_feature_id in self.required_features:
-                if required_feature_id not in property_feature_ids:
-                    return False
-                    
+            if not required_features <= property_feature_ids:
+                return False
+
         return True
 
+
+class PropertyAlertMatch(BaseModel):
+    """Delivery queue of properties that matched an alert, drained by the alert senders"""
+    alert = models.ForeignKey(
+        PropertyAlert,
+        on_delete=models.CASCADE,
+        related_name='matches'
+    )
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        related_name='alert_matches'
+    )
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Property Alert Match'
+        verbose_name_plural = 'Property Alert Matches'
+        unique_together = [['alert', 'property']]
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['alert', 'delivered_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.property.title} for alert {self.alert.name}"
+
+
 class PropertyComparison(BaseModel):
     """Model for users to compare multiple properties"""
     user = models.ForeignKey(
@@ -1,5 +1,8 @@
 from django.db import models
+from common.media import apply_media_metadata
 from common.models import BaseModel
+from common.storage import media_storage
+from common.tasks import enqueue
 from .property import Property
 
 
@@ -9,11 +12,19 @@ class PropertyImage(BaseModel):
         on_delete=models.CASCADE,
         related_name='images'
     )
-    image = models.ImageField(upload_to='property_images/%Y/%m/%d/')
+    image = models.ImageField(upload_to='property_images/%Y/%m/%d/', storage=media_storage)
     alt_text = models.CharField(max_length=255, blank=True)
     caption = models.CharField(max_length=500, blank=True)
     is_primary = models.BooleanField(default=False)
     order = models.PositiveIntegerField(default=0)
+    # Captured at upload, see common.media
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    mime_type = models.CharField(max_length=100, blank=True, editable=False)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    # {name: {'width', 'height', 'webp', 'jpeg'}} filled in by the generate_image_renditions task
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         verbose_name = 'Property Image'
@@ -25,6 +36,10 @@ class PropertyImage(BaseModel):
         return f"Image for {self.property.title}"
 
     def save(self, *args, **kwargs):
+        new_upload = apply_media_metadata(self, 'image', dimensions=True)
+        if new_upload:
+            self.renditions = {}
+
         # Ensure only one primary image per property
         if self.is_primary:
             PropertyImage.objects.filter(
@@ -38,6 +53,9 @@ class PropertyImage(BaseModel):
             
         super().save(*args, **kwargs)
 
+        if new_upload and self.image:
+            enqueue('generate_image_renditions', {'image_id': self.pk, 'content_hash': self.content_hash})
+
     def delete(self, *args, **kwargs):
         # If deleting primary image, make another image primary
         if self.is_primary:
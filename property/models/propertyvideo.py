@@ -1,5 +1,11 @@
+import os
+import uuid
+from django.conf import settings
 from django.db import models
+from common.media import is_new_upload
 from common.models import BaseModel
+from common.storage import media_storage
+from common.tasks import enqueue
 from .property import Property
 
 
@@ -9,12 +15,14 @@ class PropertyVideo(BaseModel):
         on_delete=models.CASCADE,
         related_name='videos'
     )
-    video = models.FileField(upload_to='property_videos/%Y/%m/%d/')
+    video = models.FileField(upload_to='property_videos/%Y/%m/%d/', storage=media_storage)
     title = models.CharField(max_length=255, blank=True)
     description = models.TextField(blank=True)
-    thumbnail = models.ImageField(upload_to='property_video_thumbnails/%Y/%m/%d/', blank=True, null=True)
+    thumbnail = models.ImageField(
+        upload_to='property_video_thumbnails/%Y/%m/%d/', storage=media_storage, blank=True, null=True
+    )
     duration = models.DurationField(blank=True, null=True, help_text="Video duration")
-    file_size = models.PositiveIntegerField(blank=True, null=True, help_text="File size in bytes")
+    file_size = models.PositiveBigIntegerField(blank=True, null=True, help_text="File size in bytes")
     order = models.PositiveIntegerField(default=0)
 
     class Meta:
@@ -24,4 +32,51 @@ class PropertyVideo(BaseModel):
         unique_together = [['property', 'order']]
 
     def __str__(self):
-        return f"Video: {self.title or 'Untitled'} for {self.property.title}"
\ No newline at end of file
+        return f"Video: {self.title or 'Untitled'} for {self.property.title}"
+
+    def save(self, *args, **kwargs):
+        new_upload = is_new_upload(self.video)
+        super().save(*args, **kwargs)
+        if new_upload:
+            # Duration, poster frame and size are filled in by the worker
+            enqueue('probe_videos', {'video_id': self.pk})
+
+
+class VideoUploadSession(BaseModel):
+    """A resumable chunked video upload (see property.viewsets.videoupload).
+
+    Chunks are appended to a file under VIDEO_UPLOAD_TEMP_DIR; `received`
+    is the offset the next chunk must start at and `chunk_started_at` marks
+    a chunk being written by another request. Finalizing verifies the
+    checksum and turns the file into a PropertyVideo.
+    """
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('completed', 'Completed'),
+        ('aborted', 'Aborted'),
+    ]
+
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='video_uploads')
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    received = models.PositiveBigIntegerField(default=0)
+    # Set while a PUT streams the chunk starting at `received`, see VideoUploadViewSet.update
+    chunk_started_at = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    title = models.CharField(max_length=255, blank=True)
+    description = models.TextField(blank=True)
+    order = models.PositiveIntegerField(null=True, blank=True)
+    expires_at = models.DateTimeField()
+    video = models.ForeignKey(PropertyVideo, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'expires_at'])]
+
+    def __str__(self):
+        return f"Upload {self.upload_id} ({self.received}/{self.total_size})"
+
+    def temp_path(self):
+        # Not a @property: the `property` field shadows the builtin in this class body
+        return os.path.join(settings.VIDEO_UPLOAD_TEMP_DIR, f"{self.upload_id}.part")
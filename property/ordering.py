@@ -0,0 +1,71 @@
+"""Display order of a property's images, videos and virtual tours.
+
+Each of these models is unique on (property, order). Appends and reorders
+lock the property row first, so concurrent uploads to one property queue up
+behind it instead of racing for the same position. Reorders then move rows
+in two bulk updates: first past the highest position in use, then into
+place. The unique constraint therefore never sees two rows on one position,
+which matters on MySQL, where constraints cannot be deferred.
+"""
+from django.db import transaction
+from django.db.models import Max
+from .manifest import bump_media_version
+from .models import Property
+
+
+def lock_property(property_id):
+    """Lock the property row until the end of the transaction (must be inside transaction.atomic)"""
+    list(Property.objects.select_for_update().filter(pk=property_id).values_list('pk', flat=True))
+
+
+def next_order(model, property_id):
+    """The position after the property's last one, reserved until the transaction ends"""
+    lock_property(property_id)
+    last_order = model.objects.filter(property_id=property_id).aggregate(last_order=Max('order'))['last_order']
+    return (last_order or 0) + 1
+
+
+def position_taken(model, property_id, order):
+    return model.objects.filter(property_id=property_id, order=order).exists()
+
+
+def apply_order(model, property_id, ordered_ids):
+    """
+    Give the property's rows of `model` positions 1..n in the order of `ordered_ids`.
+
+    `ordered_ids` must list every row of the property exactly once, otherwise
+    ValueError is raised and nothing changes. Rows already in place are not
+    written. Returns the number of rows moved.
+    """
+    with transaction.atomic():
+        lock_property(property_id)
+        current = dict(model.objects.filter(property_id=property_id).values_list('id', 'order'))
+        if len(set(ordered_ids)) != len(ordered_ids):
+            raise ValueError("Each id may appear only once")
+        if set(ordered_ids) != set(current):
+            missing = sorted(set(current) - set(ordered_ids))
+            unknown = sorted(set(ordered_ids) - set(current))
+            raise ValueError(
+                f"The ordering must list every item of the property exactly once "
+                f"(missing: {missing}, not on this property: {unknown})"
+            )
+
+        moved = [
+            model(id=row_id, order=position)
+            for position, row_id in enumerate(ordered_ids, start=1)
+            if current[row_id] != position
+        ]
+        if not moved:
+            return 0
+
+        final = {row.id: row.order for row in moved}
+        # Park the moved rows above every position in use, then drop them into place
+        offset = max(max(current.values()), len(ordered_ids)) + 1
+        for i, row in enumerate(moved):
+            row.order = offset + i
+        model.objects.bulk_update(moved, ['order'])
+        for row in moved:
+            row.order = final[row.id]
+        model.objects.bulk_update(moved, ['order'])
+        bump_media_version([property_id])
+    return len(moved)
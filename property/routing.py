@@ -0,0 +1,118 @@
+import itertools
+import threading
+import time
+from django.db.models import Count
+
+
+class LeadRouter:
+    """In-memory workload model used to pick an agent for new leads.
+
+    Agents, their service areas/specializations and their open lead counts are
+    loaded with a handful of aggregate queries. After that, counts are kept up to
+    date from Lead saves and deletes (see property.signals), so a routing decision
+    is a single pass over the agents without touching the database.
+
+    Every process keeps its own copy, so the model is rebuilt every
+    REFRESH_INTERVAL seconds to absorb changes made by other workers.
+    """
+    AGENT_GROUP = 'Agent'
+    REFRESH_INTERVAL = 300
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._agents = None
+        self._property_types = {}
+        self._open_counts = {}
+        self._last_assigned = {}
+        self._ticks = itertools.count(1)
+        self._loaded_at = 0
+
+    @staticmethod
+    def _normalize(value):
+        return str(value).strip().lower() if value else ''
+
+    def invalidate(self):
+        """Drop the model; it is reloaded on the next routing decision"""
+        with self._lock:
+            self._agents = None
+
+    def load(self):
+        from authapp.models import CustomUser
+        from .models import Lead, PropertyType
+
+        agents = {}
+        rows = CustomUser.objects.filter(
+            groups__name=self.AGENT_GROUP,
+            is_active=True,
+        ).values_list('id', 'agent_profile__service_areas', 'agent_profile__specialization')
+        for agent_id, service_areas, specialization in rows:
+            agents[agent_id] = {
+                'areas': {self._normalize(area) for area in service_areas or []},
+                'specializations': {self._normalize(item) for item in specialization or []},
+            }
+
+        open_counts = dict(
+            Lead.objects.filter(assigned_to_id__in=agents.keys())
+            .exclude(status__in=Lead.CLOSED_STATUSES)
+            .values('assigned_to')
+            .annotate(open_leads=Count('id'))
+            .values_list('assigned_to', 'open_leads')
+        ) if agents else {}
+
+        with self._lock:
+            self._agents = agents
+            self._open_counts = open_counts
+            self._property_types = {
+                type_id: self._normalize(name)
+                for type_id, name in PropertyType.objects.values_list('id', 'name')
+            }
+            self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        if self._agents is None or time.monotonic() - self._loaded_at > self.REFRESH_INTERVAL:
+            self.load()
+
+    def route(self, locations=(), property_type_id=None):
+        """Return the id of the agent who should receive a lead, or None.
+
+        Agents serving one of `locations` are preferred, then agents specialized
+        in the property type, then the one with the fewest open leads; ties go
+        to whoever was picked least recently (round robin).
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if not self._agents:
+                return None
+
+            wanted_locations = {self._normalize(location) for location in locations if location}
+            wanted_type = self._property_types.get(property_type_id, '')
+            best_score = None
+            best_agent = None
+            for agent_id, profile in self._agents.items():
+                score = (
+                    0 if wanted_locations & profile['areas'] else 1,
+                    0 if wanted_type and wanted_type in profile['specializations'] else 1,
+                    self._open_counts.get(agent_id, 0),
+                    self._last_assigned.get(agent_id, 0),
+                )
+                if best_score is None or score < best_score:
+                    best_score = score
+                    best_agent = agent_id
+
+            self._last_assigned[best_agent] = next(self._ticks)
+            return best_agent
+
+    def record_change(self, old_agent_id, new_agent_id):
+        """Move one open lead from `old_agent_id` to `new_agent_id` (either may be None)"""
+        if old_agent_id == new_agent_id:
+            return
+        with self._lock:
+            if self._agents is None:
+                return
+            if old_agent_id is not None:
+                self._open_counts[old_agent_id] = max(self._open_counts.get(old_agent_id, 0) - 1, 0)
+            if new_agent_id is not None:
+                self._open_counts[new_agent_id] = self._open_counts.get(new_agent_id, 0) + 1
+
+
+lead_router = LeadRouter()
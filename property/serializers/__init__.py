@@ -49,7 +49,9 @@ from .lead import (
     LeadCreateSerializer,
     LeadDetailSerializer,
     LeadListSerializer,
-    LeadUpdateSerializer
+    LeadUpdateSerializer,
+    LeadImportSerializer,
+    LeadBulkActionSerializer
 )
 
 from .floorplan import (
@@ -101,6 +103,8 @@ __all__ = [
     'LeadDetailSerializer',
     'LeadListSerializer',
     'LeadUpdateSerializer',
+    'LeadImportSerializer',
+    'LeadBulkActionSerializer',
     'FloorPlanCreateSerializer',
     'FloorPlanDetailSerializer',
     'FloorPlanListSerializer',
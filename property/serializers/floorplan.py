@@ -1,4 +1,9 @@
+from django.db import connection, transaction
+from django.utils import timezone
 from rest_framework import serializers
+from common.media import delete_stored, empty_metadata, is_new_upload, store_uploads
+from common.storage import add_references, remove_references
+from ..manifest import bump_media_version
 from ..models import FloorPlan, Property
 
 
@@ -28,12 +33,8 @@ class FloorPlanListSerializer(serializers.ModelSerializer):
         return None
 
     def get_file_size(self, obj):
-        if obj.image:
-            try:
-                return obj.image.size
-            except:
-                return None
-        return None
+        # Stored at upload (common.media), no storage access
+        return obj.file_size
 
 
 class FloorPlanDetailSerializer(serializers.ModelSerializer):
@@ -56,22 +57,15 @@ class FloorPlanDetailSerializer(serializers.ModelSerializer):
         return None
 
     def get_file_size(self, obj):
-        if obj.image:
-            try:
-                return obj.image.size
-            except:
-                return None
-        return None
+        # Stored at upload (common.media), no storage access
+        return obj.file_size
 
     def get_image_dimensions(self, obj):
-        if obj.image:
-            try:
-                return {
-                    'width': obj.image.width,
-                    'height': obj.image.height
-                }
-            except:
-                return None
+        if obj.width is not None and obj.height is not None:
+            return {
+                'width': obj.width,
+                'height': obj.height
+            }
         return None
 
 
@@ -135,18 +129,68 @@ class FloorPlanUpdateSerializer(serializers.ModelSerializer):
         return data
 
 
+class FloorPlanBulkItemSerializer(FloorPlanCreateSerializer):
+    """One bulk-create item; the property is looked up for the whole batch at once"""
+    property = serializers.IntegerField()
+
+
+def store_floor_plan_images(floor_plans):
+    """Write the new images of `floor_plans` concurrently and fill in their name and metadata"""
+    field = FloorPlan._meta.get_field('image')
+    pending = [plan for plan in floor_plans if is_new_upload(plan.image)]
+    if not pending:
+        return []
+    stored = store_uploads(field, pending, [plan.image.file for plan in pending], dimensions=True)
+    for plan, (name, metadata) in zip(pending, stored):
+        plan.image = name
+        for attr, value in metadata.items():
+            setattr(plan, attr, value)
+    return [name for name, metadata in stored]
+
+
 class FloorPlanBulkCreateSerializer(serializers.Serializer):
     """Serializer for bulk creating floor plans"""
-    floor_plans = FloorPlanCreateSerializer(many=True)
-
-    def create(self, validated_data):
-        floor_plans_data = validated_data['floor_plans']
-        floor_plans = []
+    floor_plans = FloorPlanBulkItemSerializer(many=True, allow_empty=False)
 
-        for floor_plan_data in floor_plans_data:
-            floor_plan = FloorPlan.objects.create(**floor_plan_data)
-            floor_plans.append(floor_plan)
+    def validate_floor_plans(self, value):
+        properties = Property.objects.in_bulk({item['property'] for item in value})
+        errors = [
+            {} if item['property'] in properties
+            else {'property': [f"Property with id {item['property']} does not exist"]}
+            for item in value
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        for item in value:
+            item['property'] = properties[item['property']]
+        return value
 
+    def create(self, validated_data):
+        """
+        Store any images concurrently, then insert every row with one bulk_create
+        (one INSERT per row on databases that cannot return the new ids).
+        
+        Nothing is created unless every item is valid; files written for a
+        failed insert are removed again.
+        """
+        floor_plans = [FloorPlan(**item) for item in validated_data['floor_plans']]
+        field = FloorPlan._meta.get_field('image')
+        stored = store_floor_plan_images(floor_plans)
+        try:
+            with transaction.atomic():
+                if connection.features.can_return_rows_from_bulk_insert:
+                    FloorPlan.objects.bulk_create(floor_plans)
+                    # bulk_create sends no post_save, count the blob references here
+                    add_references(stored)
+                    bump_media_version(plan.property_id for plan in floor_plans)
+                else:
+                    # Without RETURNING (MySQL) bulk_create leaves the ids unset, so insert row
+                    # by row; their post_save signals count references and bump the version
+                    for plan in floor_plans:
+                        plan.save()
+        except Exception:
+            delete_stored(field.storage, stored)
+            raise
         return floor_plans
 
 
@@ -158,33 +202,91 @@ class FloorPlanBulkUpdateSerializer(serializers.Serializer):
     )
 
     def validate_floor_plans(self, value):
-        """Validate that each floor plan has an id and valid update data"""
+        """
+        Load every target with one in_bulk query and validate each item once.
+        
+        Errors are reported per item, in request order, as
+        [{}, {'price': [...]}, ...]; nothing is updated unless all are valid.
+        """
+        id_field = serializers.IntegerField(min_value=1)
+        ids = []
         for item in value:
-            if 'id' not in item:
-                raise serializers.ValidationError("Each floor plan must have an 'id' field")
             try:
-                floor_plan = FloorPlan.objects.get(id=item['id'])
-            except FloorPlan.DoesNotExist:
-                raise serializers.ValidationError(f"Floor plan with id {item['id']} does not exist")
-
-            # Validate update fields
-            update_serializer = FloorPlanUpdateSerializer(data=item)
-            if not update_serializer.is_valid():
-                raise serializers.ValidationError(f"Invalid data for floor plan {item['id']}: {update_serializer.errors}")
+                ids.append(id_field.run_validation(item.get('id')) if item.get('id') is not None else None)
+            except serializers.ValidationError as e:
+                ids.append(e.detail)
+        existing = FloorPlan.objects.select_related('property').in_bulk(
+            {floor_plan_id for floor_plan_id in ids if isinstance(floor_plan_id, int)}
+        )
+
+        errors = []
+        updates = []
+        seen = set()
+        for item, floor_plan_id in zip(value, ids):
+            if floor_plan_id is None:
+                errors.append({'id': ["Each floor plan must have an 'id' field"]})
+                continue
+            if not isinstance(floor_plan_id, int):
+                errors.append({'id': floor_plan_id})
+                continue
+            if floor_plan_id not in existing:
+                errors.append({'id': [f"Floor plan with id {floor_plan_id} does not exist"]})
+                continue
+            if floor_plan_id in seen:
+                errors.append({'id': [f"Floor plan {floor_plan_id} is listed more than once"]})
+                continue
+            seen.add(floor_plan_id)
+
+            data = {key: val for key, val in item.items() if key != 'id'}
+            update_serializer = FloorPlanUpdateSerializer(existing[floor_plan_id], data=data, partial=True)
+            if update_serializer.is_valid():
+                errors.append({})
+                updates.append((existing[floor_plan_id], update_serializer.validated_data))
+            else:
+                errors.append(update_serializer.errors)
 
-        return value
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return updates
 
     def update(self, instance, validated_data):
-        floor_plans_data = validated_data['floor_plans']
-        updated_floor_plans = []
-
-        for floor_plan_data in floor_plans_data:
-            floor_plan_id = floor_plan_data.pop('id')
-            floor_plan = FloorPlan.objects.get(id=floor_plan_id)
-
-            update_serializer = FloorPlanUpdateSerializer(floor_plan, data=floor_plan_data, partial=True)
-            if update_serializer.is_valid():
-                updated_floor_plan = update_serializer.save()
-                updated_floor_plans.append(updated_floor_plan)
+        """Apply every change with one bulk_update in a transaction"""
+        floor_plans = []
+        fields = set()
+        replaced = []
+        for floor_plan, changes in validated_data['floor_plans']:
+            if 'image' in changes:
+                replaced.append(floor_plan.image.name or '')
+            for attr, value in changes.items():
+                setattr(floor_plan, attr, value)
+            fields.update(changes)
+            floor_plans.append(floor_plan)
 
-        return updated_floor_plans
\ No newline at end of file
+        field = FloorPlan._meta.get_field('image')
+        stored = []
+        if 'image' in fields:
+            fields.update(['file_size', 'width', 'height', 'mime_type', 'content_hash'])
+            cleared = [plan for plan in floor_plans if not plan.image]
+            for plan in cleared:
+                for attr, value in empty_metadata(dimensions=True).items():
+                    setattr(plan, attr, value)
+            stored = store_floor_plan_images(floor_plans)
+        if not fields:
+            return floor_plans
+
+        # auto_now is not applied by bulk_update
+        now = timezone.now()
+        for plan in floor_plans:
+            plan.updated_at = now
+        fields.add('updated_at')
+        try:
+            with transaction.atomic():
+                FloorPlan.objects.bulk_update(floor_plans, sorted(fields), batch_size=500)
+                if 'image' in fields:
+                    add_references(stored)
+                    remove_references(replaced)
+                bump_media_version(plan.property_id for plan in floor_plans)
+        except Exception:
+            delete_stored(field.storage, stored)
+            raise
+        return floor_plans
@@ -1,6 +1,16 @@
+import codecs
+import csv
+import json
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
 from rest_framework import serializers
-from ..models import Lead
+from ..models import Lead, LeadLog, LeadStageTransition, Property
+from ..filters.lead import LeadFilter
+from ..routing import lead_router
 from common.serializers import BaseSerializer
+from authapp.models import CustomUser
 from .property import PropertyListSerializer
 from authapp.serializers.customuser import CustomUserListSerializer
 
@@ -100,9 +110,24 @@ class LeadCreateSerializer(BaseSerializer):
             if request and request.user.is_authenticated:
                 validated_data['assigned_by'] = request.user
         
+        # Route unassigned leads to the least loaded matching agent
+        self.auto_assigned = False
+        if not validated_data.get('assigned_to') and getattr(settings, 'LEAD_AUTO_ASSIGNMENT', False):
+            interested_property = validated_data.get('interested_property')
+            agent_id = lead_router.route(
+                locations=[
+                    validated_data.get('city'),
+                    validated_data.get('preferred_location'),
+                    interested_property.city if interested_property else None,
+                ],
+                property_type_id=interested_property.property_type_id if interested_property else None,
+            )
+            if agent_id:
+                validated_data['assigned_to_id'] = agent_id
+                self.auto_assigned = True
+
         # Set assigned_at timestamp if assigned_to is provided
-        if validated_data.get('assigned_to') and 'assigned_at' not in validated_data:
-            from django.utils import timezone
+        if (validated_data.get('assigned_to') or validated_data.get('assigned_to_id')) and 'assigned_at' not in validated_data:
             validated_data['assigned_at'] = timezone.now()
         
         return super().create(validated_data)
@@ -142,3 +167,432 @@ class LeadUpdateSerializer(BaseSerializer):
             from django.utils import timezone
             validated_data['assigned_at'] = timezone.now()
         return super().update(instance, validated_data)
+
+
+class LeadImportRowSerializer(BaseSerializer):
+    """Validates a single imported row without hitting the database.
+
+    Related ids and uniqueness are checked once per chunk by LeadImportSerializer.
+    """
+    interested_property = serializers.IntegerField(source='interested_property_id')
+    assigned_to = serializers.IntegerField(source='assigned_to_id', required=False, allow_null=True)
+
+    class Meta:
+        model = Lead
+        fields = [
+            'first_name', 'last_name', 'email', 'phone', 'alternate_phone',
+            'interested_property', 'budget_min', 'budget_max', 'preferred_location',
+            'requirements', 'status', 'priority', 'lead_source', 'lead_source_details',
+            'assigned_to', 'next_follow_up', 'company_name', 'occupation',
+            'address', 'city', 'state', 'country', 'postal_code',
+            'newsletter_subscribed', 'sms_marketing'
+        ]
+        validators = []
+
+    def validate(self, data):
+        budget_min = data.get('budget_min')
+        budget_max = data.get('budget_max')
+        if budget_min and budget_max and budget_min > budget_max:
+            raise serializers.ValidationError("Minimum budget cannot be greater than maximum budget")
+        return data
+
+
+class LeadImportSerializer(serializers.Serializer):
+    """Streams a CSV or NDJSON file of leads into the database chunk by chunk"""
+    FILE_FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    ]
+    FILE_EXTENSIONS = {
+        'csv': 'csv',
+        'ndjson': 'ndjson',
+        'jsonl': 'ndjson',
+    }
+    MAX_REPORTED_ERRORS = 500
+
+    file = serializers.FileField()
+    file_format = serializers.ChoiceField(choices=FILE_FORMAT_CHOICES, required=False)
+    lead_source = serializers.ChoiceField(
+        choices=Lead.LEAD_SOURCE_CHOICES,
+        required=False,
+        help_text="Lead source used for rows that do not specify one"
+    )
+    chunk_size = serializers.IntegerField(required=False, default=500, min_value=1, max_value=5000)
+
+    def validate(self, data):
+        if not data.get('file_format'):
+            name = data['file'].name or ''
+            extension = name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+            if extension not in self.FILE_EXTENSIONS:
+                raise serializers.ValidationError({
+                    'file_format': "Could not infer the file format, pass 'csv' or 'ndjson'"
+                })
+            data['file_format'] = self.FILE_EXTENSIONS[extension]
+        self.validate_encoding(data['file'])
+        return data
+
+    def validate_encoding(self, upload):
+        """Decode the whole file once before importing, so a bad byte cannot stop the import halfway"""
+        decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        line = 1
+        upload.seek(0)
+        try:
+            for chunk in upload.chunks():
+                try:
+                    decoder.decode(chunk)
+                except UnicodeDecodeError as e:
+                    # A newline byte never occurs inside a multi-byte UTF-8 character
+                    line += chunk[:max(e.start, 0)].count(b'\n')
+                    raise serializers.ValidationError({
+                        'file': f"File is not valid UTF-8 (line {line}); no rows were imported"
+                    })
+                line += chunk.count(b'\n')
+            try:
+                decoder.decode(b'', final=True)
+            except UnicodeDecodeError:
+                raise serializers.ValidationError({
+                    'file': f"File is not valid UTF-8 (line {line}); no rows were imported"
+                })
+        finally:
+            upload.seek(0)
+
+    def iter_rows(self, upload, file_format):
+        """Yield (row_number, row) pairs, reading the upload line by line"""
+        lines = codecs.iterdecode(upload, 'utf-8-sig')
+        if file_format == 'csv':
+            for row_number, row in enumerate(csv.DictReader(lines), start=1):
+                yield row_number, row
+            return
+
+        row_number = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row_number, row
+
+    def create(self, validated_data):
+        request = self.context.get('request')
+        user = request.user if request and request.user.is_authenticated else None
+        summary = {
+            'total_rows': 0,
+            'created': 0,
+            'failed': 0,
+            'errors': [],
+        }
+        seen_keys = set()
+        chunk = []
+
+        for row_number, row in self.iter_rows(validated_data['file'], validated_data['file_format']):
+            summary['total_rows'] += 1
+            chunk.append((row_number, row))
+            if len(chunk) >= validated_data['chunk_size']:
+                self.import_chunk(chunk, validated_data, user, seen_keys, summary)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk, validated_data, user, seen_keys, summary)
+
+        summary['errors'].sort(key=lambda error: error['row'])
+        summary['errors_truncated'] = summary['failed'] > len(summary['errors'])
+        return summary
+
+    def add_error(self, summary, row_number, errors):
+        summary['failed'] += 1
+        if len(summary['errors']) < self.MAX_REPORTED_ERRORS:
+            summary['errors'].append({'row': row_number, 'errors': errors})
+
+    def import_chunk(self, chunk, options, user, seen_keys, summary):
+        """Validate one chunk, check it against a single duplicate key set and bulk insert it"""
+        valid_rows = []
+        for row_number, row in chunk:
+            if not isinstance(row, dict):
+                self.add_error(summary, row_number, {'non_field_errors': ['Row is not a valid JSON object']})
+                continue
+            data = {
+                key.strip(): value for key, value in row.items()
+                if key and value not in ('', None)
+            }
+            if options.get('lead_source') and 'lead_source' not in data:
+                data['lead_source'] = options['lead_source']
+            row_serializer = LeadImportRowSerializer(data=data)
+            if row_serializer.is_valid():
+                valid_rows.append((row_number, row_serializer.validated_data))
+            else:
+                self.add_error(summary, row_number, row_serializer.errors)
+
+        if not valid_rows:
+            return
+
+        property_ids = {data['interested_property_id'] for _, data in valid_rows}
+        assignee_ids = {data['assigned_to_id'] for _, data in valid_rows if data.get('assigned_to_id')}
+        emails = {data['email'] for _, data in valid_rows}
+        phones = {data['phone'] for _, data in valid_rows}
+
+        property_titles = {}
+        property_routing = {}
+        for property_id, title, city, property_type_id in Property.objects.filter(
+            id__in=property_ids
+        ).values_list('id', 'title', 'city', 'property_type_id'):
+            property_titles[property_id] = title
+            property_routing[property_id] = (city, property_type_id)
+        auto_assign = getattr(settings, 'LEAD_AUTO_ASSIGNMENT', False)
+        valid_assignees = set(
+            CustomUser.objects.filter(id__in=assignee_ids).values_list('id', flat=True)
+        ) if assignee_ids else set()
+        existing = Lead.objects.filter(
+            interested_property_id__in=property_titles.keys()
+        ).filter(
+            Q(email__in=emails) | Q(phone__in=phones)
+        ).values_list('interested_property_id', 'email', 'phone')
+        taken_keys = set()
+        for property_id, email, phone in existing:
+            taken_keys.add(('email', property_id, email))
+            taken_keys.add(('phone', property_id, phone))
+
+        now = timezone.now()
+        leads = []
+        chunk_keys = []
+        for row_number, data in valid_rows:
+            property_id = data['interested_property_id']
+            email_key = ('email', property_id, data['email'])
+            phone_key = ('phone', property_id, data['phone'])
+            errors = {}
+            if property_id not in property_titles:
+                errors['interested_property'] = [f'Invalid pk "{property_id}" - object does not exist.']
+            if data.get('assigned_to_id') and data['assigned_to_id'] not in valid_assignees:
+                errors['assigned_to'] = [f'Invalid pk "{data["assigned_to_id"]}" - object does not exist.']
+            if email_key in taken_keys or email_key in seen_keys:
+                errors['email'] = ["A lead with this email already exists for this property"]
+            if phone_key in taken_keys or phone_key in seen_keys:
+                errors['phone'] = ["A lead with this phone number already exists for this property"]
+            if errors:
+                self.add_error(summary, row_number, errors)
+                continue
+
+            seen_keys.add(email_key)
+            seen_keys.add(phone_key)
+            lead = Lead(**data, created_by=user, updated_by=user, assigned_by=user)
+            if not lead.assigned_to_id and auto_assign:
+                property_city, property_type_id = property_routing[property_id]
+                lead.assigned_to_id = lead_router.route(
+                    locations=[lead.city, lead.preferred_location, property_city],
+                    property_type_id=property_type_id,
+                )
+            if lead.assigned_to_id:
+                lead.assigned_at = now
+                if lead.status not in Lead.CLOSED_STATUSES:
+                    # Count it right away so the next rows of this chunk see the new workload;
+                    # bulk_create skips the post_save signal that would otherwise do it
+                    lead_router.record_change(None, lead.assigned_to_id)
+            # Mirror Lead.save(), which bulk_create bypasses
+            if lead.status in Lead.CONTACTED_STATUSES:
+                lead.last_contacted = now
+                lead.contact_count = 1
+            leads.append(lead)
+            chunk_keys.append((row_number, email_key, phone_key))
+
+        if not leads:
+            return
+
+        def release_workload():
+            for lead in leads:
+                if lead.assigned_to_id and lead.status not in Lead.CLOSED_STATUSES:
+                    lead_router.record_change(lead.assigned_to_id, None)
+
+        try:
+            with transaction.atomic():
+                Lead.objects.bulk_create(leads)
+                if leads[0].pk is None:
+                    # Backends such as MySQL do not return ids from bulk inserts
+                    ids = {
+                        (property_id, email): pk
+                        for pk, property_id, email in Lead.objects.filter(
+                            interested_property_id__in={lead.interested_property_id for lead in leads},
+                            email__in={lead.email for lead in leads},
+                        ).values_list('id', 'interested_property_id', 'email')
+                    }
+                    for lead in leads:
+                        lead.pk = ids[(lead.interested_property_id, lead.email)]
+                LeadLog.objects.bulk_create([
+                    LeadLog(
+                        lead=lead,
+                        action='created',
+                        performed_by=user,
+                        description=f"Lead created for {property_titles[lead.interested_property_id]} (bulk import)"
+                    )
+                    for lead in leads
+                ])
+                LeadStageTransition.objects.bulk_create([
+                    LeadStageTransition.build(lead, None, lead.status, now)
+                    for lead in leads
+                ])
+        except IntegrityError:
+            # Another request inserted a conflicting lead after the key set was read
+            release_workload()
+            for row_number, email_key, phone_key in chunk_keys:
+                seen_keys.discard(email_key)
+                seen_keys.discard(phone_key)
+                self.add_error(summary, row_number, {
+                    'non_field_errors': ['Conflicting lead was created concurrently, retry this row']
+                })
+            return
+        except Exception:
+            release_workload()
+            raise
+
+        summary['created'] += len(leads)
+
+
+class LeadBulkActionSerializer(serializers.Serializer):
+    """Applies one action to many leads with a single UPDATE and one bulk insert of logs"""
+    ACTION_CHOICES = [
+        ('assign', 'Assign'),
+        ('update_status', 'Update Status'),
+        ('update_priority', 'Update Priority'),
+    ]
+    ACTION_FIELDS = {
+        'assign': 'assigned_to',
+        'update_status': 'status',
+        'update_priority': 'priority',
+    }
+    MAX_REPORTED_IDS = 500
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        allow_empty=False,
+        max_length=5000,
+        help_text="Lead ids to update"
+    )
+    filters = serializers.DictField(
+        required=False,
+        allow_empty=False,
+        help_text="LeadFilter parameters selecting the leads to update"
+    )
+    action = serializers.ChoiceField(choices=ACTION_CHOICES)
+    assigned_to = serializers.PrimaryKeyRelatedField(
+        queryset=CustomUser.objects.all(),
+        required=False,
+        allow_null=True
+    )
+    status = serializers.ChoiceField(choices=Lead.LEAD_STATUS_CHOICES, required=False)
+    priority = serializers.ChoiceField(choices=Lead.PRIORITY_CHOICES, required=False)
+
+    def validate(self, data):
+        if ('ids' in data) == ('filters' in data):
+            raise serializers.ValidationError("Provide either 'ids' or 'filters'")
+
+        field = self.ACTION_FIELDS[data['action']]
+        if field not in data:
+            raise serializers.ValidationError({field: "This field is required for this action."})
+
+        if 'filters' in data:
+            # LeadFilter ignores unknown and empty keys, which would select every lead
+            unknown = sorted(set(data['filters']) - set(LeadFilter.base_filters))
+            if unknown:
+                raise serializers.ValidationError({'filters': f"Unknown filters: {', '.join(unknown)}"})
+            if all(value in ('', None, []) for value in data['filters'].values()):
+                raise serializers.ValidationError({'filters': "At least one filter needs a value"})
+            filterset = LeadFilter(data=data['filters'], queryset=Lead.objects.all())
+            if not filterset.is_valid():
+                raise serializers.ValidationError({'filters': filterset.errors})
+            data['queryset'] = filterset.qs
+        else:
+            data['queryset'] = Lead.objects.filter(id__in=data['ids'])
+        return data
+
+    def create(self, validated_data):
+        request = self.context.get('request')
+        user = request.user if request and request.user.is_authenticated else None
+        action = validated_data['action']
+        field = self.ACTION_FIELDS[action]
+        value = validated_data[field]
+        now = timezone.now()
+
+        updates = {field: value, 'updated_at': now}
+        if user:
+            updates['updated_by'] = user
+        old_lookup = field
+        if action == 'assign':
+            updates['assigned_by'] = user
+            updates['assigned_at'] = now
+            old_lookup = 'assigned_to__email'
+        elif value in Lead.CONTACTED_STATUSES:
+            updates['last_contacted'] = now
+            updates['contact_count'] = F('contact_count') + 1
+
+        with transaction.atomic():
+            matched_ids = list(validated_data['queryset'].values_list('id', flat=True))
+            locked_ids = list(
+                Lead.objects.select_for_update()
+                .filter(id__in=matched_ids)
+                .exclude(**{field: value})
+                .values_list('id', flat=True)
+            )
+            # Read separately: old_lookup may follow the nullable assigned_to, and PostgreSQL
+            # refuses FOR UPDATE on the nullable side of an outer join
+            changed = list(Lead.objects.filter(id__in=locked_ids).values_list('id', old_lookup))
+            changed_ids = [lead_id for lead_id, _ in changed]
+            if changed_ids:
+                Lead.objects.filter(id__in=changed_ids).update(**updates)
+                LeadLog.objects.bulk_create([
+                    self.build_log(action, lead_id, old_value, value, user)
+                    for lead_id, old_value in changed
+                ])
+                if action == 'update_status':
+                    LeadStageTransition.record_many(changed_ids, dict(changed), value, now)
+                if action in ('assign', 'update_status'):
+                    # Queryset updates bypass the signals that track agent workload
+                    transaction.on_commit(lead_router.invalidate)
+
+        return {
+            'action': action,
+            'matched': len(matched_ids),
+            'updated': len(changed_ids),
+            'unchanged': len(matched_ids) - len(changed_ids),
+            'lead_ids': changed_ids[:self.MAX_REPORTED_IDS],
+            'lead_ids_truncated': len(changed_ids) > self.MAX_REPORTED_IDS,
+        }
+
+    def build_log(self, action, lead_id, old_value, value, user):
+        if action == 'assign':
+            old_name = old_value or 'Unassigned'
+            new_name = str(value) if value else 'Unassigned'
+            return LeadLog(
+                lead_id=lead_id,
+                action='assigned',
+                performed_by=user,
+                old_value=old_name,
+                new_value=new_name,
+                description=f"Lead assigned to {new_name}"
+            )
+        if action == 'update_status':
+            return LeadLog(
+                lead_id=lead_id,
+                action='status_changed',
+                performed_by=user,
+                old_value=old_value,
+                new_value=value,
+                description=f"Status changed from '{old_value}' to '{value}'"
+            )
+        return LeadLog(
+            lead_id=lead_id,
+            action='updated',
+            performed_by=user,
+            old_value=f"priority: {old_value}",
+            new_value=f"priority: {value}",
+            description=f"Priority: '{old_value}' → '{value}'"
+        )
+
+
+class LeadFunnelQuerySerializer(serializers.Serializer):
+    """Query parameters of the funnel report"""
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    agent = serializers.IntegerField(required=False, min_value=1)
+    property = serializers.IntegerField(required=False, min_value=1)
+    lead_source = serializers.CharField(required=False, max_length=20)
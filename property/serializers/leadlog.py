@@ -59,4 +59,19 @@ class LeadLogCreateSerializer(BaseSerializer):
         # Set the performed_by from the request user, handle anonymous users
         user = self.context['request'].user
         validated_data['performed_by'] = user if user.is_authenticated else None
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+class LeadLogTimelineSerializer(serializers.ModelSerializer):
+    """Flat log entry for a lead's timeline; expects performed_by to be select_related"""
+    action_display = serializers.CharField(source='get_action_display', read_only=True)
+    performed_by = serializers.SerializerMethodField()
+
+    class Meta:
+        model = LeadLog
+        fields = [
+            'id', 'action', 'action_display', 'performed_by', 'old_value',
+            'new_value', 'description', 'notes', 'created_at'
+        ]
+
+    def get_performed_by(self, obj):
+        return obj.performed_by.get_full_name() if obj.performed_by else 'Anonymous User'
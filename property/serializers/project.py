@@ -1,3 +1,4 @@
+from django.urls import reverse
 from rest_framework import serializers
 from property.models import Project, ProjectPhase, ProjectDocument
 from authapp.models import CustomUser
@@ -15,20 +16,20 @@ class ProjectDocumentSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = ProjectDocument
-        fields = ['id', 'name', 'file', 'file_url', 'file_size', 'uploaded_at']
+        fields = ['id', 'name', 'file_url', 'file_size', 'uploaded_at']
     
     def get_file_url(self, obj):
         if obj.file:
+            # Through the authorized download endpoint rather than the public media URL
+            url = reverse('project-documents-download', args=[obj.pk])
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(obj.file.url)
-            return obj.file.url
+                return request.build_absolute_uri(url)
+            return url
         return None
     
     def get_file_size(self, obj):
-        if obj.file:
-            return obj.file.size
-        return None
+        return obj.file_size
 
 
 class DeveloperSerializer(serializers.ModelSerializer):
@@ -148,6 +149,7 @@ class ProjectDocumentUploadSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProjectDocument
         fields = ['name', 'file']
+        extra_kwargs = {'file': {'write_only': True}}
     
     def create(self, validated_data):
         project = self.context['project']
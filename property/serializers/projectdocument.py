@@ -1,4 +1,6 @@
+from django.urls import reverse
 from rest_framework import serializers
+from common.media import format_file_size
 from common.serializers import BaseSerializer
 from ..models import ProjectDocument, Project
 
@@ -26,18 +28,8 @@ class ProjectDocumentListSerializer(BaseSerializer):
         fields = ['id', 'name', 'file_size', 'file_type', 'uploaded_at', 'project_details']
     
     def get_file_size(self, obj):
-        try:
-            if obj.file and hasattr(obj.file, 'size'):
-                size = obj.file.size
-                if size < 1024:
-                    return f"{size} B"
-                elif size < 1024 * 1024:
-                    return f"{size / 1024:.1f} KB"
-                else:
-                    return f"{size / (1024 * 1024):.1f} MB"
-        except:
-            pass
-        return "Unknown"
+        # Stored at upload (common.media), no storage access
+        return format_file_size(obj.file_size) or "Unknown"
     
     def get_file_type(self, obj):
         if obj.file and hasattr(obj.file, 'name'):
@@ -55,20 +47,12 @@ class ProjectDocumentDetailSerializer(BaseSerializer):
         model = ProjectDocument
         fields = '__all__'
         extra_fields = ['project_details', 'file_size', 'file_type', 'download_url']
+        # Served only through download_url, never by storage URL
+        extra_kwargs = {'file': {'write_only': True}}
     
     def get_file_size(self, obj):
-        try:
-            if obj.file and hasattr(obj.file, 'size'):
-                size = obj.file.size
-                if size < 1024:
-                    return f"{size} B"
-                elif size < 1024 * 1024:
-                    return f"{size / 1024:.1f} KB"
-                else:
-                    return f"{size / (1024 * 1024):.1f} MB"
-        except:
-            pass
-        return "Unknown"
+        # Stored at upload (common.media), no storage access
+        return format_file_size(obj.file_size) or "Unknown"
     
     def get_file_type(self, obj):
         if obj.file and hasattr(obj.file, 'name'):
@@ -77,17 +61,20 @@ class ProjectDocumentDetailSerializer(BaseSerializer):
     
     def get_download_url(self, obj):
         if obj.file:
+            # Through the authorized download endpoint rather than the public media URL
+            url = reverse('project-documents-download', args=[obj.pk])
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(obj.file.url)
-            return obj.file.url
+                return request.build_absolute_uri(url)
+            return url
         return None
 
 
 class ProjectDocumentCreateSerializer(BaseSerializer):
     class Meta:
         model = ProjectDocument
-        fields = ['project', 'file', 'name']
+        fields = ['id', 'project', 'file', 'name']
+        extra_kwargs = {'file': {'write_only': True}}
     
     def validate_file(self, value):
         # Check file size (limit to 10MB)
@@ -108,7 +95,8 @@ class ProjectDocumentCreateSerializer(BaseSerializer):
 class ProjectDocumentUpdateSerializer(BaseSerializer):
     class Meta:
         model = ProjectDocument
-        fields = ['file', 'name']
+        fields = ['id', 'file', 'name']
+        extra_kwargs = {'file': {'write_only': True}}
     
     def validate_file(self, value):
         if value:
@@ -10,6 +10,7 @@ from .project import ProjectListSerializer
 from .propertytype import PropertyTypeListSerializer
 from .amenity import AmenityListSerializer
 from authapp.serializers.customuser import CustomUserListSerializer
+from authapp.roles import is_admin
 
 class FloorPlanListSerializer(BaseSerializer):
     class Meta:
@@ -69,7 +70,7 @@ class PropertyListSerializer(BaseSerializer):
 
         # cache all wishlist property ids on the serializer to avoid repeated DB hits
         if not hasattr(self, '_user_wishlist_property_ids'):
-            wishlists = PropertyWishlist.objects.filter(created_by=user).prefetch_related('properties')
+            wishlists = PropertyWishlist.objects.filter(created_by_id=user.id).prefetch_related('properties')
             all_prop_ids = set()
             for wl in wishlists:
                 all_prop_ids.update(wl.properties.values_list('id', flat=True))
@@ -135,7 +136,7 @@ class PropertyDetailSerializer(BaseSerializer):
 
         # cache all wishlist property ids on the serializer to avoid repeated DB hits
         if not hasattr(self, '_user_wishlist_property_ids'):
-            wishlists = PropertyWishlist.objects.filter(created_by=user).prefetch_related('properties')
+            wishlists = PropertyWishlist.objects.filter(created_by_id=user.id).prefetch_related('properties')
             all_prop_ids = set()
             for wl in wishlists:
                 all_prop_ids.update(wl.properties.values_list('id', flat=True))
@@ -178,7 +179,7 @@ class PropertyCreateSerializer(BaseSerializer):
         property_instance = Property.objects.create(**validated_data)
         request = self.context.get('request')
 
-        if not request.user.groups.filter(name='Admin').exists():
+        if not is_admin(request.user):
             property_instance.is_approved = False
         else:
             property_instance.is_approved = True
@@ -1,7 +1,43 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
 from rest_framework import serializers
+from common.media import RENDITION_FORMATS, delete_stored, rendition_srcset, store_uploads
+from common.storage import add_references
+from common.tasks import enqueue_many
+from ..manifest import bump_media_version
+from ..ordering import next_order, position_taken
 from ..models import PropertyImage, Property
 
 
+def rendition_url_builder(obj, request):
+    def url(path):
+        url = default_storage.url(path)
+        return request.build_absolute_uri(url) if request else url
+    return url
+
+
+def image_renditions(obj, request):
+    """{name: {'width', 'height', 'webp', 'jpeg'}} with URLs, empty until the worker has run"""
+    if not obj.renditions:
+        return {}
+    url = rendition_url_builder(obj, request)
+    return {
+        name: {
+            key: url(value) if key in RENDITION_FORMATS else value
+            for key, value in rendition.items()
+        }
+        for name, rendition in obj.renditions.items()
+    }
+
+
+def image_srcset(obj, request):
+    """{'webp': srcset, 'jpeg': srcset} ready for <source>/<img srcset>"""
+    if not obj.renditions:
+        return {}
+    url = rendition_url_builder(obj, request)
+    return {format_key: rendition_srcset(obj.renditions, format_key, url) for format_key in RENDITION_FORMATS}
+
+
 class PropertySimpleSerializer(serializers.ModelSerializer):
     """Simple serializer for property basic info"""
     class Meta:
@@ -12,11 +48,14 @@ class PropertyImageListSerializer(serializers.ModelSerializer):
     property_details = PropertySimpleSerializer(source='property', read_only=True)
     image_url = serializers.SerializerMethodField()
     file_size = serializers.SerializerMethodField()
+    renditions = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = PropertyImage
         fields = ['id', 'property', 'property_details', 'image', 'image_url', 'alt_text', 
-                 'caption', 'is_primary', 'order', 'file_size', 'created_at']
+                 'caption', 'is_primary', 'order', 'file_size', 'width', 'height',
+                 'renditions', 'srcset', 'created_at']
     
     def get_image_url(self, obj):
         if obj.image:
@@ -27,12 +66,14 @@ class PropertyImageListSerializer(serializers.ModelSerializer):
         return None
     
     def get_file_size(self, obj):
-        if obj.image:
-            try:
-                return obj.image.size
-            except:
-                return None
-        return None
+        # Stored at upload (common.media), no storage access
+        return obj.file_size
+    
+    def get_renditions(self, obj):
+        return image_renditions(obj, self.context.get('request'))
+    
+    def get_srcset(self, obj):
+        return image_srcset(obj, self.context.get('request'))
 
 
 class PropertyImageDetailSerializer(serializers.ModelSerializer):
@@ -40,11 +81,13 @@ class PropertyImageDetailSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
     file_size = serializers.SerializerMethodField()
     image_dimensions = serializers.SerializerMethodField()
+    renditions = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = PropertyImage
         fields = '__all__'
-        extra_fields = ['property_details', 'image_url', 'file_size', 'image_dimensions']
+        extra_fields = ['property_details', 'image_url', 'file_size', 'image_dimensions', 'renditions', 'srcset']
     
     def get_image_url(self, obj):
         if obj.image:
@@ -55,22 +98,21 @@ class PropertyImageDetailSerializer(serializers.ModelSerializer):
         return None
     
     def get_file_size(self, obj):
-        if obj.image:
-            try:
-                return obj.image.size
-            except:
-                return None
-        return None
+        # Stored at upload (common.media), no storage access
+        return obj.file_size
+    
+    def get_renditions(self, obj):
+        return image_renditions(obj, self.context.get('request'))
+    
+    def get_srcset(self, obj):
+        return image_srcset(obj, self.context.get('request'))
     
     def get_image_dimensions(self, obj):
-        if obj.image:
-            try:
-                return {
-                    'width': obj.image.width,
-                    'height': obj.image.height
-                }
-            except:
-                return None
+        if obj.width is not None and obj.height is not None:
+            return {
+                'width': obj.width,
+                'height': obj.height
+            }
         return None
 
 
@@ -78,8 +120,13 @@ class PropertyImageCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = PropertyImage
         fields = ['property', 'image', 'alt_text', 'caption', 'is_primary', 'order']
+        # `order` is optional (appended when missing), so its uniqueness is checked in validate()
+        validators = []
     
     def validate(self, data):
+        if 'order' in data and position_taken(PropertyImage, data['property'].id, data['order']):
+            raise serializers.ValidationError({'order': "This property already has an image at this position"})
+
         # Validate image file
         image = data.get('image')
         if image:
@@ -95,15 +142,11 @@ class PropertyImageCreateSerializer(serializers.ModelSerializer):
         return data
     
     def create(self, validated_data):
-        # Auto-set order if not provided
-        if 'order' not in validated_data:
-            property_instance = validated_data['property']
-            last_order = PropertyImage.objects.filter(
-                property=property_instance
-            ).order_by('-order').first()
-            validated_data['order'] = (last_order.order + 1) if last_order else 1
-        
-        return super().create(validated_data)
+        with transaction.atomic():
+            # Auto-set order if not provided; the property stays locked until the row is in
+            if 'order' not in validated_data:
+                validated_data['order'] = next_order(PropertyImage, validated_data['property'].id)
+            return super().create(validated_data)
 
 
 class PropertyImageUpdateSerializer(serializers.ModelSerializer):
@@ -140,26 +183,55 @@ class PropertyImageBulkUploadSerializer(serializers.Serializer):
         return images
     
     def create(self, validated_data):
+        """
+        Store all files concurrently, then insert every row in one transaction.
+        
+        Order continues after the property's last image, read with the property
+        row locked so concurrent uploads cannot take the same positions; the
+        first new image becomes primary only if the property has none.
+        Rendition jobs are queued for the whole batch.
+        """
         property_instance = validated_data['property']
         images = validated_data['images']
+        user = validated_data.get('created_by')
+        field = PropertyImage._meta.get_field('image')
         
-        # Get starting order
-        last_order = PropertyImage.objects.filter(
-            property=property_instance
-        ).order_by('-order').first()
-        start_order = (last_order.order + 1) if last_order else 1
-        
-        # Create image instances
-        created_images = []
-        for i, image in enumerate(images):
-            property_image = PropertyImage.objects.create(
-                property=property_instance,
-                image=image,
-                order=start_order + i,
-                is_primary=(i == 0 and not PropertyImage.objects.filter(
-                    property=property_instance, is_primary=True
-                ).exists())
-            )
-            created_images.append(property_image)
+        stored = store_uploads(
+            field, [PropertyImage(property=property_instance) for _ in images], images, dimensions=True
+        )
+        try:
+            with transaction.atomic():
+                start_order = next_order(PropertyImage, property_instance.id)
+                needs_primary = not PropertyImage.objects.filter(property=property_instance, is_primary=True).exists()
+                
+                PropertyImage.objects.bulk_create([
+                    PropertyImage(
+                        property=property_instance,
+                        image=name,
+                        order=start_order + i,
+                        is_primary=(i == 0 and needs_primary),
+                        created_by=user,
+                        updated_by=user,
+                        **metadata
+                    )
+                    for i, (name, metadata) in enumerate(stored)
+                ])
+                # bulk_create sends no post_save, count the blob references here
+                add_references([name for name, metadata in stored])
+                bump_media_version([property_instance.id])
+                # Re-read by (property, order): some backends (MySQL) return no ids from bulk_create
+                created_images = list(
+                    PropertyImage.objects.filter(
+                        property=property_instance,
+                        order__gte=start_order,
+                        order__lt=start_order + len(stored),
+                    ).select_related('property').order_by('order')
+                )
+                enqueue_many('generate_image_renditions', [
+                    {'image_id': image.id, 'content_hash': image.content_hash} for image in created_images
+                ])
+        except Exception:
+            delete_stored(field.storage, [name for name, metadata in stored])
+            raise
         
         return created_images
@@ -1,10 +1,13 @@
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
-from ..models import PropertyVideo
+from ..models import PropertyVideo, VideoUploadSession
+from ..ordering import next_order, position_taken
 
 class PropertyVideoListSerializer(serializers.ModelSerializer):
     class Meta:
         model = PropertyVideo
-        fields = ['id', 'title', 'thumbnail','video','duration', 'order', 'created_at']
+        fields = ['id', 'title', 'thumbnail','video','duration', 'file_size', 'order', 'created_at']
 
 class PropertyVideoDetailSerializer(serializers.ModelSerializer):
     class Meta:
@@ -15,8 +18,77 @@ class PropertyVideoCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = PropertyVideo
         fields = ['id', 'property', 'video', 'title', 'description', 'thumbnail', 'duration', 'order']
+        # `order` is optional (appended when missing), so its uniqueness is checked in validate()
+        validators = []
+
+    def validate(self, attrs):
+        if 'order' in attrs and position_taken(PropertyVideo, attrs['property'].id, attrs['order']):
+            raise serializers.ValidationError({'order': "This property already has a video at this position"})
+        return attrs
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            if 'order' not in validated_data:
+                validated_data['order'] = next_order(PropertyVideo, validated_data['property'].id)
+            return super().create(validated_data)
 
 class PropertyVideoUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = PropertyVideo
-        fields = ['title', 'description', 'thumbnail', 'duration', 'order']
\ No newline at end of file
+        fields = ['title', 'description', 'thumbnail', 'duration', 'order']
+
+class VideoUploadInitSerializer(serializers.ModelSerializer):
+    """Starts a resumable upload; the file itself is sent afterwards in chunks"""
+    ALLOWED_EXTENSIONS = ['mp4', 'm4v', 'mov', 'webm']
+    
+    class Meta:
+        model = VideoUploadSession
+        fields = ['property', 'filename', 'total_size', 'sha256', 'title', 'description', 'order']
+        extra_kwargs = {
+            'total_size': {'help_text': "Size of the whole file in bytes"},
+            'sha256': {'help_text': "Hex SHA-256 of the whole file, checked when the upload is finalized"},
+        }
+    
+    def validate_filename(self, value):
+        extension = value.rsplit('.', 1)[-1].lower() if '.' in value else ''
+        if extension not in self.ALLOWED_EXTENSIONS:
+            raise serializers.ValidationError(
+                f"File type '{extension}' not allowed. Allowed types: {', '.join(self.ALLOWED_EXTENSIONS)}"
+            )
+        return value
+    
+    def validate_total_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("File is empty")
+        if value > settings.VIDEO_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"File size cannot exceed {settings.VIDEO_UPLOAD_MAX_SIZE // (1024 * 1024)}MB"
+            )
+        return value
+    
+    def validate_sha256(self, value):
+        value = value.lower()
+        if len(value) != 64 or any(char not in '0123456789abcdef' for char in value):
+            raise serializers.ValidationError("Must be a hex encoded SHA-256 digest")
+        return value
+    
+    def validate(self, attrs):
+        order = attrs.get('order')
+        if order is not None and PropertyVideo.objects.filter(property=attrs['property'], order=order).exists():
+            raise serializers.ValidationError({'order': "This property already has a video at this position"})
+        return attrs
+
+
+class VideoUploadSessionSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source='received', read_only=True)
+    chunk_size = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = VideoUploadSession
+        fields = ['upload_id', 'property', 'filename', 'total_size', 'offset', 'chunk_size',
+                  'status', 'expires_at', 'video', 'created_at']
+        read_only_fields = fields
+    
+    def get_chunk_size(self, obj):
+        """Largest chunk a single PUT may carry"""
+        return settings.VIDEO_UPLOAD_MAX_CHUNK_SIZE
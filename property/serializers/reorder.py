@@ -0,0 +1,8 @@
+from rest_framework import serializers
+from ..models import Property
+
+
+class MediaReorderSerializer(serializers.Serializer):
+    """The complete new order of a property's images, videos or virtual tours"""
+    property = serializers.PrimaryKeyRelatedField(queryset=Property.objects.all())
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
@@ -1,5 +1,7 @@
+from django.db import transaction
 from rest_framework import serializers
 from ..models import VirtualTour
+from ..ordering import next_order, position_taken
 
 class VirtualTourListSerializer(serializers.ModelSerializer):
     class Meta:
@@ -18,6 +20,19 @@ class VirtualTourCreateSerializer(serializers.ModelSerializer):
             'property', 'tour_url', 'tour_type', 'description', 
             'thumbnail', 'provider', 'embed_code', 'order'
         ]
+        # `order` is optional (appended when missing), so its uniqueness is checked in validate()
+        validators = []
+
+    def validate(self, attrs):
+        if 'order' in attrs and position_taken(VirtualTour, attrs['property'].id, attrs['order']):
+            raise serializers.ValidationError({'order': "This property already has a virtual tour at this position"})
+        return attrs
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            if 'order' not in validated_data:
+                validated_data['order'] = next_order(VirtualTour, validated_data['property'].id)
+            return super().create(validated_data)
 
 class VirtualTourUpdateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,116 @@
+import logging
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from authapp.models import AgentProfile
+from common.storage import track_references
+from .models import (
+    FloorPlan, Lead, ProjectDocument, Property, PropertyAlert, PropertyImage, PropertyType, PropertyVideo,
+    VirtualTour,
+)
+from .manifest import bump_media_version
+from .routing import lead_router
+from .alerts import alert_index
+
+logger = logging.getLogger(__name__)
+
+
+def _open_owner(lead):
+    """Agent id holding this lead as open work, read without triggering deferred loads"""
+    state = lead.__dict__
+    if state.get('status') in Lead.CLOSED_STATUSES:
+        return None
+    return state.get('assigned_to_id')
+
+
+@receiver(post_init, sender=Lead)
+def remember_lead_owner(sender, instance, **kwargs):
+    instance._routing_owner = _open_owner(instance)
+
+
+@receiver(post_save, sender=Lead)
+def update_lead_workload(sender, instance, created, **kwargs):
+    old_owner = None if created else getattr(instance, '_routing_owner', None)
+    new_owner = _open_owner(instance)
+    lead_router.record_change(old_owner, new_owner)
+    instance._routing_owner = new_owner
+
+
+@receiver(post_delete, sender=Lead)
+def release_lead_workload(sender, instance, **kwargs):
+    lead_router.record_change(getattr(instance, '_routing_owner', None), None)
+
+
+@receiver(post_save, sender=AgentProfile)
+def refresh_agent_routing(sender, instance, **kwargs):
+    lead_router.invalidate()
+
+
+@receiver(post_save, sender=Property)
+def match_property_alerts(sender, instance, **kwargs):
+    if instance.is_approved and instance.status == 'available':
+        transaction.on_commit(lambda: enqueue_alert_matches(instance))
+
+
+def enqueue_alert_matches(property_obj):
+    """Runs after the property is committed; a matching failure must not fail the save that triggered it"""
+    try:
+        alert_index.enqueue_matches(property_obj)
+    except Exception:
+        logger.exception("Matching property %s against alerts failed", property_obj.pk)
+
+
+@receiver(post_save, sender=PropertyAlert)
+@receiver(post_delete, sender=PropertyAlert)
+@receiver(post_save, sender=PropertyType)
+@receiver(post_delete, sender=PropertyType)
+def refresh_alert_index(sender, **kwargs):
+    alert_index.invalidate()
+
+
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_save, sender=PropertyVideo)
+@receiver(post_delete, sender=PropertyVideo)
+@receiver(post_save, sender=VirtualTour)
+@receiver(post_delete, sender=VirtualTour)
+@receiver(post_save, sender=FloorPlan)
+@receiver(post_delete, sender=FloorPlan)
+def invalidate_media_manifest(sender, instance, **kwargs):
+    bump_media_version([instance.property_id])
+
+
+# Files in the content-addressed media store are shared; count who uses them
+track_references(PropertyImage, 'image')
+track_references(FloorPlan, 'image')
+track_references(PropertyVideo, 'video')
+track_references(PropertyVideo, 'thumbnail')
+
+
+# Document files are private and not shared, so they go with their row
+def _document_file(document):
+    value = document.__dict__.get('file')
+    return getattr(value, 'name', value) or ''
+
+
+def _delete_document_file(storage, name):
+    if name:
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+@receiver(post_init, sender=ProjectDocument)
+def remember_document_file(sender, instance, **kwargs):
+    instance._stored_file = _document_file(instance)
+
+
+@receiver(post_save, sender=ProjectDocument)
+def delete_replaced_document_file(sender, instance, created, **kwargs):
+    current = _document_file(instance)
+    if not created and instance._stored_file != current:
+        _delete_document_file(instance.file.storage, instance._stored_file)
+    instance._stored_file = current
+
+
+@receiver(post_delete, sender=ProjectDocument)
+def delete_document_file(sender, instance, **kwargs):
+    _delete_document_file(instance.file.storage, _document_file(instance))
@@ -0,0 +1,81 @@
+import os
+import shutil
+from django.conf import settings
+from django.core.files.base import ContentFile
+from common.media import generate_renditions, local_path, mp4_duration, video_poster
+from common.storage import add_references
+from common.tasks import task
+from .manifest import bump_media_version
+from .models import PropertyImage, PropertyVideo
+
+
+@task(max_attempts=3)
+def generate_image_renditions(image_id, content_hash=None):
+    """Write the IMAGE_RENDITIONS copies of a property image and record their paths"""
+    image = PropertyImage.objects.filter(id=image_id).only('id', 'property_id', 'image', 'content_hash').first()
+    if image is None or not image.image or not image.content_hash:
+        return
+    if content_hash and image.content_hash != content_hash:
+        # The image was replaced after this job was queued; its own job handles it
+        return
+    renditions = generate_renditions(image.image, image.content_hash, settings.IMAGE_RENDITIONS)
+    if PropertyImage.objects.filter(id=image.id, content_hash=image.content_hash).update(renditions=renditions):
+        bump_media_version([image.property_id])
+
+
+def probe_video(video, ffmpeg):
+    """Fill in the empty duration, thumbnail and file_size of `video`; returns the fields set"""
+    changed = []
+    storage = video.video.storage
+    if video.file_size is None:
+        video.file_size = storage.size(video.video.name)
+        changed.append('file_size')
+    if video.duration is None or (ffmpeg and not video.thumbnail):
+        with local_path(video.video) as path:
+            if video.duration is None:
+                video.duration = mp4_duration(path)
+                if video.duration is not None:
+                    changed.append('duration')
+            if ffmpeg and not video.thumbnail:
+                poster = video_poster(path, ffmpeg)
+                if poster:
+                    name = os.path.splitext(os.path.basename(video.video.name))[0] + '.jpg'
+                    video.thumbnail.save(name, ContentFile(poster), save=False)
+                    changed.append('thumbnail')
+    return changed
+
+
+@task(batch=True, max_attempts=3)
+def probe_videos(payloads):
+    """Probe every claimed video and write the results back with one bulk_update"""
+    ids = [payload['video_id'] for payload in payloads]
+    videos = PropertyVideo.objects.only('id', 'property_id', 'video', 'thumbnail', 'duration', 'file_size').in_bulk(ids)
+    ffmpeg = shutil.which(settings.FFMPEG_BINARY) if settings.FFMPEG_BINARY else None
+
+    errors = []
+    changed = {}
+    fields = set()
+    posters = []
+    for payload in payloads:
+        video = videos.get(payload['video_id'])
+        if video is None or not video.video or video.pk in changed:
+            errors.append(None)
+            continue
+        try:
+            video_fields = probe_video(video, ffmpeg)
+        except Exception as e:
+            errors.append(e)
+            continue
+        errors.append(None)
+        if video_fields:
+            changed[video.pk] = video
+            fields.update(video_fields)
+            if 'thumbnail' in video_fields:
+                posters.append(video.thumbnail.name)
+
+    if changed:
+        PropertyVideo.objects.bulk_update(list(changed.values()), sorted(fields))
+        # bulk_update sends no post_save, count the new poster blobs here
+        add_references(posters)
+        bump_media_version(video.property_id for video in changed.values())
+    return errors
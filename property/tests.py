@@ -1,3 +1,908 @@
+import hashlib
+import importlib
+import io
+import random
+import shutil
+import struct
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from authapp.models import CustomUser
+from common.media import mp4_duration
+from common.models import BackgroundJob, MediaBlob
+from common.storage import blob_name
+from .alerts import UNBOUNDED_HIGH, UNBOUNDED_LOW, IntervalTree, alert_index
+from .digests import send_alert_digests
+from .models import (
+    FloorPlan, Lead, LeadFunnelDaily, LeadLog, LeadStageTransition, Project, ProjectDocument, Property,
+    PropertyAlert, PropertyAlertMatch, PropertyImage, PropertyType, PropertyVideo, VideoUploadSession,
+)
+from .ordering import lock_property
+from .routing import LeadRouter, lead_router
+from .serializers.floorplan import FloorPlanBulkCreateSerializer
+from .tasks import generate_image_renditions, probe_videos
 
-# Create your tests here.
+
+class PropertyTestMixin:
+    """Users, a property and an authenticated admin client shared by the tests below"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in ['Admin', 'Agent', 'Buyer', 'Seller', 'Developer']:
+            Group.objects.get_or_create(name=name)
+        cls.admin = CustomUser.objects.create_user('admin@example.com', 'pw12345!', account_status='approved')
+        cls.admin.groups.add(Group.objects.get(name='Admin'))
+        cls.agent = CustomUser.objects.create_user('agent@example.com', 'pw12345!', account_status='approved')
+        cls.agent.groups.add(Group.objects.get(name='Agent'))
+        cls.property_type = PropertyType.objects.create(name='Apartment')
+        cls.property = cls.create_property()
+
+    @classmethod
+    def create_property(cls, **kwargs):
+        values = {
+            'title': 'Lake View', 'description': 'd', 'property_type': cls.property_type, 'listing_type': 'sale',
+            'address': 'a', 'city': 'Pune', 'state': 'MH', 'postal_code': '411001', 'total_area': 1000,
+            'minimum_price': 100, 'maximum_price': 200, 'is_approved': True,
+        }
+        values.update(kwargs)
+        return Property.objects.create(**values)
+
+    @classmethod
+    def create_lead(cls, number, **kwargs):
+        values = {
+            'first_name': f'Lead{number}', 'last_name': 'N', 'email': f'lead{number}@example.com',
+            'phone': f'98000{number:05d}', 'interested_property': cls.property,
+        }
+        values.update(kwargs)
+        return Lead.objects.create(**values)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+
+def png_bytes(width=40, height=30, color=(200, 30, 30)):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def mp4_bytes(seconds, timescale=1000, version=0):
+    """A minimal MP4: ftyp, then a moov holding only the movie header, after some media data"""
+    def box(box_type, payload):
+        return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+    if version == 1:
+        header = struct.pack('>QQIQ', 0, 0, timescale, int(seconds * timescale))
+    else:
+        header = struct.pack('>IIII', 0, 0, timescale, int(seconds * timescale))
+    mvhd = box(b'mvhd', bytes([version, 0, 0, 0]) + header + bytes(80))
+    return box(b'ftyp', b'isom\0\0\0\0isom') + box(b'mdat', bytes(256)) + box(b'moov', mvhd)
+
+
+class MediaRootMixin:
+    """Stores uploads in a temporary MEDIA_ROOT and PRIVATE_MEDIA_ROOT removed after each test"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        private_media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, private_media_root, ignore_errors=True)
+        override = self.settings(MEDIA_ROOT=media_root, PRIVATE_MEDIA_ROOT=private_media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class LeadImportTests(PropertyTestMixin, TestCase):
+    def upload(self, content, name='leads.csv'):
+        return self.client.post('/api/leads/import/', {'file': SimpleUploadedFile(name, content)}, format='multipart')
+
+    def csv_rows(self, count, start=0):
+        lines = ['first_name,last_name,email,phone,interested_property']
+        lines += [f'L{i},N,l{i}@example.com,90000{i:05d},{self.property.id}' for i in range(start, start + count)]
+        return ('\n'.join(lines) + '\n').encode()
+
+    def test_anonymous_users_cannot_import(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.upload(self.csv_rows(2)).status_code, 401)
+        self.assertFalse(Lead.objects.exists())
+
+    def test_imports_rows_and_reports_duplicates(self):
+        response = self.upload(self.csv_rows(3) + f'Dup,N,l0@example.com,9999999999,{self.property.id}\n'.encode())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(response.data['failed'], 1)
+        self.assertEqual(response.data['errors'][0]['row'], 4)
+        self.assertEqual(Lead.objects.count(), 3)
+
+    def test_invalid_utf8_is_rejected_before_any_chunk(self):
+        content = self.csv_rows(5) + b'Bad,N,\xff\xfe@example.com,9000011111,1\n'
+        response = self.client.post(
+            '/api/leads/import/', {'file': SimpleUploadedFile('leads.csv', content), 'chunk_size': 2}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('line 7', str(response.data['file']))
+        self.assertEqual(Lead.objects.count(), 0)
+
+
+class ExportTests(PropertyTestMixin, TestCase):
+    def test_property_export_requires_authentication(self):
+        self.assertEqual(APIClient().get('/api/properties/export/').status_code, 401)
+
+    def test_property_export_streams_csv(self):
+        self.create_property(title='Second')
+        response = self.client.get('/api/properties/export/?file_format=csv')
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:2], ['id', 'title'])
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], ['Second', 'Lake View'])
+
+    def test_property_export_rejects_sort_by(self):
+        response = self.client.get('/api/properties/export/?sort_by=title')
+        self.assertEqual(response.status_code, 400)
+
+
+class LeadBulkActionTests(PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.leads = [self.create_lead(i, priority='low') for i in range(4)]
+
+    def test_update_by_ids_logs_each_changed_lead(self):
+        ids = [lead.id for lead in self.leads[:2]]
+        response = self.client.post('/api/leads/bulk/', {
+            'ids': ids, 'action': 'update_priority', 'priority': 'high',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(sorted(response.data['lead_ids']), sorted(ids))
+        self.assertEqual(Lead.objects.filter(priority='high').count(), 2)
+
+    def test_unknown_filter_keys_are_rejected(self):
+        response = self.client.post('/api/leads/bulk/', {
+            'filters': {'assgned_to': self.agent.id}, 'action': 'update_priority', 'priority': 'high',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Lead.objects.filter(priority='high').exists())
+
+    def test_filters_without_values_are_rejected(self):
+        response = self.client.post('/api/leads/bulk/', {
+            'filters': {'status': ''}, 'action': 'update_priority', 'priority': 'high',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Lead.objects.filter(priority='high').exists())
+
+    def test_filters_select_matching_leads(self):
+        Lead.objects.filter(id=self.leads[0].id).update(status='contacted')
+        response = self.client.post('/api/leads/bulk/', {
+            'filters': {'status': 'contacted'}, 'action': 'update_priority', 'priority': 'urgent',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(Lead.objects.filter(priority='urgent').values_list('id', flat=True)), [self.leads[0].id])
+
+    def test_assign_locks_leads_without_joining_the_previous_agent(self):
+        Lead.objects.filter(id=self.leads[0].id).update(assigned_to=self.agent)
+        ids = [lead.id for lead in self.leads[:2]]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/leads/bulk/', {
+                'ids': ids, 'action': 'assign', 'assigned_to': self.admin.id,
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        # The locking read (the one excluding already assigned leads) must stay on the lead table
+        lock_queries = [query['sql'] for query in queries if query['sql'].startswith('SELECT') and ' NOT ' in query['sql']]
+        self.assertEqual(len(lock_queries), 1)
+        self.assertNotIn('JOIN', lock_queries[0])
+        self.assertEqual(
+            sorted(LeadLog.objects.filter(action='assigned').values_list('old_value', flat=True)),
+            ['Unassigned', self.agent.email],
+        )
+
+    def test_requires_authentication(self):
+        response = APIClient().post('/api/leads/bulk/', {
+            'ids': [self.leads[0].id], 'action': 'update_priority', 'priority': 'high',
+        }, format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+class LeadRoutingTests(PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_agent = CustomUser.objects.create_user('agent2@example.com', 'pw12345!', account_status='approved')
+        self.other_agent.groups.add(Group.objects.get(name='Agent'))
+        lead_router.invalidate()
+
+    def test_route_prefers_least_loaded_agent(self):
+        self.create_lead(900, assigned_to=self.other_agent)
+        router = LeadRouter()
+        self.assertEqual(router.route(locations=['Pune']), self.agent.id)
+
+    def test_import_spreads_one_chunk_across_agents(self):
+        self.create_lead(900, assigned_to=self.other_agent)
+        lines = ['first_name,last_name,email,phone,interested_property']
+        lines += [f'L{i},N,l{i}@example.com,90000{i:05d},{self.property.id}' for i in range(4)]
+        response = self.client.post('/api/leads/import/', {
+            'file': SimpleUploadedFile('leads.csv', ('\n'.join(lines) + '\n').encode()),
+        }, format='multipart')
+        self.assertEqual(response.data['created'], 4)
+
+        imported = Lead.objects.exclude(first_name='Lead900')
+        per_agent = {
+            agent.id: imported.filter(assigned_to=agent).count() for agent in (self.agent, self.other_agent)
+        }
+        self.assertEqual(per_agent, {self.agent.id: 2, self.other_agent.id: 2})
+
+
+class LeadTimelineTests(PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.lead = self.create_lead(1)
+        LeadLog.objects.create(lead=self.lead, action='note_added', description='Called back')
+
+    def test_since_filters_older_entries(self):
+        response = self.client.get(f'/api/leads/{self.lead.id}/logs/?since=2000-01-01T00:00:00')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['results'])
+        response = self.client.get(f'/api/leads/{self.lead.id}/logs/?since=2999-01-01T00:00:00')
+        self.assertEqual(response.data['results'], [])
+
+    def test_malformed_or_impossible_since_is_rejected(self):
+        for since in ['yesterday', '2026-13-45T00:00']:
+            response = self.client.get(f'/api/leads/{self.lead.id}/logs/', {'since': since})
+            self.assertEqual(response.status_code, 400, since)
+
+
+class LeadFunnelTests(PropertyTestMixin, TestCase):
+    def test_returns_every_stage(self):
+        response = self.client.get('/api/leads/funnel/', {'agent': self.agent.id, 'date_from': '2026-01-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['stage'] for row in response.data['stages']], [s for s, _ in Lead.LEAD_STATUS_CHOICES])
+
+    def transitions(self, lead):
+        return list(
+            LeadStageTransition.objects.filter(lead=lead).order_by('changed_at', 'id').values_list('from_status', 'to_status')
+        )
+
+    def test_mark_contacted_reaches_the_funnel(self):
+        lead = self.create_lead(1)
+        self.assertEqual(self.client.post(f'/api/leads/{lead.id}/mark_contacted/').status_code, 200)
+        # Contacting an already contacted lead is not another transition
+        self.assertEqual(self.client.post(f'/api/leads/{lead.id}/mark_contacted/').status_code, 200)
+        self.assertEqual(self.transitions(lead), [('new', 'contacted')])
+
+        call_command('rollup_lead_funnel', days=1, stdout=io.StringIO())
+        row = LeadFunnelDaily.objects.get(stage='contacted')
+        self.assertEqual(row.entered, 1)
+
+    def test_backfill_replays_contacted_logs(self):
+        lead = self.create_lead(1, status='qualified')
+        LeadLog.objects.create(lead=lead, action='contacted')
+        LeadLog.objects.create(lead=lead, action='status_changed', old_value='contacted', new_value='qualified')
+        call_command('rollup_lead_funnel', backfill=True, stdout=io.StringIO())
+        self.assertEqual(self.transitions(lead), [('', 'new'), ('new', 'contacted'), ('contacted', 'qualified')])
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in [{'agent': 'abc'}, {'property': '1.5'}, {'date_from': '2026-13-45'}]:
+            response = self.client.get('/api/leads/funnel/', params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class IntervalTreeTests(TestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        intervals = []
+        for key in range(300):
+            low, high = sorted(rng.randint(0, 100) for _ in range(2))
+            if rng.random() < 0.2:
+                low = UNBOUNDED_LOW
+            if rng.random() < 0.2:
+                high = UNBOUNDED_HIGH
+            intervals.append((low, high, key))
+        tree = IntervalTree(intervals)
+        for _ in range(300):
+            low, high = sorted(rng.randint(-10, 110) for _ in range(2))
+            expected = {key for start, end, key in intervals if start <= high and end >= low}
+            self.assertEqual(tree.overlapping(low, high), expected, (low, high))
+            self.assertEqual(
+                tree.containing(low), {key for start, end, key in intervals if start <= low <= end}
+            )
+
+    def test_inverted_intervals_do_not_recurse_forever(self):
+        tree = IntervalTree([(5, 3, 'inverted'), (9, 1, 'also'), (2, 4, 'fine')])
+        self.assertIn('fine', tree.containing(3))
+
+
+class PropertyAlertTests(PropertyTestMixin, TestCase):
+    def create_alert(self, **kwargs):
+        return PropertyAlert.objects.create(user=self.agent, name='Alert', **kwargs)
+
+    def setUp(self):
+        super().setUp()
+        alert_index.invalidate()
+
+    def test_index_agrees_with_matches_property(self):
+        alerts = [
+            self.create_alert(),
+            self.create_alert(cities=['pune'], min_price=50, max_price=150),
+            self.create_alert(cities=['Mumbai']),
+            self.create_alert(listing_types=['rent']),
+            self.create_alert(property_types=['apartment'], min_area=900, max_area=1100),
+            self.create_alert(min_price=300),
+            self.create_alert(max_area=500),
+            self.create_alert(min_bedrooms=3),
+            self.create_alert(min_price=500, max_price=300),
+            self.create_alert(min_area=2000, max_area=100),
+            self.create_alert(required_features=['abc']),
+            self.create_alert(required_features=[1.7]),
+        ]
+        listings = [
+            self.property,
+            self.create_property(minimum_price=250, maximum_price=600, total_area=400),
+            self.create_property(city='Mumbai', listing_type='rent', bedrooms=4),
+        ]
+        for listing in listings:
+            expected = {alert.id for alert in alerts if alert.matches_property(listing)}
+            self.assertEqual(alert_index.match(listing), expected, listing.title)
+
+    def test_inverted_and_malformed_alerts_match_nothing(self):
+        self.create_alert(min_price=500, max_price=300)
+        self.create_alert(required_features=['abc'])
+        self.assertEqual(alert_index.match(self.property), set())
+
+    def test_clean_rejects_inverted_ranges_and_malformed_features(self):
+        alert = PropertyAlert(user=self.agent, name='Alert', min_price=500, max_price=300,
+                              min_area=20, max_area=10, required_features=['abc'])
+        with self.assertRaises(ValidationError) as raised:
+            alert.clean()
+        self.assertEqual(set(raised.exception.message_dict), {'max_price', 'max_area', 'required_features'})
+        PropertyAlert(user=self.agent, name='Alert', min_price=1, max_price=2, required_features=[3, '4']).clean()
+
+    def test_matching_failure_does_not_fail_the_save(self):
+        with mock.patch.object(alert_index, 'enqueue_matches', side_effect=RuntimeError('boom')):
+            with self.assertLogs('property.signals', level='ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    listing = self.create_property(title='Fresh')
+        self.assertTrue(Property.objects.filter(pk=listing.pk).exists())
+
+
+class AlertDigestTests(PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.due = PropertyAlert.objects.create(user=self.agent, name='Due', frequency='daily')
+        self.recent = PropertyAlert.objects.create(
+            user=self.admin, name='Recent', frequency='daily', last_sent=timezone.now()
+        )
+        for alert in (self.due, self.recent):
+            PropertyAlertMatch.objects.create(alert=alert, property=self.property)
+
+    def test_queues_one_digest_per_due_alert_and_marks_it(self):
+        stats = send_alert_digests(batch_size=1)
+        self.assertEqual(stats, {'alerts': 1, 'queued': 1})
+        job = BackgroundJob.objects.get(name='send_email')
+        self.assertEqual(job.payload['recipient_list'], [self.agent.email])
+        self.assertIn('Lake View', job.payload['message'])
+        self.assertFalse(PropertyAlertMatch.objects.filter(alert=self.due, delivered_at__isnull=True).exists())
+        self.assertTrue(PropertyAlertMatch.objects.filter(alert=self.recent, delivered_at__isnull=True).exists())
+
+        self.assertEqual(send_alert_digests()['alerts'], 0)
+
+    def test_dry_run_changes_nothing(self):
+        self.assertEqual(send_alert_digests(dry_run=True)['queued'], 1)
+        self.assertFalse(BackgroundJob.objects.exists())
+        self.due.refresh_from_db()
+        self.assertIsNone(self.due.last_sent)
+
+
+class MediaMetadataTests(MediaRootMixin, PropertyTestMixin, TestCase):
+    def test_upload_metadata_is_stored_once(self):
+        content = png_bytes(40, 30)
+        image = PropertyImage.objects.create(
+            property=self.property, image=SimpleUploadedFile('front.png', content, content_type='image/png'), order=1
+        )
+        image.refresh_from_db()
+        self.assertEqual(
+            (image.file_size, image.width, image.height, image.mime_type, image.content_hash),
+            (len(content), 40, 30, 'image/png', hashlib.sha256(content).hexdigest()),
+        )
+        self.assertTrue(BackgroundJob.objects.filter(name='generate_image_renditions').exists())
+
+        # Saving without a new file keeps the metadata and does not read the file again
+        with mock.patch('common.media.media_metadata') as media_metadata:
+            image.caption = 'Front'
+            image.save()
+        media_metadata.assert_not_called()
+        self.assertEqual(image.width, 40)
+
+    def test_list_serves_stored_metadata(self):
+        PropertyImage.objects.create(
+            property=self.property, image=SimpleUploadedFile('front.png', png_bytes(40, 30)), order=1
+        )
+        response = self.client.get('/api/property-images/')
+        self.assertEqual(response.status_code, 200)
+        row = response.data['results'][0]
+        self.assertEqual((row['width'], row['height']), (40, 30))
+        self.assertGreater(row['file_size'], 0)
+
+
+class ImageRenditionTests(MediaRootMixin, PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.image = PropertyImage.objects.create(
+            property=self.property, image=SimpleUploadedFile('front.png', png_bytes(400, 300)), order=1
+        )
+
+    def test_renditions_are_resized_never_upscaled_and_recorded(self):
+        with self.settings(IMAGE_RENDITIONS={'thumb': 100, 'full': 1280}):
+            generate_image_renditions(self.image.id, self.image.content_hash)
+        self.image.refresh_from_db()
+        thumb, full = self.image.renditions['thumb'], self.image.renditions['full']
+        self.assertEqual((thumb['width'], thumb['height']), (100, 75))
+        self.assertEqual((full['width'], full['height']), (400, 300))
+        self.assertTrue(thumb['webp'].endswith(f"{self.image.content_hash}-100w.webp"))
+        self.assertTrue(default_storage.exists(thumb['jpeg']))
+
+        response = self.client.get(f'/api/property-images/{self.image.id}/')
+        self.assertIn('100w', response.data['srcset']['webp'])
+
+    def test_existing_renditions_are_not_written_again(self):
+        generate_image_renditions(self.image.id)
+        with mock.patch.object(default_storage, 'save') as save:
+            generate_image_renditions(self.image.id)
+        save.assert_not_called()
+
+    def test_job_for_a_replaced_image_does_nothing(self):
+        generate_image_renditions(self.image.id, content_hash='0' * 64)
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.renditions, {})
+
+
+class BulkImageUploadTests(MediaRootMixin, PropertyTestMixin, TestCase):
+    def upload(self, *contents):
+        return self.client.post('/api/property-images/bulk-upload/', {
+            'property': self.property.id,
+            'images': [SimpleUploadedFile(f'photo{i}.png', content, content_type='image/png')
+                       for i, content in enumerate(contents)],
+        }, format='multipart')
+
+    def test_appends_after_existing_images_and_shares_identical_files(self):
+        PropertyImage.objects.create(property=self.property, image=SimpleUploadedFile('a.png', png_bytes()), order=1)
+        same = png_bytes(color=(0, 0, 255))
+        response = self.upload(same, png_bytes(color=(0, 255, 0)), same)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([row['order'] for row in response.data], [2, 3, 4])
+        self.assertFalse(any(row['is_primary'] for row in response.data))
+
+        blob = MediaBlob.objects.get(sha256=hashlib.sha256(same).hexdigest())
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(BackgroundJob.objects.filter(name='generate_image_renditions').count(), 4)
+
+    def test_first_image_of_a_property_becomes_primary(self):
+        response = self.upload(png_bytes(), png_bytes(color=(1, 2, 3)))
+        self.assertEqual([row['is_primary'] for row in response.data], [True, False])
+
+    def test_failed_insert_leaves_no_rows(self):
+        with mock.patch.object(PropertyImage.objects, 'bulk_create', side_effect=RuntimeError('db down')):
+            with self.assertRaises(RuntimeError):
+                self.upload(png_bytes())
+        self.assertFalse(PropertyImage.objects.exists())
+
+
+class VideoUploadTests(MediaRootMixin, PropertyTestMixin, TestCase):
+    content = b'0123456789'
+
+    def setUp(self):
+        super().setUp()
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        override = self.settings(VIDEO_UPLOAD_TEMP_DIR=temp_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        response = self.client.post('/api/property-video-uploads/', {
+            'property': self.property.id, 'filename': 'tour.mp4', 'total_size': len(self.content),
+            'sha256': hashlib.sha256(self.content).hexdigest(),
+        }, format='json')
+        self.upload_id = response.data['upload_id']
+        self.url = f'/api/property-video-uploads/{self.upload_id}/'
+
+    def put(self, offset, body):
+        return self.client.put(f'{self.url}?offset={offset}', body, content_type='application/offset+octet-stream')
+
+    def test_chunks_resume_and_finalize(self):
+        self.assertEqual(self.put(0, self.content[:4]).data['offset'], 4)
+        # A retried chunk that already arrived is answered with the offset to resume from
+        retried = self.put(0, self.content[:4])
+        self.assertEqual((retried.status_code, retried.data['offset']), (409, 4))
+        self.assertEqual(self.put(4, self.content[4:]).data['offset'], 10)
+
+        response = self.client.post(f'{self.url}finalize/')
+        self.assertEqual(response.status_code, 201)
+        video = PropertyVideo.objects.get()
+        self.assertEqual(video.file_size, len(self.content))
+        with video.video.open('rb') as file:
+            self.assertEqual(file.read(), self.content)
+
+    def test_failed_finalize_can_be_retried(self):
+        self.put(0, self.content)
+        with mock.patch.object(VideoUploadSession, 'save', side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            self.client.post(f'{self.url}finalize/')
+        session = VideoUploadSession.objects.get(upload_id=self.upload_id)
+        self.assertEqual((session.status, session.received), ('active', len(self.content)))
+        self.assertFalse(PropertyVideo.objects.exists())
+        with open(session.temp_path(), 'rb') as file:
+            self.assertEqual(file.read(), self.content)
+
+        self.assertEqual(self.client.post(f'{self.url}finalize/').status_code, 201)
+        with PropertyVideo.objects.get().video.open('rb') as file:
+            self.assertEqual(file.read(), self.content)
+
+    def test_chunk_in_progress_elsewhere_gets_409_until_it_times_out(self):
+        session = VideoUploadSession.objects.get(upload_id=self.upload_id)
+        session.chunk_started_at = timezone.now()
+        session.save(update_fields=['chunk_started_at'])
+        response = self.put(0, self.content)
+        self.assertEqual((response.status_code, response.data['offset']), (409, 0))
+
+        VideoUploadSession.objects.filter(pk=session.pk).update(
+            chunk_started_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(self.put(0, self.content).data['offset'], 10)
+        session.refresh_from_db()
+        self.assertIsNone(session.chunk_started_at)
+
+    def test_aborted_upload_refuses_chunks(self):
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+        self.assertEqual(self.put(0, self.content).status_code, 409)
+
+
+class ProjectDocumentTests(MediaRootMixin, PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.developer = CustomUser.objects.create_user('dev@example.com', 'pw12345!', account_status='approved')
+        self.developer.groups.add(Group.objects.get(name='Developer'))
+        self.project = Project.objects.create(name='Green Acres', location='Pune')
+        self.project.developers.add(self.developer)
+
+    def upload(self, client, name='brochure.pdf', content=b'%PDF-1.4 brochure'):
+        return client.post('/api/project-documents/', {
+            'project': self.project.id, 'name': 'Brochure', 'file': SimpleUploadedFile(name, content),
+        }, format='multipart')
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_anonymous_users_cannot_create_or_delete(self):
+        document = ProjectDocument.objects.create(
+            project=self.project, name='Plan', file=SimpleUploadedFile('plan.pdf', b'plan')
+        )
+        self.assertEqual(self.upload(APIClient()).status_code, 401)
+        self.assertEqual(APIClient().delete(f'/api/project-documents/{document.id}/').status_code, 401)
+        self.assertTrue(ProjectDocument.objects.filter(pk=document.pk).exists())
+
+    def test_only_project_owners_manage_documents(self):
+        outsider = self.client_for(self.agent)
+        self.assertEqual(self.upload(outsider).status_code, 403)
+        self.assertFalse(ProjectDocument.objects.exists())
+
+        response = self.upload(self.client_for(self.developer))
+        self.assertEqual(response.status_code, 201)
+        document_id = response.data['id']
+        self.assertEqual(outsider.delete(f'/api/project-documents/{document_id}/').status_code, 403)
+        self.assertEqual(outsider.patch(f'/api/project-documents/{document_id}/', {'name': 'X'}).status_code, 403)
+        self.assertEqual(self.client.delete(f'/api/project-documents/{document_id}/').status_code, 204)
+
+    def test_files_are_private_and_served_by_download(self):
+        content = b'%PDF-1.4 brochure'
+        response = self.upload(self.client_for(self.developer), content=content)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('file', response.data)
+
+        document = ProjectDocument.objects.get(pk=response.data['id'])
+        path = document.file.path
+        self.assertTrue(path.startswith(str(document.file.storage.location)))
+        self.assertFalse(path.startswith(str(default_storage.location)))
+        self.assertIsNone(document.file.url)
+
+        detail = self.client.get(f'/api/project-documents/{document.id}/')
+        self.assertNotIn('file', detail.data)
+        self.assertIn('/download/', detail.data['download_url'])
+
+        download = self.client_for(self.agent).get(f'/api/project-documents/{document.id}/download/')
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(b''.join(download.streaming_content), content)
+        self.assertIn('private', download['Cache-Control'])
+
+    def test_migration_moves_existing_files_out_of_public_media(self):
+        from django.apps import apps
+        migration = importlib.import_module('property.migrations.0039_private_project_documents')
+
+        legacy = ProjectDocument.objects.create(project=self.project, name='Legacy', file='')
+        shared = ProjectDocument.objects.create(project=self.project, name='Shared', file='')
+        legacy_name = default_storage.save('project_documents/legacy.pdf', ContentFile(b'legacy'))
+        blob = blob_name(hashlib.sha256(b'shared').hexdigest(), 'shared.pdf')
+        default_storage.save(blob, ContentFile(b'shared'))
+        MediaBlob.objects.create(sha256=hashlib.sha256(b'shared').hexdigest(), name=blob, size=6, ref_count=2)
+        ProjectDocument.objects.filter(pk=legacy.pk).update(file=legacy_name)
+        ProjectDocument.objects.filter(pk=shared.pk).update(file=blob)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            migration.move_documents_to_private_storage(apps, None)
+
+        for document, content in ((legacy, b'legacy'), (shared, b'shared')):
+            document.refresh_from_db()
+            self.assertTrue(document.file.name.startswith('project_documents/'))
+            with document.file.open('rb') as file:
+                self.assertEqual(file.read(), content)
+        # The pre-series original is gone from public media; the shared blob is left to the reference count
+        self.assertFalse(default_storage.exists(legacy_name))
+        self.assertTrue(default_storage.exists(blob))
+        self.assertEqual(MediaBlob.objects.get(name=blob).ref_count, 1)
+
+    def test_deleting_a_document_removes_its_file(self):
+        document = ProjectDocument.objects.create(
+            project=self.project, name='Plan', file=SimpleUploadedFile('plan.pdf', b'plan')
+        )
+        storage, name = document.file.storage, document.file.name
+        with self.captureOnCommitCallbacks(execute=True):
+            document.delete()
+        self.assertFalse(storage.exists(name))
+
+
+class FloorPlanBulkTests(MediaRootMixin, PropertyTestMixin, TestCase):
+    def items(self, count):
+        return [
+            {
+                'property': self.property.id, 'category': f'{index + 1}BHK', 'square_feet': 500 + index,
+                'price': 100, 'image': SimpleUploadedFile(f'plan{index}.png', png_bytes(color=(index, 0, 0))),
+            }
+            for index in range(count)
+        ]
+
+    def create(self, items):
+        serializer = FloorPlanBulkCreateSerializer(data={'floor_plans': items})
+        serializer.is_valid(raise_exception=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            return serializer.save()
+
+    def assert_created(self, floor_plans):
+        self.assertEqual(
+            [(plan.id, plan.category) for plan in floor_plans],
+            list(FloorPlan.objects.order_by('id').values_list('id', 'category')),
+        )
+        self.assertEqual(
+            sorted(MediaBlob.objects.values_list('ref_count', flat=True)), [1] * len(floor_plans)
+        )
+
+    def test_bulk_create_returns_the_created_rows(self):
+        self.assert_created(self.create(self.items(3)))
+
+    def test_bulk_create_without_returning_inserts_row_by_row(self):
+        # As on MySQL: the ids come from each INSERT, never from guessing at the table
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            floor_plans = self.create(self.items(3))
+        self.assert_created(floor_plans)
+
+    def test_bulk_update_rejects_non_integer_ids(self):
+        plan = FloorPlan.objects.create(property=self.property, category='1BHK', square_feet=500, price=100)
+        response = self.client.patch('/api/floor-plans/bulk-update/', {'floor_plans': [
+            {'id': plan.id + 0.7, 'price': 1},
+            {'id': 'abc', 'price': 1},
+            {'price': 1},
+            {'id': plan.id, 'price': 150},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.data['floor_plans']
+        self.assertIn('id', errors[0])
+        self.assertIn('id', errors[1])
+        self.assertIn('id', errors[2])
+        self.assertEqual(errors[3], {})
+        plan.refresh_from_db()
+        self.assertEqual(plan.price, 100)
+
+
+class VideoProbeTests(MediaRootMixin, PropertyTestMixin, TestCase):
+    def create_video(self, content=None, order=1):
+        content = content if content is not None else mp4_bytes(12.5)
+        return PropertyVideo.objects.create(
+            property=self.property, video=SimpleUploadedFile(f'tour{order}.mp4', content), order=order
+        )
+
+    def test_duration_comes_from_the_movie_header(self):
+        for version in (0, 1):
+            with tempfile.NamedTemporaryFile(suffix='.mp4') as file:
+                file.write(mp4_bytes(12.5, timescale=600, version=version))
+                file.flush()
+                self.assertEqual(mp4_duration(file.name), timedelta(seconds=12.5))
+        with tempfile.NamedTemporaryFile(suffix='.mp4') as file:
+            file.write(b'not a video')
+            file.flush()
+            self.assertIsNone(mp4_duration(file.name))
+
+    def test_new_uploads_queue_a_probe(self):
+        video = self.create_video()
+        self.assertTrue(BackgroundJob.objects.filter(name='probe_videos', payload={'video_id': video.id}).exists())
+        video.title = 'Renamed'
+        video.save()
+        self.assertEqual(BackgroundJob.objects.filter(name='probe_videos').count(), 1)
+
+    def test_probe_fills_duration_size_and_poster_in_one_update(self):
+        first, second = self.create_video(order=1), self.create_video(mp4_bytes(3), order=2)
+        PropertyVideo.objects.update(file_size=None)
+        with mock.patch('property.tasks.shutil.which', return_value='/usr/bin/ffmpeg'), \
+                mock.patch('property.tasks.video_poster', return_value=png_bytes()) as video_poster, \
+                CaptureQueriesContext(connection) as queries:
+            errors = probe_videos([{'video_id': first.id}, {'video_id': second.id}, {'video_id': 0}])
+        self.assertEqual(errors, [None, None, None])
+        video_updates = [query for query in queries if query['sql'].startswith('UPDATE "property_propertyvideo"')]
+        self.assertEqual(len(video_updates), 1)
+        self.assertEqual(video_poster.call_count, 2)
+
+        first.refresh_from_db()
+        self.assertEqual(first.duration, timedelta(seconds=12.5))
+        self.assertEqual(first.file_size, first.video.size)
+        self.assertTrue(first.thumbnail)
+        # Both posters are the same image, stored once and referenced twice
+        self.assertEqual(MediaBlob.objects.get(name=first.thumbnail.name).ref_count, 2)
+
+    def test_without_ffmpeg_the_poster_is_skipped(self):
+        video = self.create_video(b'not a video')
+        with self.settings(FFMPEG_BINARY=None):
+            self.assertEqual(probe_videos([{'video_id': video.id}]), [None])
+        video.refresh_from_db()
+        self.assertEqual((video.duration, video.file_size, bool(video.thumbnail)), (None, 11, False))
+
+    def test_command_queues_videos_missing_fields(self):
+        incomplete = self.create_video(order=1)
+        complete = self.create_video(order=2)
+        PropertyVideo.objects.filter(pk=complete.pk).update(
+            duration=timedelta(seconds=3), file_size=10, thumbnail='posters/done.jpg'
+        )
+        BackgroundJob.objects.all().delete()
+        call_command('probe_videos', stdout=io.StringIO())
+        self.assertEqual(
+            list(BackgroundJob.objects.filter(name='probe_videos').values_list('payload', flat=True)),
+            [{'video_id': incomplete.id}],
+        )
+
+
+class MediaManifestTests(MediaRootMixin, PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = f'/api/properties/{self.property.id}/media/'
+
+    def add_image(self, order=1):
+        return PropertyImage.objects.create(
+            property=self.property, image=SimpleUploadedFile(f'photo{order}.png', png_bytes()), order=order
+        )
+
+    def test_etag_follows_the_stored_version(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first['ETag'], f'"media-{self.property.id}-1"')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        image = self.add_image()
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual([row['id'] for row in second.data['images']], [image.id])
+        self.assertEqual(second.data['version'], 2)
+
+        # The version lives in the database, not the cache: a cold cache keeps it
+        cache.clear()
+        third = self.client.get(self.url, HTTP_IF_NONE_MATCH=second['ETag'])
+        self.assertEqual((third.status_code, third['ETag']), (304, second['ETag']))
+
+    def test_rolled_back_changes_keep_the_version(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.add_image()
+            raise RuntimeError
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.media_version, 1)
+
+    def test_saving_a_stale_property_keeps_the_version(self):
+        stale = Property.objects.get(pk=self.property.pk)
+        self.add_image()
+        stale.title = 'Renamed'
+        stale.save()
+        self.property.refresh_from_db()
+        self.assertEqual((self.property.title, self.property.media_version), ('Renamed', 2))
+
+    def test_missing_property_is_not_found(self):
+        property_obj = self.create_property(title='Gone')
+        url = f'/api/properties/{property_obj.id}/media/'
+        etag = self.client.get(url)['ETag']
+        property_obj.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+
+
+class MediaReorderTests(MediaRootMixin, PropertyTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.images = [
+            PropertyImage.objects.create(
+                property=self.property, image=SimpleUploadedFile(f'photo{order}.png', png_bytes()), order=order
+            )
+            for order in (1, 2, 3)
+        ]
+
+    def reorder(self, ids, url='/api/property-images/reorder/', property_id=None):
+        return self.client.post(url, {'property': property_id or self.property.id, 'ids': ids}, format='json')
+
+    def orders(self, model=PropertyImage):
+        return list(model.objects.filter(property=self.property).order_by('order').values_list('id', flat=True))
+
+    def media_version(self):
+        return Property.objects.values_list('media_version', flat=True).get(pk=self.property.pk)
+
+    def test_reorder_applies_the_full_order_at_once(self):
+        first, second, third = [image.id for image in self.images]
+        version = self.media_version()
+        response = self.reorder([third, first, second])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['moved'], 3)
+        self.assertEqual(self.orders(), [third, first, second])
+        self.assertEqual(self.media_version(), version + 1)
+
+        # Only rows whose position changes are written
+        response = self.reorder([third, second, first])
+        self.assertEqual(response.data['moved'], 2)
+        self.assertEqual(self.orders(), [third, second, first])
+
+    def test_unchanged_order_writes_nothing(self):
+        ids = [image.id for image in self.images]
+        version = self.media_version()
+        self.assertEqual(self.reorder(ids).data['moved'], 0)
+        self.assertEqual(self.media_version(), version)
+
+    def test_partial_duplicate_or_foreign_orderings_are_refused(self):
+        first, second, third = [image.id for image in self.images]
+        other = PropertyImage.objects.create(
+            property=self.create_property(title='Other'), image=SimpleUploadedFile('other.png', png_bytes()), order=1
+        )
+        for ids in ([first, second], [first, second, second], [first, second, third, other.id]):
+            response = self.reorder(ids)
+            self.assertEqual(response.status_code, 400, ids)
+            self.assertIn('error', response.data)
+        self.assertEqual(self.orders(), [first, second, third])
+
+    def test_reorder_works_for_videos(self):
+        videos = [
+            PropertyVideo.objects.create(
+                property=self.property, video=SimpleUploadedFile(f'tour{order}.mp4', mp4_bytes(1)), order=order
+            )
+            for order in (1, 2)
+        ]
+        response = self.reorder([videos[1].id, videos[0].id], url='/api/property-videos/reorder/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.orders(PropertyVideo), [videos[1].id, videos[0].id])
+
+    def test_appends_take_the_next_position_with_the_property_locked(self):
+        with mock.patch('property.ordering.lock_property', wraps=lock_property) as lock:
+            response = self.client.post('/api/property-images/', {
+                'property': self.property.id, 'image': SimpleUploadedFile('new.png', png_bytes(), content_type='image/png'),
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        lock.assert_called_once_with(self.property.id)
+        self.assertEqual(PropertyImage.objects.filter(property=self.property).order_by('-order')[0].order, 4)
+
+        taken = self.client.post('/api/property-images/', {
+            'property': self.property.id, 'order': 2,
+            'image': SimpleUploadedFile('dup.png', png_bytes(), content_type='image/png'),
+        }, format='multipart')
+        self.assertEqual(taken.status_code, 400)
+        self.assertIn('order', taken.data)
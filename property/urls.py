@@ -2,10 +2,12 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .viewsets.property import PropertyViewSet
 from .viewsets.project import ProjectViewSet
+from .viewsets.projectdocument import ProjectDocumentViewSet
 from .viewsets.propertytype import PropertyTypeViewSet
 from .viewsets.amenity import AmenityViewSet
 from .viewsets.propertyimage import PropertyImageViewSet
 from .viewsets.propertyvideo import PropertyVideoViewSet
+from .viewsets.videoupload import VideoUploadViewSet
 from .viewsets.virtualtour import VirtualTourViewSet
 from .viewsets.lead import LeadViewSet
 from .viewsets.leadlog import LeadLogViewSet
@@ -16,10 +18,12 @@ from .viewsets.propertywishlist import PropertyWishlistViewSet
 router = DefaultRouter()
 router.register(r'properties', PropertyViewSet, basename="properties")
 router.register(r'projects', ProjectViewSet, basename="projects")
+router.register(r'project-documents', ProjectDocumentViewSet, basename="project-documents")
 router.register(r'property-types', PropertyTypeViewSet, basename="property-types")
 router.register(r'amenities', AmenityViewSet, basename="amenities")
 router.register(r'property-images', PropertyImageViewSet, basename="property-images")
 router.register(r'property-videos', PropertyVideoViewSet, basename="property-videos")
+router.register(r'property-video-uploads', VideoUploadViewSet, basename="property-video-uploads")
 router.register(r'virtual-tours', VirtualTourViewSet, basename="virtual-tours")
 router.register(r'leads', LeadViewSet, basename="leads")
 router.register(r'lead-logs', LeadLogViewSet, basename="lead-logs")
@@ -15,6 +15,7 @@ from ..serializers.floorplan import (
     FloorPlanBulkCreateSerializer,
     FloorPlanBulkUpdateSerializer,
 )
+from authapp.roles import is_admin
 
 
 class FloorPlanViewSet(BaseViewSet):
@@ -31,7 +32,7 @@ class FloorPlanViewSet(BaseViewSet):
             queryset = queryset.filter(property_id=property_id)
 
         # Only show floor plans of approved properties to non-admin users
-        if not self.request.user.groups.filter(name='Admin').exists():
+        if not is_admin(self.request.user):
             queryset = queryset.filter(property__is_approved=True)
 
         return queryset.order_by('category', 'square_feet')
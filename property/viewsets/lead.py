@@ -1,20 +1,28 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
 from common.viewset import BaseViewSet
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from datetime import timedelta
 from django.utils import timezone
-from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.db.models import Q, Sum
 import django_filters
-from common.paginator import Pagination
-from ..models import Lead, LeadLog
+from common.paginator import Pagination, TimelineCursorPagination
+from common.export import export_response, EXPORT_CONTENT_TYPES
+from ..models import Lead, LeadLog, LeadFunnelDaily
+from ..routing import lead_router
 from ..filters.lead import LeadFilter
 from ..serializers.lead import (
     LeadListSerializer,
     LeadDetailSerializer,
     LeadCreateSerializer,
     LeadUpdateSerializer,
+    LeadImportSerializer,
+    LeadBulkActionSerializer,
+    LeadFunnelQuerySerializer,
 )
+from ..serializers.leadlog import LeadLogTimelineSerializer
 
 
 class LeadViewSet(BaseViewSet):
@@ -24,6 +32,38 @@ class LeadViewSet(BaseViewSet):
     pagination_class = Pagination
     # permission_classes = [IsAuthenticated]
 
+    # (column, lookup) pairs streamed by the export action
+    export_columns = [
+        ('id', 'id'),
+        ('first_name', 'first_name'),
+        ('last_name', 'last_name'),
+        ('email', 'email'),
+        ('phone', 'phone'),
+        ('alternate_phone', 'alternate_phone'),
+        ('interested_property', 'interested_property'),
+        ('property_title', 'interested_property__title'),
+        ('status', 'status'),
+        ('priority', 'priority'),
+        ('lead_source', 'lead_source'),
+        ('lead_source_details', 'lead_source_details'),
+        ('assigned_to', 'assigned_to'),
+        ('assigned_to_email', 'assigned_to__email'),
+        ('assigned_at', 'assigned_at'),
+        ('next_follow_up', 'next_follow_up'),
+        ('last_contacted', 'last_contacted'),
+        ('contact_count', 'contact_count'),
+        ('budget_min', 'budget_min'),
+        ('budget_max', 'budget_max'),
+        ('preferred_location', 'preferred_location'),
+        ('company_name', 'company_name'),
+        ('occupation', 'occupation'),
+        ('city', 'city'),
+        ('state', 'state'),
+        ('country', 'country'),
+        ('postal_code', 'postal_code'),
+        ('created_at', 'created_at'),
+    ]
+
     def get_serializer_class(self):
         if self.action == "list":
             return LeadListSerializer
@@ -33,6 +73,10 @@ class LeadViewSet(BaseViewSet):
             return LeadCreateSerializer
         elif self.action in ["update", "partial_update"]:
             return LeadUpdateSerializer
+        elif self.action == "import_leads":
+            return LeadImportSerializer
+        elif self.action == "bulk":
+            return LeadBulkActionSerializer
         return LeadDetailSerializer
 
     def perform_create(self, serializer):
@@ -53,6 +97,16 @@ class LeadViewSet(BaseViewSet):
             description=f"Lead created for {lead.interested_property.title}"
         )
 
+        if getattr(serializer, 'auto_assigned', False):
+            LeadLog.log_action(
+                lead=lead,
+                action='assigned',
+                performed_by=performed_by,
+                old_value='Unassigned',
+                new_value=str(lead.assigned_to),
+                description=f"Lead auto-assigned to {lead.assigned_to.get_full_name()}"
+            )
+
     def perform_update(self, serializer):
         """Update lead and log the changes"""
         # Capture old values before update
@@ -223,6 +277,8 @@ class LeadViewSet(BaseViewSet):
             lead=lead,
             action='contacted',
             performed_by=performed_by,
+            old_value=old_status,
+            new_value='contacted',
             description=f"Lead contacted by {request.user.get_full_name() if performed_by else 'Anonymous user'}"
         )
 
@@ -254,6 +310,45 @@ class LeadViewSet(BaseViewSet):
         serializer = self.get_serializer(lead)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['post'])
+    def auto_assign(self, request, pk=None):
+        """Assign an unassigned lead to the least loaded matching agent"""
+        lead = self.get_object()
+        if lead.assigned_to_id:
+            return Response(
+                {'error': 'Lead is already assigned'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        interested_property = lead.interested_property
+        agent_id = lead_router.route(
+            locations=[lead.city, lead.preferred_location, interested_property.city],
+            property_type_id=interested_property.property_type_id,
+        )
+        if not agent_id:
+            return Response(
+                {'error': 'No agent available for assignment'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        performed_by = request.user if request.user.is_authenticated else None
+        lead.assigned_to_id = agent_id
+        lead.assigned_by = performed_by
+        lead.assigned_at = timezone.now()
+        lead.save()
+
+        LeadLog.log_action(
+            lead=lead,
+            action='assigned',
+            performed_by=performed_by,
+            old_value='Unassigned',
+            new_value=str(lead.assigned_to),
+            description=f"Lead auto-assigned to {lead.assigned_to.get_full_name()}"
+        )
+
+        serializer = self.get_serializer(lead)
+        return Response(serializer.data)
+
     @action(detail=True, methods=['post'])
     def update_status(self, request, pk=None):
         """Update lead status"""
@@ -310,26 +405,59 @@ class LeadViewSet(BaseViewSet):
 
     @action(detail=True, methods=['get'])
     def logs(self, request, pk=None):
-        """Get logs for this specific lead"""
+        """Get logs for this specific lead, newest first, paginated by cursor.
+
+        Pass ?since=<ISO timestamp> to only fetch entries created after it.
+        """
         lead = self.get_object()
-        logs = LeadLog.objects.filter(lead=lead).order_by('-created_at')
-        
-        # Simple serialization
-        logs_data = []
-        for log in logs:
-            logs_data.append({
-                'id': log.id,
-                'action': log.action,
-                'action_display': log.get_action_display(),
-                'performed_by': log.performed_by.get_full_name() if log.performed_by else 'Anonymous User',
-                'old_value': log.old_value,
-                'new_value': log.new_value,
-                'description': log.description,
-                'notes': log.notes,
-                'created_at': log.created_at
-            })
-        
-        return Response(logs_data)
+        logs = LeadLog.objects.filter(lead=lead).select_related('performed_by')
+
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since_value = parse_datetime(since)
+            except ValueError:
+                # Well formed but impossible, e.g. month 13
+                since_value = None
+            if since_value is None:
+                return Response(
+                    {'error': 'since must be an ISO 8601 datetime'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if timezone.is_naive(since_value):
+                since_value = timezone.make_aware(since_value)
+            logs = logs.filter(created_at__gt=since_value)
+
+        paginator = TimelineCursorPagination()
+        page = paginator.paginate_queryset(logs, request, view=self)
+        serializer = LeadLogTimelineSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAuthenticated])
+    def import_leads(self, request):
+        """Bulk import leads from a CSV or NDJSON file, reporting per-row errors"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        summary = serializer.save()
+        return Response(summary, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def bulk(self, request):
+        """Assign, change status or change priority for many leads in one transaction"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        summary = serializer.save()
+        return Response(summary, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def export(self, request):
+        """Stream the filtered leads as CSV or NDJSON (?file_format=csv|ndjson)"""
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_CONTENT_TYPES:
+            return Response({'error': 'Invalid file_format, use csv or ndjson'}, status=400)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(queryset, self.export_columns, file_format, 'leads')
 
     @action(detail=False, methods=['get'])
     def stats(self, request):
@@ -348,6 +476,77 @@ class LeadViewSet(BaseViewSet):
 
         return Response(stats)
 
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def funnel(self, request):
+        """Conversion funnel from the daily rollups.
+
+        Accepts ?date_from, ?date_to (YYYY-MM-DD, default last 30 days),
+        ?agent, ?property and ?lead_source.
+        """
+        # Empty parameters count as absent
+        query = LeadFunnelQuerySerializer(data={
+            key: value for key, value in request.query_params.items() if value
+        })
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        today = timezone.localdate()
+        date_from = params.get('date_from') or today - timedelta(days=29)
+        date_to = params.get('date_to') or today
+
+        rows = LeadFunnelDaily.objects.filter(date__gte=date_from, date__lte=date_to)
+        filters = {'agent': 'agent_id', 'property': 'interested_property_id', 'lead_source': 'lead_source'}
+        for param, field in filters.items():
+            value = params.get(param)
+            if value:
+                rows = rows.filter(**{field: value})
+
+        totals = {'created': Sum('created'), 'entered': Sum('entered'), 'exited': Sum('exited')}
+        by_stage = {
+            row['stage']: row
+            for row in rows.values('stage').annotate(time_in_stage=Sum('time_in_stage'), **totals)
+        }
+        total_leads = sum(row['created'] for row in by_stage.values())
+
+        stages = []
+        for stage, label in Lead.LEAD_STATUS_CHOICES:
+            row = by_stage.get(stage, {})
+            exited = row.get('exited') or 0
+            time_in_stage = row.get('time_in_stage')
+            stages.append({
+                'stage': stage,
+                'label': label,
+                'entered': row.get('entered') or 0,
+                'exited': exited,
+                'reach_rate': round((row.get('entered') or 0) / total_leads * 100, 2) if total_leads else 0,
+                'avg_hours_in_stage': round(time_in_stage.total_seconds() / exited / 3600, 2) if exited and time_in_stage else None,
+            })
+
+        sources = []
+        source_rows = rows.values('lead_source').annotate(
+            leads=Sum('created'),
+            won=Sum('entered', filter=Q(stage='won')),
+            lost=Sum('entered', filter=Q(stage='lost')),
+        ).order_by('lead_source')
+        for row in source_rows:
+            leads = row['leads'] or 0
+            won = row['won'] or 0
+            sources.append({
+                'lead_source': row['lead_source'],
+                'leads': leads,
+                'won': won,
+                'lost': row['lost'] or 0,
+                'conversion_rate': round(won / leads * 100, 2) if leads else 0,
+            })
+
+        return Response({
+            'date_from': date_from,
+            'date_to': date_to,
+            'total_leads': total_leads,
+            'stages': stages,
+            'sources': sources,
+        })
+
     @action(detail=False, methods=['get'])
     def overdue_followups(self, request):
         """Get leads with overdue follow-ups"""
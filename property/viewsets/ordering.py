@@ -0,0 +1,27 @@
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from ..ordering import apply_order
+from ..serializers.reorder import MediaReorderSerializer
+
+
+class ReorderMixin:
+    """Adds POST `reorder/` to viewsets of models ordered per property (unique property + order)"""
+
+    @action(detail=False, methods=['post'])
+    def reorder(self, request):
+        """Set the order of all items of a property at once: {"property": 1, "ids": [5, 3, 4]}"""
+        serializer = MediaReorderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        property_id = serializer.validated_data['property'].id
+        ids = serializer.validated_data['ids']
+        model = self.queryset.model
+        try:
+            moved = apply_order(model, property_id, ids)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'property': property_id,
+            'moved': moved,
+            'order': [{'id': item_id, 'order': position} for position, item_id in enumerate(ids, start=1)],
+        }, status=status.HTTP_200_OK)
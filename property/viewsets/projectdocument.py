@@ -1,6 +1,12 @@
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from common.serving import serve_file
 from common.viewset import BaseViewSet
 from common.paginator import Pagination
+from authapp.roles import is_admin
 from property.models import ProjectDocument
 from property.serializers import (
     ProjectDocumentListSerializer,
@@ -13,6 +19,14 @@ class ProjectDocumentViewSet(BaseViewSet):
     queryset = ProjectDocument.objects.all()
     http_method_names = ['get', 'post', 'patch', 'delete']
     pagination_class = Pagination
+    permission_classes = [IsAuthenticated]
+
+    def check_project_owner(self, project):
+        """Only admins, the project's creator and its developers may change its documents"""
+        user = self.request.user
+        if is_admin(user) or project.created_by_id == user.id or project.developers.filter(pk=user.id).exists():
+            return
+        raise PermissionDenied("Only the project's owners can manage its documents")
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -25,4 +39,37 @@ class ProjectDocumentViewSet(BaseViewSet):
             return ProjectDocumentUpdateSerializer
         return ProjectDocumentDetailSerializer
 
+    def perform_create(self, serializer):
+        self.check_project_owner(serializer.validated_data['project'])
+        super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        self.check_project_owner(serializer.instance.project)
+        super().perform_update(serializer)
+
+    def perform_destroy(self, instance):
+        self.check_project_owner(instance.project)
+        super().perform_destroy(instance)
 
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def download(self, request, pk=None):
+        """
+        The document file, for signed-in users only.
+        Sent by nginx via X-Accel-Redirect when PRIVATE_MEDIA_ACCEL_REDIRECT_PREFIX is set,
+        otherwise streamed here with Range and ETag support.
+        """
+        document = self.get_object()
+        if not document.file:
+            return Response({"error": "Document has no file"}, status=status.HTTP_404_NOT_FOUND)
+        extension = document.file.name.rsplit('.', 1)[-1] if '.' in document.file.name else ''
+        filename = f"{document.name}.{extension}" if extension and not document.name.endswith(f'.{extension}') else document.name
+        return serve_file(
+            request,
+            document.file.storage,
+            document.file.name,
+            content_hash=document.content_hash or None,
+            content_type=document.mime_type or None,
+            filename=filename,
+            as_attachment=True,
+            private=True,
+        )
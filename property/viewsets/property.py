@@ -4,6 +4,10 @@ from common.paginator import Pagination
 from django.db.models import Max, Min
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from common.export import export_response, EXPORT_CONTENT_TYPES
+from ..manifest import media_manifest, media_version
 from ..models import Property
 from ..filters.property import PropertyFilter
 from ..serializers.property import (
@@ -20,6 +24,42 @@ class PropertyViewSet(BaseViewSet):
     pagination_class = Pagination
     order_by = ['-id']  
 
+    # (column, lookup) pairs streamed by the export action
+    export_columns = [
+        ('id', 'id'),
+        ('title', 'title'),
+        ('slug', 'slug'),
+        ('status', 'status'),
+        ('listing_type', 'listing_type'),
+        ('property_type', 'property_type'),
+        ('property_type_name', 'property_type__name'),
+        ('project', 'project'),
+        ('project_name', 'project__name'),
+        ('agent_email', 'agent__email'),
+        ('developer_email', 'developer__email'),
+        ('address', 'address'),
+        ('city', 'city'),
+        ('state', 'state'),
+        ('country', 'country'),
+        ('postal_code', 'postal_code'),
+        ('bedrooms', 'bedrooms'),
+        ('bathrooms', 'bathrooms'),
+        ('total_area', 'total_area'),
+        ('carpet_area', 'carpet_area'),
+        ('built_up_area', 'built_up_area'),
+        ('minimum_price', 'minimum_price'),
+        ('maximum_price', 'maximum_price'),
+        ('price_per_sqft', 'price_per_sqft'),
+        ('monthly_rent', 'monthly_rent'),
+        ('furnishing', 'furnishing'),
+        ('rera_id', 'rera_id'),
+        ('is_featured', 'is_featured'),
+        ('is_verified', 'is_verified'),
+        ('is_approved', 'is_approved'),
+        ('views_count', 'views_count'),
+        ('created_at', 'created_at'),
+    ]
+
     # def get_queryset(self):
     #     queryset = super().get_queryset()
     #     # Only show approved properties to non-admin users
@@ -74,10 +114,47 @@ class PropertyViewSet(BaseViewSet):
         has_inquired = False
         if user.is_authenticated:
             from ..models import Lead
-            has_inquired = Lead.objects.filter(interested_property=instance, created_by=user).exists()
+            has_inquired = Lead.objects.filter(interested_property=instance, created_by_id=user.id).exists()
 
         # Get the original response data
         response = super().retrieve(request, *args, **kwargs)
         response.data['has_inquired'] = has_inquired
 
         return response
+
+    @action(detail=True, methods=['get'])
+    def media(self, request, pk=None):
+        """
+        Images (with renditions), videos, active virtual tours and floor plans in one response.
+        Served from the cache until the property's media change; `version` doubles as the ETag.
+        """
+        try:
+            property_id = int(pk)
+        except (TypeError, ValueError):
+            return Response({'error': 'Property not found'}, status=status.HTTP_404_NOT_FOUND)
+        version = media_version(property_id)
+        if version is None:
+            return Response({'error': 'Property not found'}, status=status.HTTP_404_NOT_FOUND)
+        etag = f'"media-{property_id}-{version}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            manifest = media_manifest(property_id, version, request)
+            if manifest is None:
+                return Response({'error': 'Property not found'}, status=status.HTTP_404_NOT_FOUND)
+            response = Response(manifest, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        return response
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def export(self, request):
+        """Stream the filtered properties as CSV or NDJSON (?file_format=csv|ndjson), newest first"""
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_CONTENT_TYPES:
+            return Response({'error': 'Invalid file_format, use csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+        if request.query_params.get('sort_by'):
+            # Exports are read in primary key batches, which fixes their order
+            return Response({'error': 'sort_by is not supported for exports'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(queryset, self.export_columns, file_format, 'properties')
@@ -1,5 +1,9 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.response import Response
 from common.viewset import BaseViewSet
+from .ordering import ReorderMixin
 from rest_framework.permissions import IsAuthenticated
 from common.paginator import Pagination
 from ..models import PropertyImage
@@ -9,9 +13,10 @@ from ..serializers.propertyimage import (
     PropertyImageListSerializer,
     PropertyImageDetailSerializer,
     PropertyImageUpdateSerializer,
+    PropertyImageBulkUploadSerializer,
 )
 
-class PropertyImageViewSet(BaseViewSet):
+class PropertyImageViewSet(ReorderMixin, BaseViewSet):
     queryset = PropertyImage.objects.all()
     http_method_names = ['get', 'post', 'patch', 'delete']
     filterset_class = PropertyImageFilter
@@ -34,4 +39,17 @@ class PropertyImageViewSet(BaseViewSet):
             return PropertyImageCreateSerializer
         elif self.action in ["update", "partial_update"]:
             return PropertyImageUpdateSerializer
+        elif self.action == "bulk_upload":
+            return PropertyImageBulkUploadSerializer
         return PropertyImageDetailSerializer
+
+    @action(detail=False, methods=['post'], url_path='bulk-upload', parser_classes=[MultiPartParser, FormParser])
+    def bulk_upload(self, request):
+        """Upload up to 20 images for one property (multipart: `property`, repeated `images`)"""
+        serializer = PropertyImageBulkUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        images = serializer.save(created_by=request.user)
+        return Response(
+            PropertyImageListSerializer(images, many=True, context={'request': request}).data,
+            status=status.HTTP_201_CREATED
+        )
@@ -1,5 +1,6 @@
 from rest_framework import viewsets
 from common.viewset import BaseViewSet
+from .ordering import ReorderMixin
 from rest_framework.permissions import IsAuthenticated
 from common.paginator import Pagination
 from ..models import PropertyVideo
@@ -10,8 +11,9 @@ from ..serializers.propertyvideo import (
     PropertyVideoCreateSerializer,
     PropertyVideoUpdateSerializer,
 )
+from authapp.roles import is_admin
 
-class PropertyVideoViewSet(BaseViewSet):
+class PropertyVideoViewSet(ReorderMixin, BaseViewSet):
     queryset = PropertyVideo.objects.all()
     http_method_names = ['get', 'post', 'patch', 'delete']
     filterset_class = PropertyVideoFilter
@@ -25,7 +27,7 @@ class PropertyVideoViewSet(BaseViewSet):
             queryset = queryset.filter(property_id=property_id)
         
         # Only show videos of approved properties to non-admin users
-        if not self.request.user.groups.filter(name='Admin').exists():
+        if not is_admin(self.request.user):
             queryset = queryset.filter(property__is_approved=True)
         
         return queryset.order_by('order', 'created_at')
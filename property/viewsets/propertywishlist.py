@@ -31,7 +31,7 @@ class PropertyWishlistViewSet(BaseViewSet):
 
     def get_queryset(self):
         """Return only the authenticated user's wishlist"""
-        return self.queryset.filter(created_by=self.request.user)
+        return self.queryset.filter(created_by_id=self.request.user.id)
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -96,7 +96,7 @@ class PropertyWishlistViewSet(BaseViewSet):
         
         # Get the user's wishlist
         try:
-            wishlist = PropertyWishlist.objects.get(created_by=request.user)
+            wishlist = PropertyWishlist.objects.get(created_by_id=request.user.id)
         except PropertyWishlist.DoesNotExist:
             return Response({
                 "error": "You don't have a wishlist yet."
@@ -123,7 +123,7 @@ class PropertyWishlistViewSet(BaseViewSet):
     def my_wishlist(self, request):
         """Get the authenticated user's wishlist with all properties."""
         try:
-            wishlist = PropertyWishlist.objects.get(created_by=request.user)
+            wishlist = PropertyWishlist.objects.get(created_by_id=request.user.id)
             serializer = PropertyWishlistDetailSerializer(wishlist, context={'request': request})
             return Response(serializer.data, status=status.HTTP_200_OK)
         except PropertyWishlist.DoesNotExist:
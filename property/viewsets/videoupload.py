@@ -0,0 +1,228 @@
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.base import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from common.media import delete_stored, file_sha256, mp4_duration
+from common.tasks import enqueue
+from ..models import PropertyVideo, VideoUploadSession
+from ..ordering import next_order
+from ..serializers.propertyvideo import (
+    PropertyVideoDetailSerializer,
+    VideoUploadInitSerializer,
+    VideoUploadSessionSerializer,
+)
+
+STREAM_READ_SIZE = 64 * 1024
+
+
+class VideoUploadViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable chunked upload of property videos.
+
+    1. POST   /property-video-uploads/                        -> upload_id, offset 0
+    2. PUT    /property-video-uploads/{upload_id}/?offset=N   raw bytes, repeat until offset == total_size
+       GET    /property-video-uploads/{upload_id}/            current offset, to resume after a failure
+    3. POST   /property-video-uploads/{upload_id}/finalize/   checks SHA-256, creates the PropertyVideo
+       DELETE /property-video-uploads/{upload_id}/            abandons the upload
+
+    Chunk bodies are streamed straight to a file under VIDEO_UPLOAD_TEMP_DIR,
+    so neither the upload size nor the chunk size is held in memory.
+    """
+    queryset = VideoUploadSession.objects.all()
+    serializer_class = VideoUploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_field = 'upload_id'
+    http_method_names = ['get', 'post', 'put', 'delete', 'head']
+
+    def get_queryset(self):
+        # Sessions are only visible to the user who started them
+        return super().get_queryset().filter(created_by_id=self.request.user.id)
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return VideoUploadInitSerializer
+        return VideoUploadSessionSerializer
+
+    def locked_session(self):
+        """The session row, locked for the rest of the transaction"""
+        session = self.get_object()
+        return VideoUploadSession.objects.select_for_update().get(pk=session.pk)
+
+    def inactive_response(self, session):
+        if session.status != 'active':
+            return Response({'error': f"Upload is {session.status}"}, status=status.HTTP_409_CONFLICT)
+        if session.expires_at <= timezone.now():
+            return Response({'error': "Upload has expired"}, status=status.HTTP_410_GONE)
+        return None
+
+    def create(self, request):
+        serializer = VideoUploadInitSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        session = serializer.save(
+            created_by=request.user,
+            updated_by=request.user,
+            expires_at=timezone.now() + timedelta(hours=settings.VIDEO_UPLOAD_EXPIRY_HOURS),
+        )
+        os.makedirs(settings.VIDEO_UPLOAD_TEMP_DIR, exist_ok=True)
+        open(session.temp_path(), 'wb').close()
+        return Response(VideoUploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+    def update(self, request, upload_id=None):
+        """Append one chunk; `offset` (query param or Upload-Offset header) must equal the current offset"""
+        offset = request.query_params.get('offset', request.headers.get('Upload-Offset'))
+        try:
+            offset = int(offset)
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (TypeError, ValueError):
+            return Response({'error': "An integer offset and Content-Length are required"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if length <= 0:
+            return Response({'error': "Empty chunk"}, status=status.HTTP_400_BAD_REQUEST)
+        if length > settings.VIDEO_UPLOAD_MAX_CHUNK_SIZE:
+            return Response({'error': f"Chunks cannot exceed {settings.VIDEO_UPLOAD_MAX_CHUNK_SIZE} bytes"},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        session = self.get_object()
+        error = self.inactive_response(session)
+        if error:
+            return error
+        if offset + length > session.total_size:
+            return Response({'error': "Chunk extends past the declared file size"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Claim the offset with a conditional UPDATE instead of holding a row lock while the body arrives.
+        # Only one request can write at `received`; a retry while another is still streaming gets the 409.
+        started_at = timezone.now()
+        stale = started_at - timedelta(seconds=settings.VIDEO_UPLOAD_CHUNK_TIMEOUT)
+        claimed = VideoUploadSession.objects.filter(
+            Q(chunk_started_at__isnull=True) | Q(chunk_started_at__lt=stale),
+            pk=session.pk, status='active', received=offset,
+        ).update(chunk_started_at=started_at)
+        if not claimed:
+            return self.conflict_response(session)
+
+        written = 0
+        claim = VideoUploadSession.objects.filter(
+            pk=session.pk, status='active', received=offset, chunk_started_at=started_at
+        )
+        try:
+            stream = request.stream
+            with open(session.temp_path(), 'r+b') as file:
+                # Drop anything past the acknowledged offset left by an interrupted chunk
+                file.seek(offset)
+                file.truncate()
+                while written < length:
+                    chunk = stream.read(min(STREAM_READ_SIZE, length - written))
+                    if not chunk:
+                        break
+                    file.write(chunk)
+                    written += len(chunk)
+        finally:
+            # A short body still advances the offset by what actually arrived
+            advanced = claim.update(received=offset + written, chunk_started_at=None, updated_at=timezone.now())
+        if not advanced:
+            # The claim timed out and another request took over this offset
+            return self.conflict_response(session)
+
+        return Response({'offset': offset + written, 'total_size': session.total_size}, status=status.HTTP_200_OK)
+
+    def conflict_response(self, session):
+        """409 with the offset to resume from (or why the upload cannot continue)"""
+        session.refresh_from_db(fields=['received', 'status', 'expires_at', 'chunk_started_at'])
+        error = self.inactive_response(session)
+        if error:
+            return error
+        body = {'error': "Offset mismatch", 'offset': session.received}
+        if session.chunk_started_at is not None:
+            body['error'] = "Another request is uploading this chunk, retry shortly"
+        return Response(body, status=status.HTTP_409_CONFLICT)
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, upload_id=None):
+        """Verify the file and turn it into a PropertyVideo with file_size and duration filled in"""
+        session = self.get_object()
+        error = self.inactive_response(session)
+        if error:
+            return error
+        if session.received != session.total_size:
+            return Response({'error': "Upload is incomplete", 'offset': session.received},
+                            status=status.HTTP_409_CONFLICT)
+
+        # Hashing a large file takes a while, do it before locking the row
+        if file_sha256(session.temp_path()) != session.sha256:
+            with transaction.atomic():
+                session = self.locked_session()
+                session.received = 0
+                session.save(update_fields=['received', 'updated_at'])
+                open(session.temp_path(), 'wb').close()
+            return Response({'error': "Checksum mismatch, the upload has been reset", 'offset': 0},
+                            status=status.HTTP_400_BAD_REQUEST)
+        duration = mp4_duration(session.temp_path())
+
+        field = PropertyVideo._meta.get_field('video')
+        stored_name = None
+        try:
+            with transaction.atomic():
+                session = self.locked_session()
+                error = self.inactive_response(session)
+                if error:
+                    return error
+                order = session.order
+                if order is None:
+                    order = next_order(PropertyVideo, session.property_id)
+
+                video = PropertyVideo(
+                    property_id=session.property_id,
+                    title=session.title,
+                    description=session.description,
+                    order=order,
+                    duration=duration,
+                    file_size=session.total_size,
+                    created_by=request.user,
+                    updated_by=request.user,
+                )
+                video.save()
+                # Copied, not moved: if anything below fails the transaction rolls back and the
+                # temporary file must still be there for the client to finalize again
+                with open(session.temp_path(), 'rb') as file:
+                    upload = File(file, name=session.filename)
+                    upload.sha256 = session.sha256  # verified above, the store need not hash it again
+                    stored_name = field.storage.save(
+                        field.generate_filename(video, session.filename),
+                        upload,
+                        max_length=field.max_length,
+                    )
+                video.video.name = stored_name
+                video.save(update_fields=['video'])
+                # Duration and size are known already; the worker adds the poster frame
+                enqueue('probe_videos', {'video_id': video.id})
+
+                session.status = 'completed'
+                session.video = video
+                session.save(update_fields=['status', 'video', 'updated_at'])
+        except Exception:
+            if stored_name:
+                delete_stored(field.storage, [stored_name])
+            raise
+
+        if os.path.exists(session.temp_path()):
+            os.remove(session.temp_path())
+        return Response(PropertyVideoDetailSerializer(video, context={'request': request}).data,
+                        status=status.HTTP_201_CREATED)
+
+    def destroy(self, request, upload_id=None):
+        with transaction.atomic():
+            session = self.locked_session()
+            if session.status == 'active':
+                session.status = 'aborted'
+                session.save(update_fields=['status', 'updated_at'])
+        if os.path.exists(session.temp_path()):
+            os.remove(session.temp_path())
+        return Response(status=status.HTTP_204_NO_CONTENT)
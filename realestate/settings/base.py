@@ -49,9 +49,19 @@ SPECTACULAR_SETTINGS = {
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10 MB
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760
 
+# Resumable video uploads: chunks are streamed to disk here, never buffered in memory
+VIDEO_UPLOAD_TEMP_DIR = BASE_DIR / 'tmp' / 'video_uploads'
+VIDEO_UPLOAD_MAX_SIZE = 4 * 1024 * 1024 * 1024  # 4 GB
+VIDEO_UPLOAD_MAX_CHUNK_SIZE = 16 * 1024 * 1024
+VIDEO_UPLOAD_EXPIRY_HOURS = 24
+# Seconds a chunk may take to arrive before a retried PUT can take over its offset
+VIDEO_UPLOAD_CHUNK_TIMEOUT = 10 * 60
+# Used by the probe_videos task for poster frames; thumbnails are skipped when it is not installed
+FFMPEG_BINARY = 'ffmpeg'
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authapp.authentication.ClaimsJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ),
@@ -156,6 +166,16 @@ STATIC_ROOT = BASE_DIR / 'static'
 # Media files (User-uploaded content)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Set to the nginx `internal` location aliasing MEDIA_ROOT (e.g. '/protected-media/') to
+# let the proxy send files; when None, Django streams them itself (common.serving)
+MEDIA_ACCEL_REDIRECT_PREFIX = None
+# Files only sent after authorization (project documents); never under MEDIA_URL
+PRIVATE_MEDIA_ROOT = BASE_DIR / 'private_media'
+# The nginx `internal` location aliasing PRIVATE_MEDIA_ROOT, same use as above
+PRIVATE_MEDIA_ACCEL_REDIRECT_PREFIX = None
+
+# Widths of the resized copies generated for every property image
+IMAGE_RENDITIONS = {'thumb': 320, 'card': 640, 'full': 1280}
 
 
 # Default primary key field type
@@ -164,3 +184,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True
+
+# Route new leads without an assignee to the least loaded matching agent
+LEAD_AUTO_ASSIGNMENT = True
+
+# Base URL of the web app, used for links in outgoing emails
+FRONTEND_URL = 'http://localhost:3000'